@@ -0,0 +1,165 @@
+"""
+Small in-process caches for data that is read far more often than it changes.
+
+Each worker process has its own copy. Write routes invalidate the entries they
+change, and the TTL bounds how long another worker can serve a stale entry.
+"""
+from collections import OrderedDict, namedtuple
+from threading import Lock
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire `ttl` seconds after being set.
+    Counts hits and misses so the hit rate can be checked in production.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def add(self, key, value):
+        """
+        Set the entry only if the key has no live entry. Returns True when it was set.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > time.monotonic():
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, key=_MISSING):
+        """
+        Drop one entry, or every entry when no key is given.
+        """
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "ttl": self.ttl}
+
+
+# Opening hours, detached from any session
+RestaurantHoursSnapshot = namedtuple("RestaurantHoursSnapshot", ["opening_time", "closing_time"])
+
+# Opening hours change a few times a year; the TTL only matters for other workers
+restaurant_hours_cache = TTLCache(ttl=300, maxsize=1)
+
+
+def get_restaurant_hours(db: Session):
+    """
+    Return the restaurant's opening hours as a RestaurantHoursSnapshot, or None if not set.
+    Queries the database only when the cached value is missing or expired.
+    """
+    # Imported here because app.models.attendance imports this module
+    from app.models.basic_info import RestaurantHours
+
+    hours = restaurant_hours_cache.get("hours", _MISSING)
+    if hours is _MISSING:
+        row = db.query(RestaurantHours.opening_time, RestaurantHours.closing_time).first()
+        hours = RestaurantHoursSnapshot(*row) if row else None
+        restaurant_hours_cache.set("hours", hours)
+    return hours
+
+
+async def get_restaurant_hours_async(db: AsyncSession):
+    """
+    Async variant of get_restaurant_hours for routes using the async session.
+    """
+    from app.models.basic_info import RestaurantHours
+
+    hours = restaurant_hours_cache.get("hours", _MISSING)
+    if hours is _MISSING:
+        result = await db.execute(select(RestaurantHours.opening_time, RestaurantHours.closing_time).limit(1))
+        row = result.first()
+        hours = RestaurantHoursSnapshot(*row) if row else None
+        restaurant_hours_cache.set("hours", hours)
+    return hours
+
+
+# Employee fields needed to answer a badge scan
+BadgeEmployee = namedtuple("BadgeEmployee", ["id", "name", "role", "qr_id"])
+
+
+class QrIndex:
+    """
+    In-memory qr_id -> BadgeEmployee index for kiosk logins.
+
+    Loaded in full at startup and kept current by the employee routes of this
+    process. Changes made by other worker processes are picked up on a lookup
+    miss (new badges) or by the periodic full reload after `max_age` seconds
+    (renamed or deleted employees). Lookups that must not see a stale badge,
+    like admin logins, go to the database instead.
+    """
+
+    def __init__(self, max_age: float = 300):
+        self.max_age = max_age
+        self._entries = {}
+        self._loaded_at = None
+        self._lock = Lock()
+
+    def load(self, employees):
+        """
+        Replace the whole index with the given BadgeEmployee entries.
+        """
+        entries = {employee.qr_id: employee for employee in employees}
+        with self._lock:
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+
+    def is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age
+
+    def get(self, qr_id):
+        return self._entries.get(qr_id)
+
+    def put(self, employee):
+        with self._lock:
+            self._entries[employee.qr_id] = employee
+
+    def remove(self, qr_id):
+        with self._lock:
+            self._entries.pop(qr_id, None)
+
+    def __len__(self):
+        return len(self._entries)
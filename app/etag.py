@@ -0,0 +1,107 @@
+"""
+Conditional GET for list endpoints.
+
+Every table has a version counter in the table_versions table. Sessions record
+which tables they write (ORM flushes and INSERT/UPDATE/DELETE statements alike),
+and bump the counters of those tables in the same transaction, just before it
+commits. A list endpoint's ETag is built from the counters of the tables it
+reads, so a client sending a current ETag in If-None-Match gets 304 Not Modified
+after one primary-key lookup, before the route runs its own queries or
+serialises anything.
+
+The counters are the only input, so every worker issues the same ETag for the
+same data, and a write committed by one worker changes the ETag all of them
+answer with. Transactions writing to the same table wait for each other on its
+counter row from that bump until they commit.
+
+Some list endpoints stream NDJSON instead of JSON when the Accept header asks for
+it. The two bodies differ, so an NDJSON response gets its own ETag, and every
+response says `Vary: Accept` so caches keep the representations apart.
+"""
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+# Imported for its before_commit listener, which must run (and write daily_rollups) before the bump below
+import app.rollup  # noqa: F401
+from app.database import get_db
+from app.models.table_version import TableVersion
+from app.serialization import wants_ndjson
+
+
+def bump_table_versions(session: Session, tables):
+    """
+    Increment the counters of `tables` in the session's transaction, creating missing ones,
+    with one INSERT ... ON CONFLICT DO UPDATE. Its rows are in name order, so concurrent
+    transactions lock the counters in the same order.
+    """
+    conn = session.connection()
+    dialect_insert = sqlite_insert if conn.dialect.name == "sqlite" else postgresql_insert
+    statement = dialect_insert(TableVersion).values([{"name": table, "version": 1} for table in sorted(tables)])
+    conn.execute(statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": TableVersion.version + 1},
+    ))
+
+
+def table_etag(db: Session, tables, representation=None):
+    versions = dict(db.execute(
+        select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables))
+    ).all())
+    suffix = f"-{representation}" if representation else ""
+    return f'W/"{"-".join(str(versions.get(table, 0)) for table in tables)}{suffix}"'
+
+
+def _changed_tables(session: Session):
+    return session.info.setdefault("changed_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        _changed_tables(session).add(obj.__table__.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_statement_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _changed_tables(orm_execute_state.session).add(orm_execute_state.statement.table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_changed_tables(session):
+    # Also fired when a savepoint is released; the changes stay recorded for the outer commit
+    if session.in_nested_transaction():
+        return
+    # Flush here so tables of changes still pending at commit are recorded too
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    tables = session.info.pop("changed_tables", None)
+    if tables:
+        bump_table_versions(session, tables)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_tables(session, previous_transaction):
+    # Tables changed before a rolled-back savepoint are still committed with the transaction
+    if previous_transaction.nested:
+        return
+    session.info.pop("changed_tables", None)
+
+
+def conditional_get(*tables: str):
+    """
+    Route dependency that sets an ETag built from the versions of `tables` and answers
+    304 Not Modified when the request's If-None-Match already holds that ETag.
+    """
+    def check_etag(request: Request, response: Response, db: Session = Depends(get_db)):
+        etag = table_etag(db, tables, "ndjson" if wants_ndjson(request) else None)
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+        response.headers["ETag"] = etag
+        response.headers["Vary"] = "Accept"
+
+    return Depends(check_etag)
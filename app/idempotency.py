@@ -0,0 +1,148 @@
+"""
+Idempotency keys for the kiosk's state-changing requests.
+
+A kiosk that retries a clock or break request sends the same `Idempotency-Key`
+header. The first response is stored, and a retry with that key gets the stored
+response back without the route running again, so a retry cannot turn into an
+"already clocked in" error or a duplicate break.
+
+Keys are scoped to the caller: the Authorization header when one is sent, else
+the client address. Another client that sends the same key gets its own request
+handled, not someone else's stored response.
+
+Stored responses live in an in-process LRU with a TTL, so each worker process
+only knows the keys it has answered itself.
+"""
+from collections import namedtuple
+import hashlib
+import json
+
+from app.cache import TTLCache
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+AUTHORIZATION_HEADER = b"authorization"
+
+# POST routes that change clock or break state
+IDEMPOTENT_PATHS = frozenset({
+    "/clock-in/",
+    "/clock-out/",
+    "/breaks/start/",
+    "/breaks/end/",
+    "/create/break",
+    "/events/batch",
+    "/async/clock-in/",
+    "/async/clock-out/",
+    "/async/breaks/start/",
+    "/async/breaks/end/",
+})
+
+# A request that is still being handled, and a finished response ready to replay
+PendingResponse = namedtuple("PendingResponse", ["fingerprint"])
+StoredResponse = namedtuple("StoredResponse", ["fingerprint", "status", "headers", "body"])
+
+# Kiosks retry within minutes; a day covers queues replayed after a long outage
+idempotency_cache = TTLCache(ttl=24 * 60 * 60, maxsize=10_000)
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware that stores the first response to each (client, path, Idempotency-Key)
+    and replays it for retries. Server errors are not stored, so they can be retried.
+    A retry that arrives while the first request is still running gets 409, and a key
+    reused with a different query string or body gets 422.
+    """
+
+    def __init__(self, app, paths=IDEMPOTENT_PATHS, cache: TTLCache = idempotency_cache):
+        self.app = app
+        self.paths = paths
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return await self.app(scope, receive, send)
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(scope["query_string"] + b"?" + body).hexdigest()
+        cache_key = (_client_identity(scope, headers), scope["path"], key)
+
+        if not self.cache.add(cache_key, PendingResponse(fingerprint)):
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                if entry.fingerprint != fingerprint:
+                    return await _send_error(send, 422, "Idempotency-Key was already used for a different request")
+                if isinstance(entry, PendingResponse):
+                    return await _send_error(send, 409, "A request with this Idempotency-Key is still in progress")
+                return await _replay(send, entry)
+            # The entry expired in between; handle the request as a first attempt
+            self.cache.set(cache_key, PendingResponse(fingerprint))
+
+        response = {"status": 500, "headers": [], "body": []}
+
+        async def replay_receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except Exception:
+            self.cache.invalidate(cache_key)
+            raise
+
+        if response["status"] >= 500:
+            self.cache.invalidate(cache_key)
+        else:
+            self.cache.set(cache_key, StoredResponse(
+                fingerprint, response["status"], response["headers"], b"".join(response["body"])
+            ))
+
+
+def _client_identity(scope, headers):
+    # Tokens are hashed so the cache holds no credentials
+    authorization = headers.get(AUTHORIZATION_HEADER)
+    if authorization:
+        return "auth:" + hashlib.sha256(authorization).hexdigest()
+    client = scope.get("client")
+    return "client:" + (client[0] if client else "")
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _replay(send, stored: StoredResponse):
+    await send({
+        "type": "http.response.start",
+        "status": stored.status,
+        "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+    })
+    await send({"type": "http.response.body", "body": stored.body})
+
+
+async def _send_error(send, status, detail):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
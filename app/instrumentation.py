@@ -0,0 +1,218 @@
+"""
+SQL statement counts and database time per request.
+
+SQLAlchemy cursor events time every statement of every engine (sync and async)
+and add it to the stats of the request that is running, found through a
+ContextVar that QueryStatsMiddleware sets for each HTTP request. Sync routes run
+in the threadpool with a copy of that context, so their statements are counted
+too. When the request finishes its stats are folded into per-route aggregates,
+which GET /debug/queries reports.
+
+With the DEBUG environment variable set, responses also carry the stats so far
+in X-DB-Statements, X-DB-Time-Ms, X-DB-Slowest-Ms and X-DB-Slowest-Statement.
+Statements run after the headers are sent (streamed bodies) are only in the
+aggregates.
+
+query_budget() counts statements outside of requests, for scripts and tests
+that want to fail when a route runs more statements than it should.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+from threading import Lock
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_HEADERS = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
+
+# Longest statement text kept for the slowest statement
+MAX_STATEMENT_LENGTH = 300
+
+
+class QueryStats:
+    """
+    Statements run by one request (or one query_budget block).
+    """
+    __slots__ = ("statements", "seconds", "slowest_seconds", "slowest_statement", "recorded")
+
+    def __init__(self, record_statements=False):
+        self.statements = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+        # Full statement list, only kept by query budgets for their error message
+        self.recorded = [] if record_statements else None
+
+    def add(self, statement, seconds):
+        self.statements += 1
+        self.seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+        if self.recorded is not None:
+            self.recorded.append(statement)
+
+
+_request_stats: ContextVar = ContextVar("request_query_stats", default=None)
+_budgets = []
+
+
+def _short(statement):
+    statement = " ".join(statement.split())
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        return statement[:MAX_STATEMENT_LENGTH - 3] + "..."
+    return statement
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(statement, elapsed)
+    for budget in _budgets:
+        budget.add(statement, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_timer(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if exception_context.is_pre_ping or connection is None:
+        return
+    if connection.info.get("query_started_at"):
+        connection.info["query_started_at"].pop()
+
+
+class RouteQueryStats:
+    """
+    Per-route totals of the requests' query stats. Thread-safe.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = Lock()
+
+    def record(self, route, stats: QueryStats):
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "requests": 0,
+                    "statements": 0,
+                    "max_statements": 0,
+                    "db_seconds": 0.0,
+                    "max_db_seconds": 0.0,
+                    "slowest_seconds": 0.0,
+                    "slowest_statement": None,
+                }
+            entry["requests"] += 1
+            entry["statements"] += stats.statements
+            entry["max_statements"] = max(entry["max_statements"], stats.statements)
+            entry["db_seconds"] += stats.seconds
+            entry["max_db_seconds"] = max(entry["max_db_seconds"], stats.seconds)
+            if stats.slowest_statement is not None and stats.slowest_seconds >= entry["slowest_seconds"]:
+                entry["slowest_seconds"] = stats.slowest_seconds
+                entry["slowest_statement"] = _short(stats.slowest_statement)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                route: {
+                    **entry,
+                    "mean_statements": entry["statements"] / entry["requests"],
+                    "mean_db_ms": entry["db_seconds"] / entry["requests"] * 1000,
+                }
+                for route, entry in sorted(self._routes.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_query_stats = RouteQueryStats()
+
+
+def route_name(scope):
+    """
+    "METHOD /path/{template}" of the route that handled a request, once routing has run.
+    """
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route is not None else '(unmatched)'}"
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware collecting the SQL statements of each HTTP request into route_query_stats,
+    and adding them as response headers when QUERY_HEADERS is on.
+    """
+
+    def __init__(self, app, stats: RouteQueryStats = route_query_stats, headers: bool = QUERY_HEADERS):
+        self.app = app
+        self.stats = stats
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *_stats_headers(stats)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers if self.headers else send)
+        finally:
+            _request_stats.reset(token)
+            self.stats.record(route_name(scope), stats)
+
+
+def _stats_headers(stats: QueryStats):
+    headers = [
+        (b"x-db-statements", str(stats.statements).encode()),
+        (b"x-db-time-ms", f"{stats.seconds * 1000:.2f}".encode()),
+        (b"x-db-slowest-ms", f"{stats.slowest_seconds * 1000:.2f}".encode()),
+    ]
+    if stats.slowest_statement is not None:
+        headers.append((b"x-db-slowest-statement", _short(stats.slowest_statement).encode("latin-1", "replace")))
+    return headers
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_statements: int, label: str = "block"):
+    """
+    Fail with QueryBudgetExceeded when the block runs more than `max_statements` SQL statements.
+
+    Counts the statements of every engine in the process, including requests that a
+    TestClient hands to the app's event loop thread:
+
+        with query_budget(3, "GET /employees/status/"):
+            client.get("/employees/status/")
+    """
+    stats = QueryStats(record_statements=True)
+    _budgets.append(stats)
+    try:
+        yield stats
+    finally:
+        _budgets.remove(stats)
+    if stats.statements > max_statements:
+        listing = "\n".join(f"  {n}. {_short(statement)}" for n, statement in enumerate(stats.recorded, 1))
+        raise QueryBudgetExceeded(
+            f"{label} ran {stats.statements} SQL statements, over its budget of {max_statements}:\n{listing}"
+        )
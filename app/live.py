@@ -0,0 +1,144 @@
+"""
+Push channel for live employee status.
+
+Dashboards subscribe over /ws/status or /status/stream and receive a snapshot
+followed by one delta per change. Write routes call publish_attendance_status()
+(or publish_employee_status() / publish_employee_deleted() for the employee
+routes) after they commit; the changed employee's status is built once and fanned out to
+every subscriber, so the cost grows with the number of changes rather than with
+the number of dashboards. Nothing is queried while no dashboard is connected.
+
+Subscribers are held in memory, so each worker process only pushes the changes
+it committed itself. Run a single worker, or put a shared pub/sub in front of
+publish(), when dashboards must see writes handled by other workers.
+"""
+import asyncio
+from datetime import datetime
+import logging
+from threading import Lock
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.models.attendance import AttendanceLog
+
+logger = logging.getLogger(__name__)
+
+# Buffered deltas per subscriber before it is asked to resync
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class Subscriber:
+    """
+    Message queue of one connected dashboard, fed from any thread.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, message):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: drop the backlog and have the client start over from a snapshot
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class StatusBroadcaster:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = Lock()
+
+    def subscribe(self):
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def publish(self, message):
+        """
+        Send a message to every subscriber. Safe to call from threadpool routes.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.push, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscriber)
+
+
+broadcaster = StatusBroadcaster()
+
+
+def status_snapshot(db: Session, day=None):
+    """
+    Message with the status of every employee for a day (default today).
+    """
+    from app.routes.employee import build_employee_statuses  # app.routes.employee imports this module
+
+    day = day or datetime.today().date()
+    return jsonable_encoder({
+        "type": "snapshot",
+        "date": day,
+        "employees": build_employee_statuses(db, day),
+    })
+
+
+def _publish_status(db: Session, message_type: str, employee_id: int, day):
+    from app.routes.employee import build_employee_statuses  # app.routes.employee imports this module
+
+    statuses = build_employee_statuses(db, day, [employee_id])
+    if statuses:
+        broadcaster.publish(jsonable_encoder({"type": message_type, "date": day, "employee": statuses[0]}))
+
+
+def publish_attendance_status(db: Session, attendance_id: int):
+    """
+    Push the current status of the employee who owns an attendance record, for the
+    day the record starts on. Call after the change has been committed.
+    Failures are logged and never fail the write that triggered them.
+    """
+    if not broadcaster.has_subscribers():
+        return
+    try:
+        attendance = db.query(AttendanceLog.employee_id, AttendanceLog.clock_in).filter(
+            AttendanceLog.id == attendance_id
+        ).first()
+        if not attendance:
+            return
+        _publish_status(db, "status", attendance.employee_id, attendance.clock_in.date())
+    except Exception:
+        logger.exception("Could not publish live status for attendance %s", attendance_id)
+
+
+def publish_employee_status(db: Session, employee_id: int, message_type: str = "status"):
+    """
+    Push today's status of a created ("employee.created") or edited employee.
+    Call after the change has been committed; failures are only logged.
+    """
+    if not broadcaster.has_subscribers():
+        return
+    try:
+        _publish_status(db, message_type, employee_id, datetime.today().date())
+    except Exception:
+        logger.exception("Could not publish live status for employee %s", employee_id)
+
+
+def publish_employee_deleted(employee_id: int):
+    """
+    Tell dashboards to drop a deleted employee.
+    """
+    broadcaster.publish({"type": "employee.deleted", "employee_id": employee_id})
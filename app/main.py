@@ -1,6 +1,6 @@
 from fastapi import FastAPI
-from app.database import init_db  # Import init_db function
-from app.routes.employee import router as employee_router
+from app.database import init_db, SessionLocal  # Import init_db function
+from app.routes.employee import router as employee_router, load_qr_index
 from app.routes.attendance import router as attendance_router
 from app.routes.breaks import router as breaks_router
 from app.routes.information import router as restaurant_hours
@@ -8,7 +8,17 @@ from app.routes.bonus import router as bonus
 from app.routes.penalty import router as penalty
 from app.routes.task import router as task
 from app.routes.report import router as report
+from app.routes.payroll import router as payroll
+from app.routes.kiosk_async import router as kiosk_async
+from app.routes.events import router as events
+from app.routes.live import router as live
+from app.routes.rollup import router as rollup
+from app.routes.debug import router as debug
+from app.routes.metrics import router as metrics
 from fastapi.middleware.cors import CORSMiddleware
+from app.idempotency import IdempotencyMiddleware
+from app.instrumentation import QueryStatsMiddleware
+from app.metrics import MetricsMiddleware
 import logging
 
 
@@ -26,6 +36,9 @@ origins = [
     "https://employee-clock-frontend.vercel.app/"
 ]
 
+# Replay stored responses for retried kiosk requests (added first so CORS wraps replays too)
+app.add_middleware(IdempotencyMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -35,12 +48,23 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Count each request's SQL statements and database time (wraps idempotency replays and CORS)
+app.add_middleware(QueryStatsMiddleware)
+
+# Route latency histograms and in-flight requests for GET /metrics (added last, so outermost)
+app.add_middleware(MetricsMiddleware)
+
 # Initialize the database tables on app startup
 @app.on_event("startup")
 def on_startup():
     init_db()  # Creates tables if they don't exist
     logging.info("Database initialized.")
 
+    # Warm the badge index so kiosk logins resolve without a query
+    with SessionLocal() as db:
+        load_qr_index(db)
+    logging.info("QR index loaded.")
+
 @app.get("/")
 def read_root():
     logging.info("Root endpoint accessed")
@@ -54,4 +78,11 @@ app.include_router(restaurant_hours)
 app.include_router(bonus)
 app.include_router(penalty)
 app.include_router(task)
-app.include_router(report)
\ No newline at end of file
+app.include_router(report)
+app.include_router(payroll)
+app.include_router(kiosk_async)
+app.include_router(events)
+app.include_router(live)
+app.include_router(rollup)
+app.include_router(debug)
+app.include_router(metrics)
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""
+Prometheus metrics, served as text by GET /metrics.
+
+MetricsMiddleware times every HTTP request into a per-route latency histogram
+and tracks how many requests are in flight. Recording a request costs a clock
+read, a bisect and a few counter updates under a lock. Everything else is read
+only when /metrics is scraped: the threadpool that runs sync routes, the
+connection pools of both engines (app/pool.py) and the per-route SQL stats of
+app/instrumentation.py.
+
+Counters are per worker process and start from zero when the worker starts, so
+run one scrape target per worker.
+"""
+from bisect import bisect_left
+from threading import Lock
+import time
+
+from anyio.to_thread import current_default_thread_limiter
+
+from app.database import engine_pools
+from app.instrumentation import route_query_stats
+from app.pool import WAIT_BUCKETS, pool_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestMetrics:
+    """
+    Latency histogram and status counts per route, and the number of requests in flight.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.in_flight = 0
+        # (method, route) -> [count per bucket..., overflow count, sum of seconds]
+        self._latencies = {}
+        # (method, route, status) -> count
+        self._responses = {}
+        self._lock = Lock()
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method, route, status, seconds):
+        bucket = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.in_flight -= 1
+            histogram = self._latencies.get((method, route))
+            if histogram is None:
+                histogram = self._latencies[(method, route)] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[bucket] += 1
+            histogram[-1] += seconds
+            key = (method, route, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return (
+                self.in_flight,
+                {key: list(histogram) for key, histogram in self._latencies.items()},
+                dict(self._responses),
+            )
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency and status of every HTTP request in request_metrics.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            self.metrics.finished(
+                scope["method"],
+                route.path if route is not None else "(unmatched)",
+                status,
+                time.perf_counter() - started,
+            )
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram(lines, name, labels, bounds, counts, total):
+    """
+    Append one Prometheus histogram from non-cumulative bucket counts (the last one unbounded).
+    """
+    cumulative = 0
+    for bound, count in zip(bounds, counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    cumulative += counts[len(bounds)]
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total}")
+    lines.append(f"{name}_count{_labels(**labels)} {cumulative}")
+
+
+def _header(lines, name, kind, help_text):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def render_metrics(metrics: RequestMetrics = request_metrics):
+    """
+    All metrics in the Prometheus text exposition format. Call from the event loop,
+    whose default thread limiter is the threadpool that runs sync routes.
+    """
+    lines = []
+    in_flight, latencies, responses = metrics.snapshot()
+
+    _header(lines, "http_request_duration_seconds", "histogram", "Time to handle a request, by route.")
+    for (method, route), histogram in sorted(latencies.items()):
+        _histogram(lines, "http_request_duration_seconds", {"method": method, "route": route},
+                   metrics.buckets, histogram[:-1], histogram[-1])
+
+    _header(lines, "http_requests_total", "counter", "Requests handled, by route and status code.")
+    for (method, route, status), count in sorted(responses.items()):
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    _header(lines, "http_requests_in_flight", "gauge", "Requests being handled, including this scrape.")
+    lines.append(f"http_requests_in_flight {in_flight}")
+
+    limiter = current_default_thread_limiter()
+    _header(lines, "threadpool_threads_limit", "gauge", "Threads available to sync routes and dependencies.")
+    lines.append(f"threadpool_threads_limit {limiter.total_tokens}")
+    _header(lines, "threadpool_threads_busy", "gauge", "Threads running sync routes and dependencies.")
+    lines.append(f"threadpool_threads_busy {limiter.borrowed_tokens}")
+    _header(lines, "threadpool_tasks_waiting", "gauge", "Sync calls waiting for a free thread.")
+    lines.append(f"threadpool_tasks_waiting {limiter.statistics().tasks_waiting}")
+
+    pools = {name: pool_stats(pool) for name, pool in engine_pools().items()}
+    for metric, field, help_text in (
+        ("db_pool_size", "size", "Connections the pool keeps open."),
+        ("db_pool_max_overflow", "max_overflow", "Connections the pool may open beyond its size."),
+        ("db_pool_checked_out", "checked_out", "Connections checked out of the pool."),
+        ("db_pool_overflow", "overflow", "Connections open beyond the pool size."),
+    ):
+        _header(lines, metric, "gauge", help_text)
+        for name, stats in pools.items():
+            if field in stats:
+                lines.append(f"{metric}{_labels(pool=name)} {stats[field]}")
+
+    _header(lines, "db_pool_pre_ping_failures_total", "counter", "Pooled connections found dead on checkout.")
+    for name, stats in pools.items():
+        lines.append(f"db_pool_pre_ping_failures_total{_labels(pool=name)} {stats['pre_ping_failures']}")
+
+    _header(lines, "db_pool_checkout_wait_seconds", "histogram", "Time waited for a pooled connection.")
+    for name, stats in pools.items():
+        if "wait" in stats:
+            wait = stats["wait"]
+            _histogram(lines, "db_pool_checkout_wait_seconds", {"pool": name}, WAIT_BUCKETS,
+                       list(wait["buckets"].values()), wait["total_seconds"])
+    _header(lines, "db_pool_checkout_timeouts_total", "counter", "Checkouts that gave up after pool_timeout.")
+    for name, stats in pools.items():
+        if "wait" in stats:
+            lines.append(f"db_pool_checkout_timeouts_total{_labels(pool=name)} {stats['wait']['timeouts']}")
+
+    queries = route_query_stats.snapshot()
+    _header(lines, "db_statements_total", "counter", "SQL statements run by requests, by route.")
+    for route, stats in queries.items():
+        method, _, path = route.partition(" ")
+        lines.append(f"db_statements_total{_labels(method=method, route=path)} {stats['statements']}")
+    _header(lines, "db_time_seconds_total", "counter", "Time spent in SQL statements by requests, by route.")
+    for route, stats in queries.items():
+        method, _, path = route.partition(" ")
+        lines.append(f"db_time_seconds_total{_labels(method=method, route=path)} {stats['db_seconds']}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,220 @@
+"""
+Versioned schema migrations.
+
+init_db only creates tables that do not exist yet, so changes to existing tables
+(new indexes, columns and constraints) are applied here instead. Each migration
+runs once, in order, inside a transaction, and the last applied version is
+recorded in the schema_version table.
+
+On Postgres, indexes are not built inside that transaction: a plain CREATE INDEX
+blocks every write to a large table until it finishes. Migrations only queue
+them, and once the transaction has committed they are built one by one with
+CREATE INDEX CONCURRENTLY, which cannot run inside a transaction block.
+"""
+import logging
+import time
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from app.database import Base
+
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata so create_all never touches it
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, server_default=func.now(), nullable=False),
+)
+
+# Serializes migrations when several workers start at once (Postgres only)
+MIGRATION_LOCK_ID = 7_301_001
+
+# Seconds between attempts to take the migration lock
+MIGRATION_LOCK_POLL = 1.0
+
+
+def create_indexes(conn: Connection, *index_names: str):
+    """
+    Create the named indexes declared on the models, skipping any that already exist.
+    On Postgres they are queued instead, for run_migrations to build concurrently.
+    """
+    pending = set(index_names)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in pending:
+                if "concurrent_indexes" in conn.info:
+                    conn.info["concurrent_indexes"].append(index)
+                else:
+                    index.create(conn, checkfirst=True)
+                pending.discard(index.name)
+    if pending:
+        raise RuntimeError(f"Unknown indexes: {', '.join(sorted(pending))}")
+
+
+def concurrent_index_ddl(index, dialect):
+    """
+    CREATE [UNIQUE] INDEX CONCURRENTLY IF NOT EXISTS statement for a model index.
+    """
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+    return ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+
+
+def build_indexes_concurrently(conn: Connection, indexes):
+    """
+    Build indexes with CREATE INDEX CONCURRENTLY on an AUTOCOMMIT connection.
+
+    A concurrent build that was interrupted (or failed, e.g. on duplicate keys)
+    leaves an invalid index behind, which IF NOT EXISTS would skip; such an index
+    is dropped and built again.
+    """
+    for index in indexes:
+        invalid = conn.execute(
+            text(
+                "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+                "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+            ),
+            {"name": index.name},
+        ).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+        logger.info("Building index %s concurrently", index.name)
+        conn.execute(text(concurrent_index_ddl(index, conn.dialect)))
+
+
+def _add_hot_path_indexes(conn: Connection):
+    create_indexes(
+        conn,
+        "ix_attendance_log_employee_id_clock_in",
+        "ix_attendance_log_open_shifts",
+        "ix_break_log_attendance_id_break_start",
+        "ix_break_log_open_breaks",
+        "ix_tasks_employee_id_task_date",
+        "ix_penalties_attendance_id",
+        "ix_bonuses_attendance_id",
+        "ix_late_records_attendance_id",
+    )
+
+
+def _add_attendance_work_day(conn: Connection):
+    if "work_day" not in {column["name"] for column in inspect(conn).get_columns("attendance_log")}:
+        conn.execute(text("ALTER TABLE attendance_log ADD COLUMN work_day DATE"))
+
+    # Shifts starting before 5 AM belong to the previous day (see work_day_for)
+    if conn.dialect.name == "sqlite":
+        work_day = "date(clock_in, '-5 hours')"
+    else:
+        work_day = "CAST(clock_in - INTERVAL '5 hours' AS DATE)"
+
+    # Existing duplicates keep a NULL work_day so the unique index can be built;
+    # only the first record of each employee and work day gets the key.
+    conn.execute(text(
+        f"UPDATE attendance_log SET work_day = {work_day} "
+        f"WHERE work_day IS NULL AND id IN ("
+        f"SELECT MIN(id) FROM attendance_log GROUP BY employee_id, {work_day})"
+    ))
+    create_indexes(conn, "uq_attendance_log_employee_id_work_day")
+
+
+def _backfill_daily_rollups(conn: Connection):
+    # Imported here because app.rollup loads the models, which import app.database
+    from app.rollup import rebuild_rollups
+
+    # create_all has already created the empty daily_rollups table. salary_log only
+    # gets its snapshot columns in migration 4, and no period can be closed before it.
+    with Session(bind=conn) as db:
+        written = rebuild_rollups(db, frozen_wages=False)
+        db.flush()
+    logger.info("Backfilled %s daily rollups", written)
+
+
+def add_missing_columns(conn: Connection, table_name: str, *column_names: str):
+    """
+    Add the named columns declared on a model's table when the database table lacks them.
+    """
+    table = Base.metadata.tables[table_name]
+    existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    for name in column_names:
+        if name in existing:
+            continue
+        column = table.c[name]
+        ddl = f"ALTER TABLE {table_name} ADD COLUMN {name} {column.type.compile(conn.dialect)}"
+        for foreign_key in column.foreign_keys:
+            ddl += f" REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+        conn.execute(text(ddl))
+
+
+def _add_salary_log_snapshot(conn: Connection):
+    add_missing_columns(
+        conn,
+        "salary_log",
+        "period_id",
+        "clock_in",
+        "clock_out",
+        "hourly_wage",
+        "break_hours",
+        "hours_excluding_breaks",
+        "late_minutes",
+        "late_deduction",
+        "penalties",
+        "bonuses",
+        "net_pay",
+    )
+    create_indexes(conn, "ix_salary_log_period_id", "ix_salary_log_attendance_id")
+
+
+# (version, description, migration) in the order they must be applied
+MIGRATIONS = [
+    (1, "Composite and partial indexes for attendance, break and task lookups", _add_hot_path_indexes),
+    (2, "Work day key with a unique (employee_id, work_day) index on attendance_log", _add_attendance_work_day),
+    (3, "Backfill the daily_rollups table", _backfill_daily_rollups),
+    (4, "Payroll period snapshot columns on salary_log", _add_salary_log_snapshot),
+]
+
+
+def _apply_migrations(engine: Engine):
+    """
+    Run the pending migrations in one transaction. Returns the indexes they queued.
+    """
+    with engine.begin() as conn:
+        queued = []
+        if conn.dialect.name == "postgresql":
+            conn.info["concurrent_indexes"] = queued
+        try:
+            schema_version.create(conn, checkfirst=True)
+            current = conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+            for version, description, migrate in MIGRATIONS:
+                if version <= current:
+                    continue
+                logger.info("Applying schema migration %s: %s", version, description)
+                migrate(conn)
+                conn.execute(schema_version.insert().values(version=version, description=description))
+        finally:
+            # conn.info belongs to the pooled connection, so never leave the queue behind
+            conn.info.pop("concurrent_indexes", None)
+    return queued
+
+
+def run_migrations(engine: Engine):
+    """
+    Apply every migration newer than the database's recorded schema version.
+    """
+    if engine.dialect.name != "postgresql":
+        _apply_migrations(engine)
+        return
+
+    # A session-level lock, polled rather than waited for: a concurrent index build
+    # waits for every open transaction, including one blocked on this lock.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        lock = text("SELECT pg_try_advisory_lock(:lock_id)").bindparams(lock_id=MIGRATION_LOCK_ID)
+        while not conn.execute(lock).scalar():
+            time.sleep(MIGRATION_LOCK_POLL)
+        try:
+            build_indexes_concurrently(conn, _apply_migrations(engine))
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
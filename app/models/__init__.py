@@ -1,6 +1,8 @@
 from .employee import Employee
 from .attendance import AttendanceLog
 from .breaks import BreakLog
-from .salary import SalaryLog  
+from .salary import SalaryLog, PayrollPeriod, PayrollPeriodTotal
 from .basic_info import RestaurantHours
-from .task import Task
\ No newline at end of file
+from .task import Task
+from .rollup import DailyRollup
+from .table_version import TableVersion
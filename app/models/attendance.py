@@ -1,20 +1,62 @@
-from sqlalchemy import Column, Integer,String, TIMESTAMP, Numeric, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Date, Integer,String, TIMESTAMP, Numeric, ForeignKey, Index, text, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
 from sqlalchemy.orm import Session
 import pytz
-from datetime import datetime
+from datetime import datetime, time, timedelta
 from sqlalchemy.sql import func
 from decimal import Decimal
 
-from app.models.basic_info import RestaurantHours
+from app.cache import get_restaurant_hours
 
 
 
+# Shifts that start before this time belong to the previous work day
+WORK_DAY_ROLLOVER = time(5, 0)
+
+
+def work_day_for(timestamp: datetime):
+    """
+    Return the work day a timestamp belongs to: its date, or the previous date before 5 AM.
+    """
+    if timestamp.time() < WORK_DAY_ROLLOVER:
+        return timestamp.date() - timedelta(days=1)
+    return timestamp.date()
+
+
+def calculate_late_minutes(clock_in, opening_time):
+    """
+    Return how many minutes after the opening time the employee clocked in,
+    or None when they clocked in on time or early.
+    """
+    clock_in_time = clock_in.time()
+    if clock_in_time <= opening_time:
+        return None
+
+    late_duration = datetime.combine(datetime.min, clock_in_time) - datetime.combine(datetime.min, opening_time)
+    return Decimal(late_duration.total_seconds() / 60)  # Convert seconds to minutes
+
+
+def calculate_lateness(clock_in, opening_time, hourly_wage):
+    """
+    Return (late_duration_minutes, deduction_amount) for a clock-in after the opening time,
+    or None when the employee clocked in on time or early.
+    The deduction is the employee's wage for the minutes they were late.
+    """
+    late_duration_minutes = calculate_late_minutes(clock_in, opening_time)
+    if late_duration_minutes is None:
+        return None
+
+    deduction_amount = (Decimal(hourly_wage) / Decimal(60)) * late_duration_minutes
+    return late_duration_minutes, deduction_amount
+
+
 class LateRecord(Base):
     __tablename__ = 'late_records'
     id = Column(Integer, primary_key=True, index=True)
-    attendance_id = Column(Integer, ForeignKey('attendance_log.id', ondelete="CASCADE"), nullable=False)
+    attendance_id = Column(Integer, ForeignKey('attendance_log.id', ondelete="CASCADE"), nullable=False, index=True)
     late_duration_minutes = Column(Numeric(10, 2), nullable=False)  # Duration of lateness in minutes
     deduction_amount = Column(Numeric(10, 2), nullable=False)  # Deduction amount from hourly wage
     created_at = Column(TIMESTAMP, default=func.now(), nullable=False)
@@ -25,7 +67,7 @@ class LateRecord(Base):
 class Penalty(Base):
     __tablename__ = 'penalties'
     id = Column(Integer, primary_key=True, index=True)
-    attendance_id = Column(Integer, ForeignKey('attendance_log.id', ondelete="CASCADE"), nullable=False)
+    attendance_id = Column(Integer, ForeignKey('attendance_log.id', ondelete="CASCADE"), nullable=False, index=True)
     description = Column(String(255), nullable=False)
     price = Column(Numeric(10, 2), nullable=False)
     created_at = Column(TIMESTAMP, default=func.now(), nullable=False)
@@ -35,7 +77,7 @@ class Penalty(Base):
 class Bonus(Base):
     __tablename__ = 'bonuses'
     id = Column(Integer, primary_key=True, index=True)
-    attendance_id = Column(Integer, ForeignKey('attendance_log.id', ondelete="CASCADE"), nullable=False)
+    attendance_id = Column(Integer, ForeignKey('attendance_log.id', ondelete="CASCADE"), nullable=False, index=True)
     description = Column(String(255), nullable=False)
     price = Column(Numeric(10, 2), nullable=False)
     created_at = Column(TIMESTAMP, default=func.now(), nullable=False)
@@ -44,10 +86,23 @@ class Bonus(Base):
 
 class AttendanceLog(Base):
     __tablename__ = 'attendance_log'
+    __table_args__ = (
+        # Clock-in/out and status lookups: an employee's records by time
+        Index("ix_attendance_log_employee_id_clock_in", "employee_id", "clock_in"),
+        # Open shifts only, for clock-out and status lookups
+        Index(
+            "ix_attendance_log_open_shifts", "employee_id", "clock_in",
+            postgresql_where=text("clock_out IS NULL"),
+            sqlite_where=text("clock_out IS NULL"),
+        ),
+        # At most one attendance record per employee and work day
+        Index("uq_attendance_log_employee_id_work_day", "employee_id", "work_day", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey('employees.id', ondelete="CASCADE"), nullable=False)
     clock_in = Column(TIMESTAMP, nullable=False)
+    work_day = Column(Date, nullable=True)  # Derived from clock_in, see work_day_for
     clock_out = Column(TIMESTAMP, nullable=True)  # Nullable until clock out
     total_hours = Column(Numeric(10, 2), nullable=True)  # Calculated after clock-out
     created_at = Column(TIMESTAMP, default=datetime.now)
@@ -57,11 +112,19 @@ class AttendanceLog(Base):
 
     # BreakLog remains unchanged
     break_logs = relationship("BreakLog", back_populates="attendance_log", cascade="all, delete-orphan")
-    late_record = relationship("LateRecord", uselist=False, back_populates="attendance_log")  # One-to-One relationship
+    late_record = relationship("LateRecord", uselist=False, back_populates="attendance_log", cascade="all, delete-orphan")  # One-to-One relationship
     penalties = relationship("Penalty", back_populates="attendance_log", cascade="all, delete-orphan")
     bonuses = relationship("Bonus", back_populates="attendance_log", cascade="all, delete-orphan")
 
 
+    @validates("clock_in")
+    def _set_work_day(self, key, value):
+        """
+        Keep work_day in step with clock_in whenever clock_in is assigned.
+        """
+        self.work_day = work_day_for(value) if value else None
+        return value
+
     def calculate_total_hours(self):
         """
         Calculate total hours worked based on clock_in and clock_out.
@@ -89,22 +152,13 @@ class AttendanceLog(Base):
         If the employee clocked in later than the opening time, calculate the late duration
         and deduction. Otherwise, remove any existing late record.
         """
-        restaurant_hours = db.query(RestaurantHours).first()
+        restaurant_hours = get_restaurant_hours(db)
         if restaurant_hours and self.clock_in:
-            clock_in_time = self.clock_in.time()
-            opening_time = restaurant_hours.opening_time
+            lateness = calculate_lateness(self.clock_in, restaurant_hours.opening_time, self.employee.hourly_wage)
 
-            if clock_in_time > opening_time:
+            if lateness:
                 self.is_late = True
-                late_duration = datetime.combine(datetime.min, clock_in_time) - datetime.combine(datetime.min, opening_time)
-                late_duration_minutes = Decimal(late_duration.total_seconds() / 60)  # Convert seconds to minutes
-
-                # Fetch employee's hourly wage
-                employee = self.employee
-                hourly_wage = employee.hourly_wage
-
-                # Calculate deduction amount
-                deduction_amount = (hourly_wage / Decimal(60)) * late_duration_minutes
+                late_duration_minutes, deduction_amount = lateness
 
                 if self.late_record:
                     # Update existing record if present
@@ -139,27 +193,59 @@ class AttendanceLog(Base):
         - Minus late deductions and penalties
         - Plus bonuses
         """
-        # 1. Calculate total work hours
-        total_work_hours = self.calculate_total_hours()  # in hours
-
-        # 2. Subtract total break time (assumed to be stored in hours in BreakLog.total_break_time)
-        total_break_hours = sum(
-            float(b.total_break_time) for b in self.break_logs if b.total_break_time is not None
+        # Imported here because the payroll engine itself imports the models
+        from app import payroll
+
+        row = payroll.row_from_attendance(self)
+        if not self.clock_out:
+            # An open shift has no worked hours yet
+            row = row._replace(clock_out=self.clock_in)
+
+        return round(payroll.compute_pay(row).net_pay, 2)
+
+
+def clock_in_statement(dialect_name: str, employee_id: int, clock_in: datetime):
+    """
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING that creates an attendance
+    record for the employee, but only if the employee exists and has no record for
+    the work day of `clock_in` yet. The unique (employee_id, work_day) index makes
+    concurrent scans of the same badge insert exactly one row.
+    Returns no row when nothing was inserted.
+    """
+    # Imported here because app.models.employee imports this module
+    from app.models.employee import Employee
+
+    dialect_insert = sqlite_insert if dialect_name == "sqlite" else postgresql_insert
+    return (
+        dialect_insert(AttendanceLog)
+        .from_select(
+            ["employee_id", "clock_in", "work_day", "created_at"],
+            select(
+                Employee.id,
+                literal(clock_in, TIMESTAMP),
+                literal(work_day_for(clock_in), Date),
+                literal(clock_in, TIMESTAMP),
+            ).where(Employee.id == employee_id),
         )
-        effective_hours = total_work_hours - total_break_hours
-
-        # 3. Calculate base pay using the employee's hourly wage
-        base_pay = effective_hours * float(self.employee.hourly_wage)
-
-        # 4. Get total penalty and bonus adjustments
-        total_penalties = sum(float(p.price) for p in self.penalties)
-        total_bonuses = sum(float(b.price) for b in self.bonuses)
-        # Late deduction from LateRecord, if any
-        late_deduction = float(self.late_record.deduction_amount) if self.late_record else 0
-
-        # 5. Calculate net pay:
-        # Net pay = base pay - (late deduction + penalties) + bonuses
-        net_pay = base_pay - late_deduction - total_penalties + total_bonuses
-
-        return round(net_pay, 2)
-
+        .on_conflict_do_nothing(index_elements=["employee_id", "work_day"])
+        .returning(AttendanceLog.id, AttendanceLog.clock_in, AttendanceLog.created_at)
+    )
+
+
+def late_record_statement(attendance_id: int, employee_id: int, late_duration_minutes: Decimal, created_at: datetime):
+    """
+    INSERT ... SELECT that writes a late record, computing the deduction from the
+    employee's hourly wage in the database so no separate wage lookup is needed.
+    """
+    from app.models.employee import Employee
+
+    minutes = literal(late_duration_minutes, Numeric(10, 2))
+    return insert(LateRecord).from_select(
+        ["attendance_id", "late_duration_minutes", "deduction_amount", "created_at"],
+        select(
+            literal(attendance_id, Integer),
+            minutes,
+            Employee.hourly_wage / 60 * minutes,
+            literal(created_at, TIMESTAMP),
+        ).where(Employee.id == employee_id),
+    )
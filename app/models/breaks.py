@@ -1,10 +1,20 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, TIMESTAMP, Numeric, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
 
 class BreakLog(Base):
     __tablename__ = 'break_log'
+    __table_args__ = (
+        # Breaks of an attendance record in order
+        Index("ix_break_log_attendance_id_break_start", "attendance_id", "break_start"),
+        # Ongoing breaks only, for break end and clock-out lookups
+        Index(
+            "ix_break_log_open_breaks", "attendance_id", "break_start",
+            postgresql_where=text("break_end IS NULL"),
+            sqlite_where=text("break_end IS NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     attendance_id = Column(Integer, ForeignKey('attendance_log.id', ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, Date, TIMESTAMP, Numeric, ForeignKey
+from app.database import Base
+from datetime import datetime
+
+class DailyRollup(Base):
+    """
+    Pay totals of one employee for one work day, kept up to date by app.rollup.
+    Open shifts count no worked hours until they are clocked out.
+    """
+    __tablename__ = 'daily_rollups'
+
+    employee_id = Column(Integer, ForeignKey('employees.id', ondelete="CASCADE"), primary_key=True)
+    work_day = Column(Date, primary_key=True)
+    shifts = Column(Integer, nullable=False)
+    worked_hours = Column(Numeric(10, 2), nullable=False)  # Excluding breaks
+    break_hours = Column(Numeric(10, 2), nullable=False)
+    late_minutes = Column(Numeric(10, 2), nullable=False)
+    late_deduction = Column(Numeric(10, 2), nullable=False)
+    penalties = Column(Numeric(10, 2), nullable=False)
+    bonuses = Column(Numeric(10, 2), nullable=False)
+    net_pay = Column(Numeric(10, 2), nullable=False)
+    updated_at = Column(TIMESTAMP, default=datetime.now, onupdate=datetime.now)
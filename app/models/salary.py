@@ -1,13 +1,72 @@
-from sqlalchemy import Column, Integer, Numeric, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, Numeric, String, TIMESTAMP, Date, ForeignKey
+from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
 
+class PayrollPeriod(Base):
+    """
+    A closed payroll period. Its pay is frozen in salary_log and payroll_period_totals
+    when it is closed, and the attendance it covers can no longer be changed.
+    """
+    __tablename__ = 'payroll_periods'
+
+    id = Column(Integer, primary_key=True, index=True)
+    start_date = Column(Date, nullable=False)  # Shifts whose clock_in falls on start_date..end_date
+    end_date = Column(Date, nullable=False)
+    closed_at = Column(TIMESTAMP, nullable=True)
+    created_at = Column(TIMESTAMP, default=datetime.now)
+
+    salary_logs = relationship("SalaryLog", back_populates="period")
+    totals = relationship("PayrollPeriodTotal", back_populates="period")
+
 class SalaryLog(Base):
+    """
+    Pay of one shift as it was paid out. Payroll history is kept for good: the
+    foreign keys RESTRICT deletes, so an employee or attendance record with
+    salary_log rows can not be deleted (DELETE /employee/{id} answers 409).
+    """
     __tablename__ = 'salary_log'
 
     id = Column(Integer, primary_key=True, index=True)
-    employee_id = Column(Integer, ForeignKey('employees.id'), nullable=False)
-    attendance_id = Column(Integer, ForeignKey('attendance_log.id'), nullable=False)
+    employee_id = Column(Integer, ForeignKey('employees.id', ondelete="RESTRICT"), nullable=False)
+    attendance_id = Column(Integer, ForeignKey('attendance_log.id', ondelete="RESTRICT"), nullable=False, index=True)
     total_hours_worked = Column(Numeric(10, 2), nullable=True)
     total_salary = Column(Numeric(10, 2), nullable=True)
     created_at = Column(TIMESTAMP, default=datetime.now)
+
+    # Snapshot of the shift's pay taken when its payroll period was closed
+    period_id = Column(Integer, ForeignKey('payroll_periods.id'), nullable=True, index=True)
+    clock_in = Column(TIMESTAMP, nullable=True)
+    clock_out = Column(TIMESTAMP, nullable=True)
+    hourly_wage = Column(Numeric(10, 2), nullable=True)
+    break_hours = Column(Numeric(10, 2), nullable=True)
+    hours_excluding_breaks = Column(Numeric(10, 2), nullable=True)
+    late_minutes = Column(Numeric(10, 2), nullable=True)
+    late_deduction = Column(Numeric(10, 2), nullable=True)
+    penalties = Column(Numeric(10, 2), nullable=True)
+    bonuses = Column(Numeric(10, 2), nullable=True)
+    net_pay = Column(Numeric(10, 2), nullable=True)
+
+    period = relationship("PayrollPeriod", back_populates="salary_logs")
+
+class PayrollPeriodTotal(Base):
+    """
+    Per-employee totals of a closed payroll period. Like salary_log, they keep their employee from being deleted.
+    """
+    __tablename__ = 'payroll_period_totals'
+
+    period_id = Column(Integer, ForeignKey('payroll_periods.id'), primary_key=True)
+    employee_id = Column(Integer, ForeignKey('employees.id', ondelete="RESTRICT"), primary_key=True)
+    employee_name = Column(String(100), nullable=False)  # Name at closing time
+    shifts = Column(Integer, nullable=False)
+    total_hours = Column(Numeric(10, 2), nullable=False)
+    break_hours = Column(Numeric(10, 2), nullable=False)
+    hours_excluding_breaks = Column(Numeric(10, 2), nullable=False)
+    total_wage = Column(Numeric(10, 2), nullable=False)
+    late_minutes = Column(Numeric(10, 2), nullable=False)
+    late_deduction = Column(Numeric(10, 2), nullable=False)
+    penalties = Column(Numeric(10, 2), nullable=False)
+    bonuses = Column(Numeric(10, 2), nullable=False)
+    net_pay = Column(Numeric(10, 2), nullable=False)
+
+    period = relationship("PayrollPeriod", back_populates="totals")
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+class TableVersion(Base):
+    """
+    How many committed transactions have written to a table; the list ETags are built from it (see app.etag).
+    """
+    __tablename__ = 'table_versions'
+
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Task filter and weekly report lookups
+        Index("ix_tasks_employee_id_task_date", "employee_id", "task_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     description = Column(String, nullable=False)
@@ -0,0 +1,339 @@
+"""
+Payroll engine shared by every pay endpoint.
+
+Pay is computed from plain columns (timestamps, hourly wage and adjustment totals)
+instead of ORM objects, so a single attendance record and a yearly run over
+hundreds of thousands of records go through the same code path.
+
+pay_statement() computes the same figures in the database, so queries can select,
+filter and sort attendance records by worked hours, break hours or net pay.
+
+Shifts of closed payroll periods are paid at the hourly wage frozen in their
+salary_log snapshot, not at the employee's current wage. Everything else a
+closed shift's pay depends on can no longer change (see app.payroll_periods), so
+every endpoint reports the same pay for it as the snapshot.
+"""
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import Float, and_, case, cast, func, literal, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.models.attendance import AttendanceLog, LateRecord, Penalty, Bonus
+from app.models.breaks import BreakLog
+from app.models.employee import Employee
+from app.models.salary import SalaryLog
+
+
+# One attendance record reduced to the columns its pay depends on
+PayrollRow = namedtuple("PayrollRow", [
+    "attendance_id",
+    "employee_id",
+    "clock_in",
+    "clock_out",
+    "hourly_wage",
+    "break_hours",
+    "late_minutes",
+    "late_deduction",
+    "penalties",
+    "bonuses",
+])
+
+# Computed pay for one attendance record (unrounded; routes round for display)
+Pay = namedtuple("Pay", [
+    "attendance_id",
+    "employee_id",
+    "total_hours",
+    "break_hours",
+    "hours_excluding_breaks",
+    "total_wage",
+    "late_minutes",
+    "late_deduction",
+    "penalties",
+    "bonuses",
+    "net_pay",
+])
+
+
+def break_hours(break_start, break_end):
+    """
+    Duration of a completed break in hours. Ongoing breaks count as zero.
+    """
+    if break_start and break_end:
+        return (break_end - break_start).total_seconds() / 3600
+    return 0
+
+
+def compute_batch(rows, now=None):
+    """
+    Compute pay for a batch of PayrollRow tuples in a single pass.
+
+    Open shifts (no clock_out) are counted up to `now`, which defaults to the
+    current time and is read once for the whole batch.
+    """
+    now = now or datetime.now()
+    results = []
+    append = results.append
+    for (attendance_id, employee_id, clock_in, clock_out, hourly_wage,
+         breaks, late_minutes, late_deduction, penalties, bonuses) in rows:
+        if clock_in:
+            total_hours = ((clock_out or now) - clock_in).total_seconds() / 3600
+        else:
+            total_hours = 0
+        hours_excluding_breaks = max(0, total_hours - breaks)
+        total_wage = hours_excluding_breaks * hourly_wage
+        net_pay = total_wage - (late_deduction + penalties) + bonuses
+        append(Pay(
+            attendance_id, employee_id, total_hours, breaks, hours_excluding_breaks,
+            total_wage, late_minutes, late_deduction, penalties, bonuses, net_pay,
+        ))
+    return results
+
+
+def compute_pay(row, now=None):
+    """
+    Compute pay for a single PayrollRow.
+    """
+    return compute_batch((row,), now)[0]
+
+
+def row_from_attendance(attendance, hourly_wage=None):
+    """
+    Reduce a loaded AttendanceLog to a PayrollRow.
+
+    Reads the break_logs, late_record, penalties and bonuses relationships, so
+    eager-load them when converting more than one record. `hourly_wage` overrides
+    the wage of the related employee when the caller already has it.
+    """
+    if hourly_wage is None:
+        employee = attendance.employee
+        hourly_wage = employee.hourly_wage if employee else 0
+    late_record = attendance.late_record
+    return PayrollRow(
+        attendance.id,
+        attendance.employee_id,
+        attendance.clock_in,
+        attendance.clock_out,
+        float(hourly_wage or 0),
+        sum(break_hours(br.break_start, br.break_end) for br in attendance.break_logs),
+        float(late_record.late_duration_minutes) if late_record else 0,
+        float(late_record.deduction_amount) if late_record else 0,
+        sum(float(p.price) for p in attendance.penalties),
+        sum(float(b.price) for b in attendance.bonuses),
+    )
+
+
+class hours_between(FunctionElement):
+    """
+    SQL expression for the number of hours between two timestamps.
+    """
+    type = Float()
+    name = "hours_between"
+    inherit_cache = True
+
+
+@compiles(hours_between)
+def _hours_between_postgresql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "EXTRACT(EPOCH FROM (%s - %s)) / 3600" % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+@compiles(hours_between, "sqlite")
+def _hours_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "(julianday(%s) - julianday(%s)) * 24" % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+class greatest(FunctionElement):
+    """
+    SQL expression for the largest of its arguments.
+    """
+    type = Float()
+    name = "greatest"
+    inherit_cache = True
+
+
+@compiles(greatest)
+def _greatest_postgresql(element, compiler, **kw):
+    return "GREATEST(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(greatest, "sqlite")
+def _greatest_sqlite(element, compiler, **kw):
+    # SQLite's multi-argument MAX() is its scalar GREATEST
+    return "MAX(%s)" % compiler.process(element.clauses, **kw)
+
+
+def rows_statement(*criteria, frozen_wages=True):
+    """
+    Select statement producing PayrollRow columns for every attendance record matching `criteria`.
+
+    The late records, penalties, bonuses and completed breaks are aggregated per
+    attendance record in the database, so the statement returns exactly one row
+    per attendance record and can be streamed with a server-side cursor. With
+    criteria, the aggregates only read the rows of matching attendance records.
+    The hourly wage of a closed-period shift comes from its salary_log snapshot,
+    unless `frozen_wages` is False (schemas without the snapshot columns yet).
+    Ordered by clock_in; callers can replace the ordering with order_by(None).
+    """
+    def of_matching(attendance_id):
+        # Aggregate only the rows of matching records instead of whole tables
+        if not criteria:
+            return []
+        matching_ids = (
+            select(AttendanceLog.id)
+            .join(Employee, Employee.id == AttendanceLog.employee_id)
+            .where(*criteria)
+        )
+        return [attendance_id.in_(matching_ids)]
+
+    breaks = (
+        select(
+            BreakLog.attendance_id,
+            func.sum(hours_between(BreakLog.break_start, BreakLog.break_end)).label("hours"),
+        )
+        .where(
+            BreakLog.break_start.isnot(None),
+            BreakLog.break_end.isnot(None),
+            *of_matching(BreakLog.attendance_id),
+        )
+        .group_by(BreakLog.attendance_id)
+        .subquery()
+    )
+    late = (
+        select(
+            LateRecord.attendance_id,
+            func.sum(LateRecord.late_duration_minutes).label("minutes"),
+            func.sum(LateRecord.deduction_amount).label("amount"),
+        )
+        .where(*of_matching(LateRecord.attendance_id))
+        .group_by(LateRecord.attendance_id)
+        .subquery()
+    )
+    penalties = (
+        select(Penalty.attendance_id, func.sum(Penalty.price).label("amount"))
+        .where(*of_matching(Penalty.attendance_id))
+        .group_by(Penalty.attendance_id)
+        .subquery()
+    )
+    bonuses = (
+        select(Bonus.attendance_id, func.sum(Bonus.price).label("amount"))
+        .where(*of_matching(Bonus.attendance_id))
+        .group_by(Bonus.attendance_id)
+        .subquery()
+    )
+
+    hourly_wage = Employee.hourly_wage
+    if frozen_wages:
+        hourly_wage = func.coalesce(SalaryLog.hourly_wage, Employee.hourly_wage)
+
+    statement = (
+        select(
+            AttendanceLog.id,
+            AttendanceLog.employee_id,
+            AttendanceLog.clock_in,
+            AttendanceLog.clock_out,
+            hourly_wage.label("hourly_wage"),
+            breaks.c.hours.label("break_hours"),
+            late.c.minutes.label("late_minutes"),
+            late.c.amount.label("late_deduction"),
+            penalties.c.amount.label("penalties"),
+            bonuses.c.amount.label("bonuses"),
+        )
+        .join(Employee, Employee.id == AttendanceLog.employee_id)
+    )
+    if frozen_wages:
+        # Snapshot rows of closed periods; legacy salary_log rows have no period
+        statement = statement.outerjoin(
+            SalaryLog, and_(SalaryLog.attendance_id == AttendanceLog.id, SalaryLog.period_id.isnot(None))
+        )
+    return (
+        statement
+        .outerjoin(breaks, breaks.c.attendance_id == AttendanceLog.id)
+        .outerjoin(late, late.c.attendance_id == AttendanceLog.id)
+        .outerjoin(penalties, penalties.c.attendance_id == AttendanceLog.id)
+        .outerjoin(bonuses, bonuses.c.attendance_id == AttendanceLog.id)
+        .where(*criteria)
+        .order_by(AttendanceLog.clock_in, AttendanceLog.id)
+    )
+
+
+def pay_statement(*criteria, now=None):
+    """
+    Select statement computing the Pay fields in the database for every attendance record matching `criteria`.
+
+    Same figures as compute_batch() over rows_statement(), one row per attendance
+    record, with columns named after the Pay fields. Open shifts are counted up
+    to `now` (default: the current time). Use it as a subquery to filter, sort or
+    join on pay:
+
+        pay = pay_statement(AttendanceLog.employee_id == 1).subquery()
+        select(pay.c.attendance_id, pay.c.net_pay).order_by(pay.c.net_pay.desc())
+    """
+    now = now or datetime.now()
+    rows = rows_statement(*criteria).order_by(None).subquery("payroll_rows")
+
+    total_hours = case(
+        (rows.c.clock_in.is_(None), 0.0),
+        else_=hours_between(rows.c.clock_in, func.coalesce(rows.c.clock_out, literal(now))),
+    )
+    break_hours = func.coalesce(rows.c.break_hours, 0.0)
+    hours_excluding_breaks = greatest(total_hours - break_hours, 0.0)
+    total_wage = hours_excluding_breaks * cast(func.coalesce(rows.c.hourly_wage, 0), Float)
+    late_minutes = cast(func.coalesce(rows.c.late_minutes, 0), Float)
+    late_deduction = cast(func.coalesce(rows.c.late_deduction, 0), Float)
+    penalties = cast(func.coalesce(rows.c.penalties, 0), Float)
+    bonuses = cast(func.coalesce(rows.c.bonuses, 0), Float)
+
+    return select(
+        rows.c.id.label("attendance_id"),
+        rows.c.employee_id,
+        total_hours.label("total_hours"),
+        break_hours.label("break_hours"),
+        hours_excluding_breaks.label("hours_excluding_breaks"),
+        total_wage.label("total_wage"),
+        late_minutes.label("late_minutes"),
+        late_deduction.label("late_deduction"),
+        penalties.label("penalties"),
+        bonuses.label("bonuses"),
+        (total_wage - (late_deduction + penalties) + bonuses).label("net_pay"),
+    )
+
+
+def to_row(columns):
+    """
+    Convert one result row of rows_statement() into a PayrollRow.
+    """
+    (attendance_id, employee_id, clock_in, clock_out, hourly_wage,
+     breaks, late_minutes, late_amount, penalty_amount, bonus_amount) = columns[:10]
+    return PayrollRow(
+        attendance_id,
+        employee_id,
+        clock_in,
+        clock_out,
+        float(hourly_wage or 0),
+        float(breaks or 0),
+        float(late_minutes or 0),
+        float(late_amount or 0),
+        float(penalty_amount or 0),
+        float(bonus_amount or 0),
+    )
+
+
+def load_rows(db: Session, *criteria):
+    """
+    Load a PayrollRow for every attendance record matching `criteria`.
+
+    Runs a single set-based query however many records match. Rows are plain
+    tuples and never enter the session's identity map.
+    """
+    return [to_row(columns) for columns in db.execute(rows_statement(*criteria))]
+
+
+def to_pay(columns):
+    """
+    Convert one result row of pay_statement() into a Pay.
+    """
+    attendance_id, employee_id, *amounts = columns[:11]
+    return Pay(attendance_id, employee_id, *(float(amount) for amount in amounts))
@@ -0,0 +1,284 @@
+"""
+Closing payroll periods.
+
+Closing a period computes the pay of every shift in it once, in bulk, and freezes
+the result: one salary_log row per attendance record and one payroll_period_totals
+row per employee. Reads of a closed period are served from those snapshot rows
+only, so later wage edits or recomputation can no longer change past pay.
+
+Attendance covered by a closed period becomes immutable. A flush that adds,
+changes or deletes such a record, or its breaks, late record, penalties or
+bonuses, or that touches the snapshot rows themselves, raises PeriodClosedError.
+The check compares the touched clock-ins with the closed periods cached in
+closed_periods_cache and only queries salary_log for records it knows nothing
+but the id of, and only when that id is old enough to be in a closed period.
+Everyday writes to open periods therefore run no extra statement. Periods are
+never reopened; another worker may accept changes to a period for up to the
+cache TTL after it was closed.
+"""
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import event, func, inspect, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app import payroll
+from app.cache import TTLCache
+from app.models.attendance import AttendanceLog, LateRecord, Penalty, Bonus
+from app.models.breaks import BreakLog
+from app.models.employee import Employee
+from app.models.salary import PayrollPeriod, PayrollPeriodTotal, SalaryLog
+
+# Rows fetched from the server-side cursor per round trip while closing
+CLOSE_CHUNK_SIZE = 2000
+
+# Pay fields summed into the per-employee totals
+TOTAL_FIELDS = [
+    "total_hours",
+    "break_hours",
+    "hours_excluding_breaks",
+    "total_wage",
+    "late_minutes",
+    "late_deduction",
+    "penalties",
+    "bonuses",
+    "net_pay",
+]
+
+
+# Closed periods as (start_date, end_date) pairs, and the newest attendance record
+# frozen in any of them; records created later can not belong to a closed period
+ClosedPeriods = namedtuple("ClosedPeriods", ["ranges", "last_attendance_id"])
+
+# Periods are closed about once a month and never reopened
+closed_periods_cache = TTLCache(ttl=60, maxsize=1)
+
+
+class PeriodClosedError(HTTPException):
+    def __init__(self, detail="This record belongs to a closed payroll period and can no longer be changed"):
+        super().__init__(status_code=409, detail=detail)
+
+
+def period_bounds(start: date, end: date):
+    """
+    Clock-in range covered by a period: from the start of start to the end of end.
+    """
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+
+def find_closed_period(db: Session, start: date, end: date):
+    """
+    The closed period covering exactly start..end, or None.
+    """
+    return db.execute(
+        select(PayrollPeriod).where(
+            PayrollPeriod.start_date == start,
+            PayrollPeriod.end_date == end,
+            PayrollPeriod.closed_at.isnot(None),
+        )
+    ).scalar()
+
+
+def closed_periods(db: Session):
+    """
+    The closed periods as ClosedPeriods, oldest first, from closed_periods_cache when fresh.
+    """
+    closed = closed_periods_cache.get("periods")
+    if closed is None:
+        ranges = db.execute(
+            select(PayrollPeriod.start_date, PayrollPeriod.end_date)
+            .where(PayrollPeriod.closed_at.isnot(None))
+            .order_by(PayrollPeriod.start_date)
+        ).all()
+        last_attendance_id = 0
+        if ranges:
+            last_attendance_id = db.scalar(
+                select(func.max(SalaryLog.attendance_id)).where(SalaryLog.period_id.isnot(None))
+            ) or 0
+        closed = ClosedPeriods([tuple(period) for period in ranges], last_attendance_id)
+        closed_periods_cache.set("periods", closed)
+    return closed
+
+
+def _in_closed_period(day: date, closed: ClosedPeriods):
+    return any(start <= day <= end for start, end in closed.ranges)
+
+
+def _snapshot_record(pay, clock_in, clock_out, hourly_wage, period_id, now):
+    return {
+        "period_id": period_id,
+        "employee_id": pay.employee_id,
+        "attendance_id": pay.attendance_id,
+        "clock_in": clock_in,
+        "clock_out": clock_out,
+        "hourly_wage": hourly_wage,
+        "total_hours_worked": round(pay.total_hours, 2),
+        "break_hours": round(pay.break_hours, 2),
+        "hours_excluding_breaks": round(pay.hours_excluding_breaks, 2),
+        "total_salary": round(pay.total_wage, 2),
+        "late_minutes": round(pay.late_minutes, 2),
+        "late_deduction": round(pay.late_deduction, 2),
+        "penalties": round(pay.penalties, 2),
+        "bonuses": round(pay.bonuses, 2),
+        "net_pay": round(pay.net_pay, 2),
+        "created_at": now,
+    }
+
+
+def close_period(db: Session, start: date, end: date):
+    """
+    Close the payroll period start..end (clock_in dates, inclusive) and snapshot its pay.
+
+    Pay is computed with the payroll engine from one streamed query; the snapshot
+    rows are written with bulk INSERTs. Does not commit. Raises HTTPException when
+    the period is not in the past, overlaps another period or has open shifts.
+    """
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if end >= date.today():
+        raise HTTPException(status_code=400, detail="Only periods that ended before today can be closed")
+
+    overlapping = db.execute(
+        select(PayrollPeriod.id).where(PayrollPeriod.start_date <= end, PayrollPeriod.end_date >= start)
+    ).first()
+    if overlapping:
+        raise HTTPException(status_code=409, detail=f"Overlaps payroll period {overlapping.id}")
+
+    start_datetime, end_datetime = period_bounds(start, end)
+    in_period = (AttendanceLog.clock_in >= start_datetime, AttendanceLog.clock_in < end_datetime)
+
+    open_shifts = db.execute(
+        select(AttendanceLog.id).where(*in_period, AttendanceLog.clock_out.is_(None)).limit(1)
+    ).first()
+    if open_shifts:
+        raise HTTPException(status_code=400, detail="The period still has shifts without a clock-out")
+
+    period = PayrollPeriod(start_date=start, end_date=end)
+    db.add(period)
+    db.flush()
+
+    statement = (
+        payroll.rows_statement(*in_period)
+        .add_columns(Employee.name)
+        .order_by(None)
+        .order_by(AttendanceLog.employee_id, AttendanceLog.clock_in, AttendanceLog.id)
+        .execution_options(yield_per=CLOSE_CHUNK_SIZE)
+    )
+    now = datetime.now()
+    totals = {}
+    for partition in db.execute(statement).partitions():
+        pays = payroll.compute_batch(payroll.to_row(columns) for columns in partition)
+        records = []
+        for columns, pay in zip(partition, pays):
+            records.append(_snapshot_record(pay, columns[2], columns[3], columns[4], period.id, now))
+            employee_totals = totals.get(pay.employee_id)
+            if employee_totals is None:
+                employee_totals = totals[pay.employee_id] = dict.fromkeys(TOTAL_FIELDS, 0)
+                employee_totals.update(employee_name=columns[-1], shifts=0)
+            employee_totals["shifts"] += 1
+            for field in TOTAL_FIELDS:
+                employee_totals[field] += getattr(pay, field)
+        db.execute(insert(SalaryLog), records)
+
+    if totals:
+        db.execute(insert(PayrollPeriodTotal), [
+            {
+                "period_id": period.id,
+                "employee_id": employee_id,
+                "employee_name": employee_totals["employee_name"],
+                "shifts": employee_totals["shifts"],
+                **{field: round(employee_totals[field], 2) for field in TOTAL_FIELDS},
+            }
+            for employee_id, employee_totals in totals.items()
+        ])
+
+    period.closed_at = now
+    db.flush()
+    # Forget the cached periods once this one is committed
+    db.info["closed_period"] = True
+    return period
+
+
+def _attendance_ids(obj):
+    state = inspect(obj)
+    return {
+        attendance_id
+        for attendance_id in (obj.attendance_id, *state.attrs.attendance_id.history.deleted)
+        if attendance_id is not None
+    }
+
+
+def _clock_ins(attendance):
+    state = inspect(attendance)
+    return {clock_in for clock_in in (attendance.clock_in, *state.attrs.clock_in.history.deleted) if clock_in}
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_closed_period_changes(session, flush_context, instances):
+    stored_clock_ins = set()
+    new_clock_ins = set()
+    attendance_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (SalaryLog, PayrollPeriodTotal)) and obj not in session.new:
+            raise PeriodClosedError("Payroll snapshots can not be changed")
+        if isinstance(obj, PayrollPeriod) and obj not in session.new:
+            history = inspect(obj).attrs.closed_at.history
+            if any(closed_at is not None for closed_at in (*history.unchanged, *history.deleted)):
+                raise PeriodClosedError("A closed payroll period can not be reopened or changed")
+        if isinstance(obj, AttendanceLog):
+            history = inspect(obj).attrs.clock_in.history
+            if obj in session.new or history.has_changes():
+                new_clock_ins.update(clock_in for clock_in in history.added if clock_in)
+                stored_clock_ins.update(clock_in for clock_in in history.deleted if clock_in)
+                if obj not in session.new and not history.deleted:
+                    # Moved without its old clock-in loaded
+                    attendance_ids.add(obj.id)
+            elif obj.clock_in:
+                stored_clock_ins.add(obj.clock_in)
+        elif isinstance(obj, (BreakLog, LateRecord, Penalty, Bonus)):
+            for attendance_id in _attendance_ids(obj):
+                # Records loaded in the session tell their clock-in without a query
+                attendance = session.identity_map.get(identity_key(AttendanceLog, attendance_id))
+                if attendance is not None and "clock_in" in attendance.__dict__:
+                    stored_clock_ins.update(_clock_ins(attendance))
+                else:
+                    attendance_ids.add(attendance_id)
+
+    if not (stored_clock_ins or new_clock_ins or attendance_ids):
+        return
+    closed = closed_periods(session)
+    if not closed.ranges:
+        return
+    if any(_in_closed_period(clock_in.date(), closed) for clock_in in stored_clock_ins):
+        raise PeriodClosedError()
+    if any(_in_closed_period(clock_in.date(), closed) for clock_in in new_clock_ins):
+        raise PeriodClosedError("Attendance can not be added to or moved into a closed payroll period")
+
+    attendance_ids = {attendance_id for attendance_id in attendance_ids if attendance_id <= closed.last_attendance_id}
+    if attendance_ids:
+        frozen = session.execute(
+            select(SalaryLog.attendance_id)
+            .where(SalaryLog.attendance_id.in_(attendance_ids), SalaryLog.period_id.isnot(None))
+            .limit(1)
+        ).first()
+        if frozen:
+            raise PeriodClosedError()
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_closed_periods(session):
+    # A released savepoint is not committed; refilling the cache now would read the old periods
+    if session.in_nested_transaction():
+        return
+    if session.info.pop("closed_period", False):
+        closed_periods_cache.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _keep_closed_periods(session, previous_transaction):
+    # close_period() may have run before the savepoint; the outer commit still closes it
+    if previous_transaction.nested:
+        return
+    session.info.pop("closed_period", None)
@@ -0,0 +1,130 @@
+"""
+Connection pools that time how long each checkout waits.
+
+When every connection is checked out, a request blocks in the pool until one is
+returned or pool_timeout expires. That wait is invisible in route latencies and
+in echo_pool logging, so the pools here record it in a histogram with fixed
+buckets. Pre-ping failures (connections found dead on checkout and replaced)
+are counted per engine as well. GET /debug/pool and GET /metrics report them
+next to the pool state, so a load test can tell a pool that is too small from a
+database that is too slow.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram buckets; the last bucket is unbounded
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Failed pre-pings per engine dialect (each engine has its own dialect instance, shared with its pool)
+pre_ping_failures = defaultdict(int)
+
+
+class PoolWaitStats:
+    """
+    Thread-safe histogram of checkout wait times, with the number of checkouts that timed out.
+    """
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(WAIT_BUCKETS) + 1)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = Lock()
+
+    def observe(self, seconds, timed_out=False):
+        bucket = bisect_left(WAIT_BUCKETS, seconds)
+        with self._lock:
+            self.bucket_counts[bucket] += 1
+            self.checkouts += 1
+            self.total_seconds += seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+            if timed_out:
+                self.timeouts += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "total_seconds": self.total_seconds,
+                "max_seconds": self.max_seconds,
+                # Counts per bucket upper bound, not cumulative; "inf" is the overflow bucket
+                "buckets": {
+                    **{str(bound): count for bound, count in zip(WAIT_BUCKETS, self.bucket_counts)},
+                    "inf": self.bucket_counts[-1],
+                },
+            }
+
+
+class _TimedCheckout:
+    """
+    Pool mixin timing _do_get(), the call that waits for a free connection.
+    The time includes opening a new connection when the pool grows into its overflow.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.observe(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep counting into the same histogram
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+@event.listens_for(Engine, "handle_error")
+def _count_pre_ping_failures(exception_context):
+    # Pre-ping errors carry no engine or connection, only the dialect
+    if exception_context.is_pre_ping:
+        pre_ping_failures[exception_context.dialect] += 1
+
+
+def pool_stats(pool):
+    """
+    State of a pool, its failed pre-pings and, for the timed pools, its checkout wait histogram.
+    """
+    stats = {
+        "class": type(pool).__name__,
+        "status": pool.status(),
+        "pre_ping_failures": pre_ping_failures.get(pool._dialect, 0),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool._max_overflow,
+        )
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats["wait"] = wait_stats.as_dict()
+    return stats
@@ -0,0 +1,417 @@
+"""
+Incrementally maintained per-employee, per-work-day pay totals (daily_rollups).
+
+Dashboards and payroll read the rollups instead of aggregating attendance, break,
+late, penalty and bonus rows on every request. The rollups are kept current in
+the transaction that changes their inputs:
+
+- after each flush, the session records which (employee_id, work_day) keys the
+  flushed attendance, break, late, penalty and bonus rows belong to;
+- just before the outermost commit, each of those work days is aggregated on its
+  own with the payroll engine and written with a single INSERT ... ON CONFLICT DO UPDATE.
+
+The totals are absolute, so on Postgres the work days are locked first (see
+_lock_rollup_keys()): otherwise two transactions committing to the same day under
+READ COMMITTED would each aggregate without the other's rows, and the later
+upsert would store a total missing the earlier one's changes.
+
+Breaks, late records, penalties and bonuses only carry an attendance_id. Routes
+pass the owning record's employee and clock_in to track_attendance(), and records
+already loaded in the session are read from the identity map, so the key is only
+queried at commit for records the session knows nothing about. Rows written with
+Core INSERT statements are not seen by the flush hook at all, so routes that
+insert attendance or late records that way must call track_attendance().
+
+A new hourly wage changes the pay of every shift the employee has worked. That is
+too much work for the request that edits the wage, so PUT /employee/{id} runs
+refresh_employee_rollups() as a background task once it has committed. It skips
+work days inside closed payroll periods, whose pay is frozen. Wages changed any
+other way are picked up by `python -m app.rollup rebuild --employee-id N`.
+
+Work days follow work_day_for(clock_in). Open shifts count no worked hours until
+they are clocked out, so a rollup never depends on the time it was computed.
+
+Backfill or verify the table from the command line:
+
+    python -m app.rollup rebuild
+    python -m app.rollup check
+"""
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+import argparse
+import sys
+
+from sqlalchemy import and_, delete, event, inspect, insert, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app import payroll
+from app.models.attendance import AttendanceLog, LateRecord, Penalty, Bonus, WORK_DAY_ROLLOVER, work_day_for
+from app.models.breaks import BreakLog
+from app.models.rollup import DailyRollup
+from app.payroll_periods import closed_periods
+
+# Rows fetched from the server-side cursor per round trip by rebuild and check
+REBUILD_CHUNK_SIZE = 2000
+
+# Summed pay fields of one rollup, in DailyRollup column order
+TOTAL_FIELDS = [
+    "worked_hours",
+    "break_hours",
+    "late_minutes",
+    "late_deduction",
+    "penalties",
+    "bonuses",
+    "net_pay",
+]
+
+RollupKey = namedtuple("RollupKey", ["employee_id", "work_day"])
+
+
+def _day_bounds(work_day: date):
+    start = datetime.combine(work_day, WORK_DAY_ROLLOVER)
+    return start, start + timedelta(days=1)
+
+
+def _new_totals():
+    return dict.fromkeys(["shifts", *TOTAL_FIELDS], 0)
+
+
+def _add_pay(totals, pay):
+    totals["shifts"] += 1
+    totals["worked_hours"] += pay.hours_excluding_breaks
+    totals["break_hours"] += pay.break_hours
+    totals["late_minutes"] += pay.late_minutes
+    totals["late_deduction"] += pay.late_deduction
+    totals["penalties"] += pay.penalties
+    totals["bonuses"] += pay.bonuses
+    totals["net_pay"] += pay.net_pay
+
+
+def _rollup_record(key, totals, now):
+    record = {field: round(totals[field], 2) for field in TOTAL_FIELDS}
+    record.update(employee_id=key.employee_id, work_day=key.work_day, shifts=totals["shifts"], updated_at=now)
+    return record
+
+
+def _closed_row(row):
+    # Open shifts count as zero hours until they are clocked out
+    if row.clock_out is None:
+        return row._replace(clock_out=row.clock_in)
+    return row
+
+
+def _iter_rollups(db: Session, *criteria, frozen_wages=True):
+    """
+    Yield (key, totals) for every work day with attendance matching `criteria`.
+
+    Rows are streamed ordered by employee and clock_in, so work days arrive in
+    order and only the current one is held in memory.
+    """
+    statement = (
+        payroll.rows_statement(*criteria, frozen_wages=frozen_wages)
+        .order_by(None)
+        .order_by(AttendanceLog.employee_id, AttendanceLog.clock_in, AttendanceLog.id)
+        .execution_options(yield_per=REBUILD_CHUNK_SIZE)
+    )
+    current_key = None
+    totals = None
+    for partition in db.execute(statement).partitions():
+        rows = [_closed_row(payroll.to_row(columns)) for columns in partition]
+        for row, pay in zip(rows, payroll.compute_batch(rows)):
+            key = RollupKey(row.employee_id, work_day_for(row.clock_in))
+            if key != current_key:
+                if current_key is not None:
+                    yield current_key, totals
+                current_key = key
+                totals = _new_totals()
+            _add_pay(totals, pay)
+    if current_key is not None:
+        yield current_key, totals
+
+
+def _upsert_rollups(db: Session, records):
+    # One INSERT ... ON CONFLICT DO UPDATE instead of a DELETE and an INSERT
+    dialect_insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else postgresql_insert
+    statement = dialect_insert(DailyRollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=["employee_id", "work_day"],
+        set_={field: statement.excluded[field] for field in ["shifts", *TOTAL_FIELDS, "updated_at"]},
+    )
+    db.execute(statement, records)
+
+
+def _rollup_lock_statement(keys):
+    # Sorted, so transactions refreshing overlapping days take their locks in the same order
+    ordered = sorted(keys)
+    return text(
+        "SELECT pg_advisory_xact_lock(k.employee_id, k.work_day) "
+        "FROM unnest(CAST(:employee_ids AS integer[]), CAST(:work_days AS integer[])) AS k(employee_id, work_day)"
+    ).bindparams(
+        employee_ids=[key.employee_id for key in ordered],
+        work_days=[key.work_day.toordinal() for key in ordered],
+    )
+
+
+def _lock_rollup_keys(db: Session, keys):
+    """
+    Hold a transaction-scoped advisory lock per (employee_id, work_day) until commit.
+
+    A second transaction refreshing the same day waits for the first to commit, and
+    its aggregate, a new statement under READ COMMITTED, then sees both sets of rows.
+    SQLite serialises writing transactions already.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(_rollup_lock_statement(keys))
+
+
+def refresh_rollups(db: Session, keys):
+    """
+    Recompute the rollups of the given (employee_id, work_day) keys in the session's transaction.
+
+    Each work day is aggregated on its own, so the payroll query only reads that
+    day's attendance, and all rollups are written with one upsert. Keys left
+    without attendance lose their row.
+    """
+    keys = {RollupKey(*key) for key in keys if key[1] is not None}
+    if not keys:
+        return
+
+    _lock_rollup_keys(db, keys)
+    now = datetime.now()
+    records = []
+    for key in keys:
+        start, end = _day_bounds(key.work_day)
+        day = _iter_rollups(
+            db,
+            AttendanceLog.employee_id == key.employee_id,
+            AttendanceLog.clock_in >= start,
+            AttendanceLog.clock_in < end,
+        )
+        records.extend(_rollup_record(day_key, totals, now) for day_key, totals in day)
+    if records:
+        _upsert_rollups(db, records)
+
+    emptied = keys - {RollupKey(record["employee_id"], record["work_day"]) for record in records}
+    if emptied:
+        db.execute(delete(DailyRollup).where(or_(*(
+            and_(DailyRollup.employee_id == key.employee_id, DailyRollup.work_day == key.work_day)
+            for key in emptied
+        ))))
+
+
+def _open_period_criteria(db: Session):
+    # Leave out the work days lying wholly inside a closed period; its first and
+    # last work days may hold shifts from outside it, so they are recomputed
+    return [
+        ~and_(AttendanceLog.clock_in >= _day_bounds(start)[0], AttendanceLog.clock_in < _day_bounds(end)[0])
+        for start, end in closed_periods(db).ranges
+    ]
+
+
+def refresh_employee_rollups(db: Session, employee_ids):
+    """
+    Recompute every rollup of `employee_ids` outside closed payroll periods, after a wage change.
+
+    Streams the payroll rows and upserts the rollups in chunks. Does not commit.
+    Returns the number of rollups written.
+    """
+    criteria = [AttendanceLog.employee_id.in_(employee_ids), *_open_period_criteria(db)]
+    now = datetime.now()
+    written = 0
+    batch = []
+    for key, totals in _iter_rollups(db, *criteria):
+        batch.append(_rollup_record(key, totals, now))
+        if len(batch) >= REBUILD_CHUNK_SIZE:
+            _upsert_rollups(db, batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        _upsert_rollups(db, batch)
+        written += len(batch)
+    return written
+
+
+def refresh_rollups_for_wage_change(employee_id: int):
+    """
+    Background task for PUT /employee/{id}: refresh_employee_rollups() in its own session.
+    """
+    from app.database import SessionLocal
+    with SessionLocal() as db:
+        refresh_employee_rollups(db, [employee_id])
+        db.commit()
+
+
+def rebuild_rollups(db: Session, employee_ids=None, frozen_wages=True):
+    """
+    Recompute the rollups of every employee (or only `employee_ids`) from scratch.
+
+    Meant for backfills; does not commit. Returns the number of rollups written.
+    `frozen_wages` is passed on to payroll.rows_statement().
+    """
+    criteria = [] if employee_ids is None else [AttendanceLog.employee_id.in_(employee_ids)]
+    if employee_ids is None:
+        db.execute(delete(DailyRollup))
+    else:
+        db.execute(delete(DailyRollup).where(DailyRollup.employee_id.in_(employee_ids)))
+
+    now = datetime.now()
+    written = 0
+    batch = []
+    for key, totals in _iter_rollups(db, *criteria, frozen_wages=frozen_wages):
+        batch.append(_rollup_record(key, totals, now))
+        if len(batch) >= REBUILD_CHUNK_SIZE:
+            db.execute(insert(DailyRollup), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(DailyRollup), batch)
+        written += len(batch)
+    return written
+
+
+def check_rollups(db: Session, employee_ids=None):
+    """
+    Compare the stored rollups with freshly computed ones.
+
+    Returns a list of (key, stored, expected) mismatches, where either side is
+    None when the row is missing. Amounts are compared at two decimal places.
+    """
+    stored_query = select(DailyRollup.employee_id, DailyRollup.work_day, DailyRollup.shifts,
+                          *(getattr(DailyRollup, field) for field in TOTAL_FIELDS))
+    criteria = []
+    if employee_ids is not None:
+        stored_query = stored_query.where(DailyRollup.employee_id.in_(employee_ids))
+        criteria.append(AttendanceLog.employee_id.in_(employee_ids))
+
+    stored = {}
+    for employee_id, work_day, shifts, *amounts in db.execute(stored_query):
+        record = {"shifts": shifts}
+        record.update((field, round(float(amount), 2)) for field, amount in zip(TOTAL_FIELDS, amounts))
+        stored[RollupKey(employee_id, work_day)] = record
+
+    mismatches = []
+    for key, totals in _iter_rollups(db, *criteria):
+        expected = _rollup_record(key, totals, None)
+        expected = {field: expected[field] for field in ["shifts", *TOTAL_FIELDS]}
+        actual = stored.pop(key, None)
+        if actual is None or any(abs(actual[field] - expected[field]) > 0.005 for field in expected):
+            mismatches.append((key, actual, expected))
+    mismatches.extend((key, actual, None) for key, actual in stored.items())
+    return mismatches
+
+
+def _tracked(session: Session):
+    return session.info.setdefault("rollup_changes", {"keys": set(), "attendance_ids": set(), "attendance_keys": {}})
+
+
+def track_attendance(session: Session, attendance_id: int, employee_id: int, clock_in: datetime):
+    """
+    Refresh the rollup of the work day of `attendance_id` when the session commits.
+
+    Needed after Core INSERT/UPDATE statements, which the flush hook does not see.
+    Routes that flush breaks, late records, penalties or bonuses of a record they
+    have not loaded call it too, so the record's key is not queried at commit.
+    """
+    key = RollupKey(employee_id, work_day_for(clock_in))
+    changes = _tracked(session)
+    changes["keys"].add(key)
+    changes["attendance_keys"][attendance_id] = key
+
+
+def _attendance_keys(attendance):
+    state = inspect(attendance)
+    employee_ids = {attendance.employee_id, *state.attrs.employee_id.history.deleted}
+    clock_ins = {attendance.clock_in, *state.attrs.clock_in.history.deleted}
+    return {
+        RollupKey(employee_id, work_day_for(clock_in))
+        for employee_id in employee_ids
+        for clock_in in clock_ins
+        if employee_id is not None and clock_in is not None
+    }
+
+
+def _loaded_attendance_key(session: Session, attendance_id: int):
+    # The key of an attendance record already in the session, without loading anything
+    attendance = session.identity_map.get(identity_key(AttendanceLog, attendance_id))
+    if attendance is None or not {"employee_id", "clock_in"} <= attendance.__dict__.keys():
+        return None
+    return RollupKey(attendance.employee_id, work_day_for(attendance.clock_in))
+
+
+@event.listens_for(Session, "after_flush")
+def _record_rollup_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, AttendanceLog):
+            _tracked(session)["keys"].update(_attendance_keys(obj))
+        elif isinstance(obj, (BreakLog, LateRecord, Penalty, Bonus)):
+            state = inspect(obj)
+            for attendance_id in (obj.attendance_id, *state.attrs.attendance_id.history.deleted):
+                if attendance_id is None:
+                    continue
+                key = _loaded_attendance_key(session, attendance_id)
+                if key is None:
+                    _tracked(session)["attendance_ids"].add(attendance_id)
+                else:
+                    _tracked(session)["keys"].add(key)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_tracked_rollups(session):
+    # Also fired when a savepoint is released; the changes stay tracked for the outer commit
+    if session.in_nested_transaction():
+        return
+    # Flush here so changes still pending at commit are tracked too
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    changes = session.info.pop("rollup_changes", None)
+    if not changes:
+        return
+
+    keys = changes["keys"]
+    unknown_ids = changes["attendance_ids"] - changes["attendance_keys"].keys()
+    if unknown_ids:
+        keys.update(
+            RollupKey(employee_id, work_day_for(clock_in))
+            for employee_id, clock_in in session.execute(
+                select(AttendanceLog.employee_id, AttendanceLog.clock_in)
+                .where(AttendanceLog.id.in_(unknown_ids))
+            )
+        )
+    refresh_rollups(session, keys)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rollup_changes(session, previous_transaction):
+    # Keys flushed before a rolled-back savepoint (events/batch) still need their refresh
+    if previous_transaction.nested:
+        return
+    session.info.pop("rollup_changes", None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify the daily_rollups table.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--employee-id", type=int, action="append", dest="employee_ids",
+                        help="Limit to this employee (repeatable)")
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            written = rebuild_rollups(db, args.employee_ids)
+            db.commit()
+            print(f"Rebuilt {written} daily rollups")
+            return 0
+
+        mismatches = check_rollups(db, args.employee_ids)
+        for key, actual, expected in mismatches:
+            print(f"employee {key.employee_id} on {key.work_day}: stored {actual}, expected {expected}")
+        print(f"{len(mismatches)} mismatched daily rollups")
+        return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
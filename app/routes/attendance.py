@@ -1,18 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
-from app.database import get_db
-from app.models.attendance import AttendanceLog
+from app.database import SessionLocal, get_db
+from app.etag import conditional_get
+from app.models.attendance import AttendanceLog, calculate_late_minutes, clock_in_statement, late_record_statement
+from app.cache import get_restaurant_hours
+from app.live import publish_attendance_status
+from app.rollup import track_attendance
 from app.models.employee import Employee
 from app.schemas.attendance import Attendance, ClockOutRequest, ClockInRequest
-from app.schemas.breaks import UpdateBreaksRequest
-from datetime import datetime, date
 from app.models.breaks import BreakLog
-from sqlalchemy.orm import joinedload
+from app import payroll
+from app.serialization import STREAM_CHUNK_SIZE, json_response, ndjson_lines, ndjson_response, wants_ndjson
+from sqlalchemy.orm import joinedload, selectinload
 import logging
-import pytz  # For timezone conversion
-from sqlalchemy import extract
-import math
+from sqlalchemy import func, select, tuple_
+from collections import defaultdict
+import base64
 from math import ceil
 from datetime import datetime, date, timedelta
 
@@ -22,13 +27,94 @@ logger = logging.getLogger('uvicorn.error')
 
 router = APIRouter()
 
-@router.get("/attendance", response_model=List[Attendance])
-def get_employee_attendance(db: Session = Depends(get_db)):
-    db_attendance = db.query(AttendanceLog).all()
+@router.get("/attendance", response_model=List[Attendance], dependencies=[conditional_get("attendance_log", "break_log", "employees")])
+def get_employee_attendance(request: Request, response: Response, db: Session = Depends(get_db)):
+    """
+    Get every attendance record with the employee's name, wage and breaks.
+    Runs two queries (pay rows and breaks) and serialises the result with orjson.
+    With `Accept: application/x-ndjson` the records are streamed, one JSON object per line.
+    """
+    if wants_ndjson(request):
+        return ndjson_response(_iter_attendance_ndjson(), response)
 
-    if not db_attendance:
+    rows = db.execute(_attendance_list_statement()).all()
+
+    if not rows:
         raise HTTPException(status_code=404, detail="Attendance not found")
-    return db_attendance
+
+    # Breaks of every record in one query
+    breaks_by_attendance = _breaks_by_attendance(db)
+
+    return json_response(_attendance_list_records(rows, breaks_by_attendance), response)
+
+
+def _attendance_list_statement():
+    return payroll.rows_statement().add_columns(Employee.name, AttendanceLog.total_hours, AttendanceLog.created_at)
+
+
+def _breaks_by_attendance(db: Session, *criteria):
+    breaks_by_attendance = defaultdict(list)
+    break_rows = db.execute(
+        select(BreakLog.attendance_id, BreakLog.break_type, BreakLog.break_start, BreakLog.break_end,
+               BreakLog.total_break_time)
+        .where(*criteria)
+        .order_by(BreakLog.attendance_id, BreakLog.break_start)
+    )
+    for br in break_rows:
+        breaks_by_attendance[br.attendance_id].append({
+            "attendance_id": br.attendance_id,
+            "break_type": br.break_type,
+            "break_start": br.break_start,
+            "break_end": br.break_end,
+            "total_break_time": br.total_break_time,
+        })
+    return breaks_by_attendance
+
+
+def _attendance_list_records(rows, breaks_by_attendance, now=None):
+    """
+    Build GET /attendance records from _attendance_list_statement() rows.
+    """
+    pays = payroll.compute_batch((payroll.to_row(columns) for columns in rows), now)
+
+    attendance_records = []
+    for columns, pay in zip(rows, pays):
+        employee_name, total_hours, created_at = columns[10:]
+        attendance_records.append({
+            "employee_id": pay.employee_id,
+            "clock_in": columns.clock_in,
+            "clock_out": columns.clock_out,
+            "total_hours": total_hours,
+            "id": pay.attendance_id,
+            "employee_name": employee_name,
+            "total_hours_excluding_breaks": round(pay.hours_excluding_breaks, 2),
+            "total_wage": round(pay.total_wage, 2),
+            "break_logs": breaks_by_attendance.get(pay.attendance_id, []),
+            "created_at": created_at,
+        })
+    return attendance_records
+
+
+def _iter_attendance_ndjson():
+    """
+    Yield GET /attendance records as NDJSON chunks.
+
+    Attendance rows come through a server-side cursor and the breaks are loaded per
+    chunk, so memory stays flat however long the history is. Uses its own session
+    because the response body is produced after the request's dependencies have
+    been cleaned up.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        statement = _attendance_list_statement().execution_options(yield_per=STREAM_CHUNK_SIZE)
+        for partition in db.execute(statement).partitions():
+            breaks_by_attendance = _breaks_by_attendance(
+                db, BreakLog.attendance_id.in_([columns.id for columns in partition])
+            )
+            yield ndjson_lines(_attendance_list_records(partition, breaks_by_attendance, now))
+    finally:
+        db.close()
 
 
 @router.get("/get/attendance/{attendance_id}")
@@ -37,60 +123,20 @@ def get_attendance_by_id(attendance_id: int, db: Session = Depends(get_db)):
     Fetch attendance record by ID and calculate related details.
     Assumes all datetime values in the database are in KST.
     """
-    from sqlalchemy.orm import joinedload
-    # Fetch attendance record by ID and eagerly load necessary relationships.
-    attendance = db.query(AttendanceLog).options(
+    # Work hours, break time and pay adjustments are computed by the database
+    pay = payroll.pay_statement(AttendanceLog.id == attendance_id).subquery()
+
+    # Fetch attendance record by ID with its pay and eagerly load the listed relationships.
+    row = db.query(AttendanceLog, *pay.c).options(
         joinedload(AttendanceLog.break_logs),
         joinedload(AttendanceLog.penalties),
         joinedload(AttendanceLog.bonuses),
-        joinedload(AttendanceLog.late_record),
         joinedload(AttendanceLog.employee)
-    ).filter(AttendanceLog.id == attendance_id).first()
+    ).join(pay, pay.c.attendance_id == AttendanceLog.id).filter(AttendanceLog.id == attendance_id).first()
 
-    if not attendance:
+    if not row:
         raise HTTPException(status_code=404, detail="Attendance record not found")
-
-    # Initialize totals
-    total_work_hours = 0
-    total_break_time = 0
-    total_hours_excluding_breaks = 0
-    total_wage = 0
-
-    # Calculate totals if clock_in is available
-    if attendance.clock_in:
-        clock_in = attendance.clock_in
-        clock_out = attendance.clock_out or datetime.now()  # Use current time if clock_out is missing
-
-        # Calculate total work hours
-        total_work_hours = (clock_out - clock_in).total_seconds() / 3600  # Convert seconds to hours
-
-        # Calculate total break time (summing all completed breaks)
-        total_break_time = sum(
-            (
-                (br.break_end - br.break_start).total_seconds() / 3600
-                for br in attendance.break_logs
-                if br.break_start and br.break_end
-            ),
-            0
-        )
-
-        # Calculate effective working hours (excluding breaks)
-        total_hours_excluding_breaks = max(0, total_work_hours - total_break_time)
-
-        # Calculate base wage using the employee's hourly wage
-        hourly_wage = float(attendance.employee.hourly_wage) if attendance.employee and attendance.employee.hourly_wage else 0
-        total_wage = total_hours_excluding_breaks * hourly_wage
-
-    # Calculate adjustments for net pay:
-    late_deduction = float(attendance.late_record.deduction_amount) if attendance.late_record else 0
-    total_penalties = sum(float(p.price) for p in attendance.penalties) if attendance.penalties else 0
-    total_bonuses = sum(float(b.price) for b in attendance.bonuses) if attendance.bonuses else 0
-
-    # Calculate total late minutes if available
-    total_late_minutes = attendance.late_record.late_duration_minutes if attendance.late_record and hasattr(attendance.late_record, "late_duration_minutes") else 0
-
-    # Compute net pay: base wage minus deductions and penalties, plus bonuses
-    net_pay = (total_wage - (late_deduction + total_penalties)) + total_bonuses
+    attendance, pay = row[0], payroll.to_pay(row[1:])
 
     # Calculate total break count
     total_breaks = len([br for br in attendance.break_logs if br.break_start and br.break_end])
@@ -103,16 +149,16 @@ def get_attendance_by_id(attendance_id: int, db: Session = Depends(get_db)):
         "clock_in": attendance.clock_in,
         "clock_out": attendance.clock_out,
         "has_clocked_out": attendance.clock_out is not None,
-        "total_hours": round(total_work_hours, 2),
-        "total_hours_excluding_breaks": round(total_hours_excluding_breaks, 2),
-        "total_wage": round(total_wage, 2),
-        "total_break_time": round(total_break_time, 2),
+        "total_hours": round(pay.total_hours, 2),
+        "total_hours_excluding_breaks": round(pay.hours_excluding_breaks, 2),
+        "total_wage": round(pay.total_wage, 2),
+        "total_break_time": round(pay.break_hours, 2),
         "total_breaks": total_breaks,
-        "total_penalties": total_penalties,
-        "total_bonus": total_bonuses,
-        "total_late_price": late_deduction,
-        "total_late_minutes": total_late_minutes,  # New field added here
-        "net_pay": round(net_pay, 2),
+        "total_penalties": pay.penalties,
+        "total_bonus": pay.bonuses,
+        "total_late_price": pay.late_deduction,
+        "total_late_minutes": pay.late_minutes,
+        "net_pay": round(pay.net_pay, 2),
         "break_logs": [
             {
                 "id": br.id,
@@ -151,16 +197,75 @@ def get_attendance_by_id(attendance_id: int, db: Session = Depends(get_db)):
 
 
 
+def encode_attendance_cursor(attendance):
+    """
+    Encode the (clock_in, id) position of an attendance record as an opaque pagination cursor.
+    """
+    raw = f"{attendance.clock_in.isoformat()}|{attendance.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_attendance_cursor(cursor: str):
+    """
+    Decode a cursor produced by encode_attendance_cursor back into (clock_in, id).
+    """
+    try:
+        clock_in, attendance_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(clock_in), int(attendance_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor parameter")
+
+
+def clock_in_range_filters(month: str = "all", year: Optional[int] = None,
+                           from_date: Optional[date] = None, to_date: Optional[date] = None):
+    """
+    Build range filters on AttendanceLog.clock_in so the (employee_id, clock_in) index can be used.
+
+    - month (1-12) selects that month of `year`, or of the current year when no year is given.
+    - year alone selects the whole year.
+    - from_date / to_date select an inclusive range of days and can be combined with the above.
+    """
+    filters = []
+
+    if month != "all":
+        try:
+            month_int = int(month)
+            if not 1 <= month_int <= 12:
+                raise ValueError
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid month parameter")
+        month_year = year or date.today().year
+        month_start = datetime(month_year, month_int, 1)
+        next_month = datetime(month_year + 1, 1, 1) if month_int == 12 else datetime(month_year, month_int + 1, 1)
+        filters += [AttendanceLog.clock_in >= month_start, AttendanceLog.clock_in < next_month]
+    elif year is not None:
+        filters += [AttendanceLog.clock_in >= datetime(year, 1, 1), AttendanceLog.clock_in < datetime(year + 1, 1, 1)]
+
+    if from_date is not None:
+        filters.append(AttendanceLog.clock_in >= datetime.combine(from_date, datetime.min.time()))
+    if to_date is not None:
+        filters.append(AttendanceLog.clock_in < datetime.combine(to_date + timedelta(days=1), datetime.min.time()))
+
+    return filters
+
+
 @router.get("/attendance/{employee_id}")
 def get_employee_by_id(
     employee_id: int,
     month: str = "all",  # Default to "all" for no month filter
+    year: Optional[int] = None,  # Year of the month filter, defaults to the current year
+    from_date: Optional[date] = Query(None, alias="from", description="First day in YYYY-MM-DD format"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day in YYYY-MM-DD format"),
     page: int = 1,  # Default to the first page
     per_page: int = 10,  # Default to 10 records per page
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    include_total: bool = Query(True, description="Count all matching records for total_pages"),
     db: Session = Depends(get_db),
 ):
     """
-    Get attendance records for an employee, filtered by month if specified.
+    Get attendance records for an employee, filtered by month/year or a date range if specified.
+    Pages can be requested by number (page) or by the next_cursor returned with the previous page;
+    cursor pages cost the same however deep they are.
     Assumes all timestamps are stored in KST.
     """
     # Fetch the employee record
@@ -168,38 +273,44 @@ def get_employee_by_id(
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    # Query attendance logs, including related break logs, late record, penalties, and bonuses
-    query = db.query(AttendanceLog).options(
-        joinedload(AttendanceLog.break_logs),
-        joinedload(AttendanceLog.late_record),
-        joinedload(AttendanceLog.penalties),
-        joinedload(AttendanceLog.bonuses)
-    ).filter(
-        AttendanceLog.employee_id == employee_id
-    )
-
-    # Apply month filter if specified
-    if month != "all":
-        try:
-            month_int = int(month)
-            if 1 <= month_int <= 12:
-                query = query.filter(extract("month", AttendanceLog.clock_in) == month_int)
-            else:
-                raise ValueError
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid month parameter")
-
-    # Sort by clock_in (newest first)
-    query = query.order_by(AttendanceLog.clock_in.desc())
+    filters = [AttendanceLog.employee_id == employee_id]
+    filters += clock_in_range_filters(month, year, from_date, to_date)
 
     # Get total record count for pagination
-    total_records = query.count()
-
-    # Apply pagination
-    query = query.offset((page - 1) * per_page).limit(per_page)
-
-    # Fetch attendance records
-    db_attendance = query.all()
+    total_records = None
+    if include_total:
+        total_records = db.query(func.count(AttendanceLog.id)).filter(*filters).scalar()
+
+    # Pick the page first: sorted by clock_in (newest first) with id as a tie-breaker for
+    # stable pages, plus one extra record to know whether another page follows
+    page_ids = (
+        select(AttendanceLog.id)
+        .where(*filters)
+        .order_by(AttendanceLog.clock_in.desc(), AttendanceLog.id.desc())
+        .limit(per_page + 1)
+    )
+    # Seek past the cursor when given, otherwise skip whole pages
+    if cursor:
+        cursor_clock_in, cursor_id = decode_attendance_cursor(cursor)
+        page_ids = page_ids.where(tuple_(AttendanceLog.clock_in, AttendanceLog.id) < tuple_(cursor_clock_in, cursor_id))
+    else:
+        page_ids = page_ids.offset((page - 1) * per_page)
+    # A CTE, so the page is picked once however often the pay aggregates refer to it
+    page_ids = page_ids.cte("attendance_page")
+    in_page = AttendanceLog.id.in_(select(page_ids.c.id))
+
+    # Pay (computed by the database) of the page's records only, with their break logs
+    pay = payroll.pay_statement(in_page).subquery()
+    rows = (
+        db.query(AttendanceLog, *pay.c)
+        .options(selectinload(AttendanceLog.break_logs))
+        .join(pay, pay.c.attendance_id == AttendanceLog.id)
+        .order_by(AttendanceLog.clock_in.desc(), AttendanceLog.id.desc())
+        .all()
+    )
+    has_more = len(rows) > per_page
+    db_attendance = [row[0] for row in rows[:per_page]]
+    pays = [payroll.to_pay(row[1:]) for row in rows[:per_page]]
 
     if not db_attendance:
         raise HTTPException(
@@ -208,58 +319,19 @@ def get_employee_by_id(
 
     # Prepare response
     attendance_records = []
-    hourly_wage = float(employee.hourly_wage) if employee.hourly_wage else 0
-
-    for attendance in db_attendance:
-        # Initialize totals
-        total_work_hours = 0
-        total_break_hours = 0
-        total_hours_excluding_breaks = 0
-        total_wage = 0
-        net_pay = 0
-
-        if attendance.clock_in:
-            clock_in = attendance.clock_in
-            clock_out = attendance.clock_out or datetime.now()  # Use current time if clock_out is missing
-
-            # Calculate total work hours
-            total_work_hours = (clock_out - clock_in).total_seconds() / 3600
-
-            # Calculate total break hours
-            total_break_hours = sum(
-                (
-                    (br.break_end - br.break_start).total_seconds() / 3600
-                    if br.break_start and br.break_end
-                    else 0
-                )
-                for br in attendance.break_logs
-            )
-
-            # Calculate effective working hours (excluding breaks)
-            total_hours_excluding_breaks = max(0, total_work_hours - total_break_hours)
-
-            # Calculate total wage (base wage)
-            total_wage = total_hours_excluding_breaks * hourly_wage
-
-            # Calculate net wage adjustments:
-            late_deduction = float(attendance.late_record.deduction_amount) if attendance.late_record else 0
-            total_penalties = sum(float(p.price) for p in attendance.penalties) if attendance.penalties else 0
-            total_bonuses = sum(float(b.price) for b in attendance.bonuses) if attendance.bonuses else 0
-
-            # Compute net wage
-            net_pay = total_wage - (late_deduction + total_penalties) + total_bonuses
 
+    for attendance, pay in zip(db_attendance, pays):
         attendance_records.append({
             "id": attendance.id,
             "employee_name": employee.name,
             "clock_in": attendance.clock_in,
             "clock_out": attendance.clock_out,
             "has_clocked_out": attendance.clock_out is not None,
-            "total_hours": round(total_work_hours, 2),
-            "total_hours_excluding_breaks": round(total_hours_excluding_breaks, 2),
-            "total_break_hours": round(total_break_hours, 2),
-            "total_wage": round(total_wage, 2),
-            "net_pay": round(net_pay, 2),  # New field for net wage
+            "total_hours": round(pay.total_hours, 2),
+            "total_hours_excluding_breaks": round(pay.hours_excluding_breaks, 2),
+            "total_break_hours": round(pay.break_hours, 2),
+            "total_wage": round(pay.total_wage, 2),
+            "net_pay": round(pay.net_pay, 2),  # New field for net wage
             "break_logs": [
                 {
                     "id": br.id,
@@ -274,57 +346,71 @@ def get_employee_by_id(
             ],
         })
 
-    total_pages = ceil(total_records / per_page)
+    total_pages = ceil(total_records / per_page) if total_records is not None else None
 
-    return {
+    return json_response({
         "attendance_records": attendance_records,
         "total_pages": total_pages,
-        "current_page": page,
+        "current_page": None if cursor else page,
         "records_per_page": per_page,
         "total_records": total_records,
-    }
+        "has_more": has_more,
+        "next_cursor": encode_attendance_cursor(db_attendance[-1]) if has_more else None,
+    })
 
 
 
 
 @router.post("/clock-in/")
 def clock_in(employee_id: int, db: Session = Depends(get_db)):
+    """
+    Clock an employee in and record any lateness, in one transaction with a single commit.
+    The existence check runs inside the INSERT and duplicates are rejected by the unique
+    (employee_id, work_day) index, so concurrent scans of one badge create a single record.
+    The database is only asked why nothing was inserted when the clock-in is rejected.
+    """
     try:
-        # Check if the employee exists
-        employee = db.query(Employee).filter(Employee.id == employee_id).first()
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
+        now = datetime.now()
 
-        # Check if employee already clocked in today
-        today_start = datetime.combine(date.today(), datetime.min.time())
-        today_end = datetime.combine(date.today(), datetime.max.time())
-        
-        existing_clock_in = (
-            db.query(AttendanceLog)
-            .filter(
-                AttendanceLog.employee_id == employee_id,
-                AttendanceLog.clock_in >= today_start,
-                AttendanceLog.clock_in <= today_end
-            )
-            .first()
-        )
+        # Create the clock-in record unless the employee is unknown or already clocked in this work day
+        new_attendance = db.execute(clock_in_statement(db.get_bind().dialect.name, employee_id, now)).first()
 
-        if existing_clock_in:
+        if not new_attendance:
+            db.rollback()
+            employee_exists = db.query(Employee.id).filter(Employee.id == employee_id).first()
+            if not employee_exists:
+                raise HTTPException(status_code=404, detail="Employee not found")
             raise HTTPException(status_code=400, detail="Employee has already clocked in for today")
 
-        # Create a new clock-in record
-        new_attendance = AttendanceLog(
-            employee_id=employee_id,
-            clock_in=datetime.now()
-        )
-        db.add(new_attendance)
-        db.commit()
-        db.refresh(new_attendance)
+        # Core inserts bypass the flush hooks, so ask for the daily rollup refresh
+        track_attendance(db, new_attendance.id, employee_id, new_attendance.clock_in)
 
-        new_attendance.check_if_late(db)
+        # Record lateness in the same transaction (opening hours come from the cache)
+        is_late = False
+        restaurant_hours = get_restaurant_hours(db)
+        if restaurant_hours:
+            late_duration_minutes = calculate_late_minutes(new_attendance.clock_in, restaurant_hours.opening_time)
+            if late_duration_minutes is not None:
+                is_late = True
+                db.execute(late_record_statement(new_attendance.id, employee_id, late_duration_minutes, now))
 
-        return {"message": "Clock-in successful", "data": new_attendance}
+        db.commit()
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, new_attendance.id)
+
+        return {"message": "Clock-in successful", "data": {
+            "id": new_attendance.id,
+            "employee_id": employee_id,
+            "clock_in": new_attendance.clock_in,
+            "clock_out": None,
+            "total_hours": None,
+            "created_at": new_attendance.created_at,
+            "is_late": is_late,
+        }}
+
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -395,11 +481,16 @@ def clock_out(employee_id: int, db: Session = Depends(get_db)):
         db.commit()
         db.refresh(attendance_record)
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, attendance_record.id)
+
         return {"message": "Clock-out successful", "data": {
             "attendance": attendance_record,
             "last_break": ongoing_break
         }}
 
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -438,6 +529,9 @@ def update_clock_in(request: ClockInRequest, db: Session = Depends(get_db)):
 
         attendance.check_if_late(db)
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, request.attendance_id)
+
         return {
             "message": "Clock-in time updated successfully",
             "data": {
@@ -450,6 +544,10 @@ def update_clock_in(request: ClockInRequest, db: Session = Depends(get_db)):
 
     except HTTPException as e:
         raise e  # Re-raise known HTTP exceptions
+    except IntegrityError:
+        # The new clock-in falls on a work day that already has an attendance record
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Employee already has an attendance record for that work day")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -486,6 +584,9 @@ def update_clock_out(request: ClockOutRequest, db: Session = Depends(get_db)):
         db.commit()
         db.refresh(attendance)
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, request.attendance_id)
+
         return {
             "message": "Clock-out time updated successfully",
             "data": {
@@ -524,6 +625,9 @@ def delete_clock_out(attendance_id: int, db: Session = Depends(get_db)):
         db.commit()
         db.refresh(attendance)
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, attendance_id)
+
         return {"message": "Clock-out time deleted successfully", "data": {
             "id": attendance.id,
             "employee_id": attendance.employee_id,
@@ -531,6 +635,8 @@ def delete_clock_out(attendance_id: int, db: Session = Depends(get_db)):
             "total_hours": attendance.total_hours
         }}
 
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
+from app.etag import conditional_get
+from app.serialization import iter_ndjson_rows, json_response, ndjson_response, rows_as_dicts, wants_ndjson
+from app.live import publish_attendance_status
+from app.rollup import track_attendance
 from app.models.attendance import AttendanceLog
 from app.models.employee import Employee
 from app.models.breaks import BreakLog
@@ -14,29 +19,43 @@ router = APIRouter()
 
 
 
-@router.get("/breaks/", response_model=List[BreakLogResponse])
+@router.get("/breaks/", response_model=List[BreakLogResponse], dependencies=[conditional_get("break_log")])
 def get_breaks(
+    request: Request,
+    response: Response,
     break_start: Optional[datetime] = Query(None, description="Filter by break start date/time"),
     break_end: Optional[datetime] = Query(None, description="Filter by break end date/time"),
     db: Session = Depends(get_db)
 ):
     """
     Get a list of all break logs. Optionally filter by break_start and break_end.
+    With `Accept: application/x-ndjson` the rows are streamed, one JSON object per line.
     """
     try:
-        query = db.query(BreakLog)
+        query = select(
+            BreakLog.attendance_id,
+            BreakLog.break_type,
+            BreakLog.break_start,
+            BreakLog.break_end,
+            BreakLog.total_break_time,
+            BreakLog.id,
+            BreakLog.created_at,
+        )
         
         # Filter by break_start if provided
         if break_start:
-            query = query.filter(BreakLog.break_start >= break_start)
+            query = query.where(BreakLog.break_start >= break_start)
         
         # Filter by break_end if provided
         if break_end:
-            query = query.filter(BreakLog.break_end <= break_end)
+            query = query.where(BreakLog.break_end <= break_end)
+
+        # Stream the rows in chunks when asked, so memory does not grow with the table
+        if wants_ndjson(request):
+            return ndjson_response(iter_ndjson_rows(query), response)
 
-        # Execute the query and retrieve results
-        break_logs = query.all()
-        return break_logs
+        # Execute the query and serialise the rows directly
+        return json_response(rows_as_dicts(db.execute(query)), response)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -48,13 +67,16 @@ def break_start(break_data: BreakClockIn, db: Session = Depends(get_db)):
     Start a break for an employee's attendance log.
     """
     try:
-        # Check if an ongoing break exists for the given attendance_id
-        ongoing_break = (
-            db.query(BreakLog)
-            .filter(BreakLog.attendance_id == break_data.attendance_id, BreakLog.break_end == None)
-            .first()
-        )
-        if ongoing_break:
+        # Fetch the attendance record together with any ongoing break in one query
+        attendance = db.execute(
+            select(AttendanceLog.employee_id, AttendanceLog.clock_in, BreakLog.id.label("ongoing_break_id"))
+            .outerjoin(BreakLog, and_(BreakLog.attendance_id == AttendanceLog.id, BreakLog.break_end.is_(None)))
+            .where(AttendanceLog.id == break_data.attendance_id)
+            .limit(1)
+        ).first()
+        if not attendance:
+            raise HTTPException(status_code=404, detail="Attendance record not found")
+        if attendance.ongoing_break_id:
             raise HTTPException(status_code=400, detail="An ongoing break already exists for this attendance log.")
         
         # Create a new break log
@@ -64,11 +86,18 @@ def break_start(break_data: BreakClockIn, db: Session = Depends(get_db)):
             break_start=datetime.now()
         )
         db.add(new_break)
+        # The record's work day is known here, so the rollup refresh needs no lookup
+        track_attendance(db, break_data.attendance_id, attendance.employee_id, attendance.clock_in)
         db.commit()
         db.refresh(new_break)
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, break_data.attendance_id)
+
         return new_break
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
@@ -81,14 +110,18 @@ def break_end(break_data: BreakClockOut, db: Session = Depends(get_db)):
     End an ongoing break for a given attendance_id and calculate total break time.
     """
     try:
-        # Retrieve the most recent ongoing break log for the given attendance_id
-        break_log = db.query(BreakLog).filter(
+        # Retrieve the most recent ongoing break log for the given attendance_id, with its record's work day
+        ongoing = db.query(BreakLog, AttendanceLog.employee_id, AttendanceLog.clock_in).join(
+            AttendanceLog, AttendanceLog.id == BreakLog.attendance_id
+        ).filter(
             BreakLog.attendance_id == break_data.attendance_id, 
             BreakLog.break_end == None
         ).order_by(BreakLog.break_start.desc()).first()
 
-        if not break_log:
+        if not ongoing:
             raise HTTPException(status_code=404, detail="Ongoing break not found.")
+        break_log = ongoing.BreakLog
+        track_attendance(db, break_log.attendance_id, ongoing.employee_id, ongoing.clock_in)
 
         # Set the break_end time and calculate total_break_time
         break_log.break_end = datetime.now()
@@ -99,8 +132,13 @@ def break_end(break_data: BreakClockOut, db: Session = Depends(get_db)):
         db.commit()
         db.refresh(break_log)
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, break_data.attendance_id)
+
         return break_log
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
     
@@ -152,6 +190,9 @@ def update_break_start(
         # Commit changes to the database
         db.commit()
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, attendance_id)
+
         return {
             "message": "Break start time updated successfully",
             "break_log": {
@@ -220,6 +261,9 @@ def update_break_end(
         break_log.recalculate_total_break_time()
         db.commit()
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, attendance_id)
+
         return {
             "message": "Break end time updated successfully",
             "break_log": {
@@ -290,6 +334,9 @@ def create_new_break(
         db.commit()
         db.refresh(new_break)
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, break_data.attendance_id)
+
         return {
             "message": "Break created successfully",
             "break_log": {
@@ -342,12 +389,17 @@ def delete_break(
         # Commit the changes
         db.commit()
 
+        # Push the change to live dashboards
+        publish_attendance_status(db, attendance.id)
+
         return {
             "message": "Break deleted successfully",
             "attendance_id": attendance.id,
             "total_hours": round(attendance.total_hours, 2),
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -0,0 +1,51 @@
+"""
+Diagnostics of this worker: connection pools and per-route SQL statements.
+
+The answers include SQL text and the reset clears shared counters, so the
+endpoints only exist when the DEBUG environment variable is set (1, true or
+yes); otherwise every /debug path answers 404. GET /metrics stays public.
+"""
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.database import engine_pools
+from app.instrumentation import route_query_stats
+from app.pool import pool_stats
+
+DEBUG_ENDPOINTS = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
+
+
+def require_debug():
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+router = APIRouter(prefix="/debug", tags=["Debug"], dependencies=[Depends(require_debug)])
+
+
+@router.get("/pool")
+def get_pool_stats():
+    """
+    Connection pool state and checkout wait histogram of each database engine.
+    Counters are cumulative since the worker started; diff two readings to measure a load test.
+    """
+    return {name: pool_stats(pool) for name, pool in engine_pools().items()}
+
+
+@router.get("/queries")
+def get_query_stats():
+    """
+    SQL statements and database time per route since the worker started (or the last reset),
+    with the slowest statement seen on each route.
+    """
+    return route_query_stats.snapshot()
+
+
+@router.delete("/queries")
+def reset_query_stats():
+    """
+    Clear the per-route query stats, e.g. before a load test.
+    """
+    route_query_stats.reset()
+    return {"message": "Query stats cleared"}
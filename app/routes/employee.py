@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
+from app.etag import conditional_get
+from app.cache import BadgeEmployee, QrIndex, TTLCache
+from app.live import publish_employee_deleted, publish_employee_status
 from app.models.attendance import AttendanceLog
 from app.models.employee import Employee
+from app.models.salary import SalaryLog
+from app.payroll_periods import PeriodClosedError
+from app.rollup import refresh_rollups_for_wage_change
 from app.schemas.employee import EmployeeResponse, EmployeeCreate, EmployeeUpdate, EmployeeLogin, RoleEnum
 import secrets
 import string
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta, date, time
 from app.models.breaks import BreakLog
-from sqlalchemy import or_
+from sqlalchemy import inspect, or_
 import jwt
 from sqlalchemy import desc
 
@@ -28,12 +34,55 @@ def generate_qr_id(length=20):
 SECRET_KEY = "yourdfsdfdsfdsf_fdsfsdfdssecret_fsdfdsfdfdfwefewsfskey"
 ALGORITHM = "HS256"
 
-def create_token(employee_id: int, role: str):
+# Employee rows used by /validate-token?verify_user=true, kept for a few seconds
+employee_cache = TTLCache(ttl=10, maxsize=4096)
+
+# Badge scans resolve through this index instead of querying Employee by qr_id.
+# Badges deleted by another worker keep resolving here until the next reload, so keep it short.
+qr_index = QrIndex(max_age=30)
+
+
+def _badge_employee(employee):
+    return BadgeEmployee(employee.id, employee.name, employee.role, employee.qr_id)
+
+
+def load_qr_index(db: Session):
+    """
+    (Re)load the whole qr_id index with one query.
+    """
+    rows = db.query(Employee.id, Employee.name, Employee.role, Employee.qr_id).all()
+    qr_index.load(BadgeEmployee(*row) for row in rows)
+
+
+def find_employee_by_qr_id(qr_id: str, db: Session, verify: bool = False):
+    """
+    Resolve a badge scan to a BadgeEmployee, or None for an unknown badge.
+    Normally answered from the in-memory index; the database is only queried for
+    the periodic reload, for a badge this process has not seen yet, or when `verify`
+    is set because the answer grants more than a kiosk scan (an admin token).
+    """
+    if qr_index.is_stale():
+        load_qr_index(db)
+
+    employee = None if verify else qr_index.get(qr_id)
+    if employee is None:
+        row = db.query(Employee.id, Employee.name, Employee.role, Employee.qr_id).filter(Employee.qr_id == qr_id).first()
+        if row:
+            employee = BadgeEmployee(*row)
+            qr_index.put(employee)
+        else:
+            qr_index.remove(qr_id)
+    return employee
+
+def create_token(employee_id: int, role: str, name: str):
     """
-    Create a JWT token with a 1-day expiration.
+    Create a JWT token with a 30-minute expiration.
+    The token carries the claims the frontend needs (id, name, role) so it can be
+    validated from its signature alone.
     """
     payload = {
         "sub": str(employee_id),  # Convert employee_id to a string
+        "name": name,
         "role": role,
         "exp": datetime.utcnow() + timedelta(minutes=30),
     }
@@ -41,41 +90,64 @@ def create_token(employee_id: int, role: str):
     return token
 
 
+def get_employee_claims(employee_id: int, db: Session):
+    """
+    Return {"id", "name", "role"} for an employee, or None if the employee does not exist.
+    Served from a short-lived in-process cache so repeated checks skip the database.
+    """
+    claims = employee_cache.get(employee_id)
+    if claims is None:
+        user = db.query(Employee.id, Employee.name, Employee.role).filter(Employee.id == employee_id).first()
+        if not user:
+            return None
+        claims = {"id": user.id, "name": user.name, "role": user.role.value}
+        employee_cache.set(employee_id, claims)
+    return claims
+
+
 @router.get("/validate-token")
-def validate_token(Authorization: str = Header(...), db: Session = Depends(get_db)):
+def validate_token(
+    Authorization: str = Header(...),
+    verify_user: bool = Query(False, description="Also check that the employee still exists"),
+    db: Session = Depends(get_db),
+):
     """
-    Validates a JWT token and retrieves user details if the token is valid.
+    Validates a JWT token and returns the user details it carries.
+    The answer comes from the token's signature alone unless verify_user is set
+    or the token predates the name claim, in which case the employee is looked up.
     """
     try:
         # Extract token from the Authorization header
         if not Authorization.startswith("Bearer "):
             raise HTTPException(status_code=401, detail="Invalid authorization format.")
         token = Authorization.split(" ")[1]
-        print(token)
 
         # Decode the JWT
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(payload)
-        user_id: int = payload.get("sub")
-        print(user_id)
+        user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token payload.")
 
-        # Fetch the user from the database
-        user = db.query(Employee).filter(Employee.id == user_id).first()
-        print(user)
+        # Answer from the signed claims when they are all present
+        if not verify_user and "name" in payload and "role" in payload:
+            return {
+                "user": {
+                    "id": int(user_id),
+                    "name": payload["name"],
+                    "role": payload["role"],
+                }
+            }
+
+        # Otherwise fetch the user (cached for a few seconds)
+        user = get_employee_claims(int(user_id), db)
         if not user:
             raise HTTPException(status_code=404, detail="User not found.")
 
         # Return user details if valid
-        return {
-            "user": {
-                "id": user.id,
-                "name": user.name,
-                "role": user.role.value,  # Ensure role is serialized correctly
-            }
-        }
+        return {"user": user}
 
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired.")
     except jwt.PyJWTError:
@@ -86,22 +158,20 @@ def validate_token(Authorization: str = Header(...), db: Session = Depends(get_d
 @router.post("/admin/login")
 def admin_login(qr: EmployeeLogin, db: Session = Depends(get_db)):
     try:
-        # Decode the QR data to find the employee
-        employee = db.query(Employee).filter(Employee.qr_id == qr.qr_id).first()
+        # Decode the QR data to find the employee; a badge deleted on another worker must not get a token
+        employee = find_employee_by_qr_id(qr.qr_id, db, verify=True)
 
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found.")
 
         # Check if the employee is an admin
-        if str(employee.role) != str(RoleEnum.admin):  # Compare enums directly
-            print(RoleEnum.admin)
-            print(employee.role)
+        if employee.role.value != RoleEnum.admin.value:
             raise HTTPException(
                 status_code=403, detail="Authentication failed. Admin access required."
             )
 
         # Generate JWT token
-        token = create_token(employee.id, employee.role.value)  # Convert role to string for the token
+        token = create_token(employee.id, employee.role.value, employee.name)  # Convert role to string for the token
 
         # Return the response with the token
         response = {
@@ -113,13 +183,15 @@ def admin_login(qr: EmployeeLogin, db: Session = Depends(get_db)):
 
         return response
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
 
 # Endpoint to get all employees
-@router.get("/employees", response_model=List[EmployeeResponse])
+@router.get("/employees", response_model=List[EmployeeResponse], dependencies=[conditional_get("employees")])
 def get_all_employees(db: Session = Depends(get_db)):
     employees = db.query(Employee).all()
     return employees
@@ -145,6 +217,8 @@ def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
         db.add(db_employee)
         db.commit()
         db.refresh(db_employee)  # Retrieve the newly created employee with ID
+        qr_index.put(_badge_employee(db_employee))
+        publish_employee_status(db, db_employee.id, "employee.created")
 
         return db_employee
     except IntegrityError:
@@ -153,7 +227,7 @@ def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
     
 
 @router.put("/employee/{id}", response_model=EmployeeResponse)
-def update_employee(id: int, employee_update: EmployeeUpdate, db: Session = Depends(get_db)):
+def update_employee(id: int, employee_update: EmployeeUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     # Fetch the employee based on the provided qr_id
     db_employee = db.query(Employee).filter(Employee.id == id).first()
 
@@ -165,12 +239,20 @@ def update_employee(id: int, employee_update: EmployeeUpdate, db: Session = Depe
         db_employee.name = employee_update.name
     if employee_update.hourly_wage:
         db_employee.hourly_wage = employee_update.hourly_wage
+    wage_changed = inspect(db_employee).attrs.hourly_wage.history.has_changes()
     
     # Commit the changes to the database
     db.commit()
+    employee_cache.invalidate(id)
+
+    # A new wage changes the pay of every open-period shift; recompute those rollups after responding
+    if wage_changed:
+        background_tasks.add_task(refresh_rollups_for_wage_change, id)
 
     # Refresh the instance to reflect the changes
     db.refresh(db_employee)
+    qr_index.put(_badge_employee(db_employee))
+    publish_employee_status(db, id)
 
     return db_employee
 
@@ -182,9 +264,16 @@ def remove_employee(id: int, db: Session = Depends(get_db)):
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
+    # Paid-out shifts are kept for good, and with them their employee
+    if db.query(SalaryLog.id).filter(SalaryLog.employee_id == id).first():
+        raise PeriodClosedError("Employees with pay in salary_log can not be deleted")
+
     # Delete the employee record (cascading deletes will handle related records)
     db.delete(db_employee)
     db.commit()
+    employee_cache.invalidate(id)
+    qr_index.remove(db_employee.qr_id)
+    publish_employee_deleted(id)
 
     return {"message": f"Employee with ID {id} has been successfully deleted"}
 
@@ -195,21 +284,12 @@ def remove_employee(id: int, db: Session = Depends(get_db)):
 def login(qr: EmployeeLogin, db: Session = Depends(get_db)):
     try:
         # Decode the QR data (expected to be the employee's unique identifier)
-        print(qr.qr_id)
-        employee = db.query(Employee).filter(Employee.qr_id == qr.qr_id).first()
+        employee = find_employee_by_qr_id(qr.qr_id, db)
 
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found.")
 
-        # Get today's attendance record for the employee
-        today_date = datetime.today().date()
-
-        today_attendance = db.query(AttendanceLog).filter(
-            AttendanceLog.employee_id == employee.id,
-            AttendanceLog.clock_in >= today_date
-        ).first()
-
-        # Prepare the response with employee details and attendance status
+        # Prepare the response with employee details
         response = {
                 "id": employee.id,
                 "name": employee.name,
@@ -217,6 +297,8 @@ def login(qr: EmployeeLogin, db: Session = Depends(get_db)):
             }
         return response
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
     
@@ -324,95 +406,131 @@ def get_employee_status(employee_id: int, db: Session = Depends(get_db)):
 def get_all_employees_status(date: date = None, db: Session = Depends(get_db)):
     """
     Get attendance and break status for all employees for a given date (default to today).
+    Live updates of the same entries are pushed by /ws/status and /status/stream.
     """
     try:
         # If no date is provided, use today's date
         date = date or datetime.today().date()
 
-        # Retrieve all employees
-        employees = db.query(Employee).all()
-        if not employees:
+        employee_statuses = build_employee_statuses(db, date)
+        if not employee_statuses:
             raise HTTPException(status_code=404, detail="No employees found.")
 
-        employee_statuses = []
-
-        for employee in employees:
-            # Get today's attendance for the employee based on the provided or default date
-            attendance = (
-                db.query(AttendanceLog)
-                .filter(
-                    AttendanceLog.employee_id == employee.id,
-                    AttendanceLog.clock_in >= datetime(date.year, date.month, date.day),
-                    AttendanceLog.clock_in < datetime(date.year, date.month, date.day) + timedelta(days=1)
-                )
-                .first()
-            )
-
-            # If attendance is found, process it; otherwise, set status to "Not clocked in"
-            if attendance:
-                # Get all breaks for today's attendance
-                breaks = db.query(BreakLog).filter(BreakLog.attendance_id == attendance.id).all()
-
-                # Calculate total break time in seconds
-                total_break_time_seconds = sum(
-                    (timedelta(minutes=float(br.total_break_time)).total_seconds() for br in breaks if br.total_break_time),
-                    0
-                )
-
-                # Convert total break time to float hours
-                total_break_time_hours = total_break_time_seconds / 3600  # Convert to hours
-
-                # Calculate worked hours excluding breaks
-                total_hours_seconds = float(attendance.total_hours) * 3600 if attendance.total_hours else 0
-                worked_hours_seconds = total_hours_seconds - total_break_time_seconds
-                worked_hours = worked_hours_seconds / 3600  # Convert back to hours
-
-                # Add employee's status
-                employee_statuses.append({
-                    "employee": {
-                        "id": employee.id,
-                        "name": employee.name,
-                        "role": employee.role,
-                        "wage": employee.hourly_wage
-                    },
-                    "attendance": {
-                        "id": attendance.id,
-                        "clock_in": attendance.clock_in,
-                        "clock_out": attendance.clock_out,
-                        "total_hours": attendance.total_hours,
-                        "created_at": attendance.created_at
-                    },
-                    "breaks": [
-                        {
-                            "id": br.id,
-                            "break_type": br.break_type,
-                            "break_start": br.break_start,
-                            "break_end": br.break_end,
-                            "total_break_time": str(timedelta(minutes=float(br.total_break_time)))[:-3] if br.total_break_time else None
-                        } for br in breaks
-                    ],
-                    "total_hours_excluding_breaks": round(worked_hours, 2),  # Add worked hours excluding breaks
-                    "total_break_time": round(total_break_time_hours, 2)  # Add total break time as float hours
-                })
-            else:
-                # If no attendance record, mark employee as not clocked in
-                employee_statuses.append({
-                    "employee": {
-                        "id": employee.id,
-                        "name": employee.name,
-                        "role": employee.role,
-                        "wage": employee.hourly_wage
-                    },
-                    "attendance": None,  # No attendance for this date
-                    "breaks": [],
-                    "total_hours_excluding_breaks": 0.0,  # No work hours
-                    "total_break_time": 0.0  # No break time
-                })
-
         return {"employees": employee_statuses}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+def build_employee_statuses(db: Session, day: date, employee_ids=None):
+    """
+    Build the status entries of all employees (or only `employee_ids`) for a day.
+
+    Runs a fixed number of queries regardless of headcount: one for the employees,
+    one for the day's attendance records and one for the breaks of those records.
+    """
+    start_of_day = datetime(day.year, day.month, day.day)
+    end_of_day = start_of_day + timedelta(days=1)
+
+    # Retrieve the employees
+    employee_query = db.query(Employee)
+    attendance_query = db.query(AttendanceLog)
+    if employee_ids is not None:
+        employee_query = employee_query.filter(Employee.id.in_(employee_ids))
+        attendance_query = attendance_query.filter(AttendanceLog.employee_id.in_(employee_ids))
+    employees = employee_query.order_by(Employee.id).all()
+    if not employees:
+        return []
+
+    # Get the day's attendance for every employee in one query, keeping the first record per employee
+    attendance_by_employee = {}
+    day_attendance = (
+        attendance_query
+        .filter(
+            AttendanceLog.clock_in >= start_of_day,
+            AttendanceLog.clock_in < end_of_day
+        )
+        .order_by(AttendanceLog.clock_in, AttendanceLog.id)
+        .all()
+    )
+    for attendance in day_attendance:
+        attendance_by_employee.setdefault(attendance.employee_id, attendance)
+
+    # Get the breaks for all of those attendance records in one query
+    breaks_by_attendance = {attendance.id: [] for attendance in attendance_by_employee.values()}
+    if breaks_by_attendance:
+        day_breaks = (
+            db.query(BreakLog)
+            .filter(BreakLog.attendance_id.in_(list(breaks_by_attendance)))
+            .order_by(BreakLog.break_start, BreakLog.id)
+            .all()
+        )
+        for br in day_breaks:
+            breaks_by_attendance[br.attendance_id].append(br)
+
+    employee_statuses = []
+    for employee in employees:
+        attendance = attendance_by_employee.get(employee.id)
+        breaks = breaks_by_attendance[attendance.id] if attendance else []
+        employee_statuses.append(_employee_day_status(employee, attendance, breaks))
+    return employee_statuses
+
 
+def _employee_day_status(employee, attendance, breaks):
+    """
+    Build the status entry of one employee for a day from already loaded rows.
+    """
+    employee_data = {
+        "id": employee.id,
+        "name": employee.name,
+        "role": employee.role,
+        "wage": employee.hourly_wage
+    }
+
+    # If no attendance record, mark employee as not clocked in
+    if not attendance:
+        return {
+            "employee": employee_data,
+            "attendance": None,  # No attendance for this date
+            "breaks": [],
+            "total_hours_excluding_breaks": 0.0,  # No work hours
+            "total_break_time": 0.0  # No break time
+        }
+
+    # Calculate total break time in seconds
+    total_break_time_seconds = sum(
+        (timedelta(minutes=float(br.total_break_time)).total_seconds() for br in breaks if br.total_break_time),
+        0
+    )
+
+    # Convert total break time to float hours
+    total_break_time_hours = total_break_time_seconds / 3600  # Convert to hours
+
+    # Calculate worked hours excluding breaks
+    total_hours_seconds = float(attendance.total_hours) * 3600 if attendance.total_hours else 0
+    worked_hours_seconds = total_hours_seconds - total_break_time_seconds
+    worked_hours = worked_hours_seconds / 3600  # Convert back to hours
+
+    return {
+        "employee": employee_data,
+        "attendance": {
+            "id": attendance.id,
+            "clock_in": attendance.clock_in,
+            "clock_out": attendance.clock_out,
+            "total_hours": attendance.total_hours,
+            "created_at": attendance.created_at
+        },
+        "breaks": [
+            {
+                "id": br.id,
+                "break_type": br.break_type,
+                "break_start": br.break_start,
+                "break_end": br.break_end,
+                "total_break_time": str(timedelta(minutes=float(br.total_break_time)))[:-3] if br.total_break_time else None
+            } for br in breaks
+        ],
+        "total_hours_excluding_breaks": round(worked_hours, 2),  # Add worked hours excluding breaks
+        "total_break_time": round(total_break_time_hours, 2)  # Add total break time as float hours
+    }
@@ -0,0 +1,271 @@
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.cache import get_restaurant_hours
+from app.live import publish_attendance_status
+from app.models.attendance import AttendanceLog, LateRecord, calculate_lateness, work_day_for
+from app.models.employee import Employee
+from app.models.breaks import BreakLog
+from app.payroll_periods import PeriodClosedError
+from app.schemas.events import KioskEvent, KioskEventBatch
+
+router = APIRouter()
+
+# Upper bound on one replay request; kiosks split longer queues
+MAX_BATCH_EVENTS = 5000
+
+
+def _local_time(timestamp):
+    # Times are stored as naive local time, like datetime.now() in the single-event routes
+    if timestamp.tzinfo:
+        return timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+class KioskReplay:
+    """
+    Clock and break state of the employees in a batch, loaded with a fixed number of
+    queries and then updated in memory as the events are applied. New and changed
+    rows are added to the session; the caller flushes them. When an event's writes
+    are rolled back, `restore()` puts back the employee's state from `save()`.
+    """
+
+    def __init__(self, db: Session, events):
+        self.db = db
+        employee_ids = {event.employee_id for event in events}
+        work_days = {work_day_for(_local_time(event.timestamp)) for event in events if event.type == "clock_in"}
+
+        self.wages = dict(db.execute(
+            select(Employee.id, Employee.hourly_wage).where(Employee.id.in_(employee_ids))
+        ).all())
+
+        # Latest open shift per employee
+        self.open_attendance = {}
+        open_shifts = (
+            db.query(AttendanceLog)
+            .filter(AttendanceLog.employee_id.in_(employee_ids), AttendanceLog.clock_out == None)
+            .order_by(AttendanceLog.clock_in)
+            .all()
+        )
+        for attendance in open_shifts:
+            self.open_attendance[attendance.employee_id] = attendance
+
+        # Work days that already have a record per employee, for the one-clock-in-per-day rule
+        self.work_days = defaultdict(set)
+        if work_days:
+            for employee_id, work_day in db.execute(
+                select(AttendanceLog.employee_id, AttendanceLog.work_day)
+                .where(AttendanceLog.employee_id.in_(employee_ids), AttendanceLog.work_day.in_(work_days))
+            ):
+                self.work_days[employee_id].add(work_day)
+
+        # Latest ongoing break per open shift, keyed by the attendance object
+        self.open_breaks = {}
+        attendance_by_id = {attendance.id: attendance for attendance in self.open_attendance.values()}
+        if attendance_by_id:
+            ongoing_breaks = (
+                db.query(BreakLog)
+                .filter(BreakLog.attendance_id.in_(attendance_by_id), BreakLog.break_end == None)
+                .order_by(BreakLog.break_start)
+                .all()
+            )
+            for br in ongoing_breaks:
+                self.open_breaks[attendance_by_id[br.attendance_id]] = br
+
+        self.restaurant_hours = get_restaurant_hours(db)
+
+    def save(self, employee_id):
+        """
+        The employee's open shift, its ongoing break and work days, which are all an event can change.
+        """
+        attendance = self.open_attendance.get(employee_id)
+        return attendance, self.open_breaks.get(attendance), set(self.work_days[employee_id])
+
+    def restore(self, employee_id, saved):
+        attendance, ongoing_break, work_days = saved
+        current = self.open_attendance.pop(employee_id, None)
+        if current is not None:
+            self.open_breaks.pop(current, None)
+        if attendance is not None:
+            self.open_attendance[employee_id] = attendance
+            if ongoing_break is not None:
+                self.open_breaks[attendance] = ongoing_break
+        self.work_days[employee_id] = work_days
+
+    def apply(self, event: KioskEvent, timestamp):
+        """
+        Apply one event and return the attendance or break row it touched.
+        Raises HTTPException with the same status and detail as the single-event route.
+        """
+        if event.employee_id not in self.wages:
+            raise HTTPException(status_code=404, detail="Employee not found")
+
+        if event.type == "clock_in":
+            return self.clock_in(event.employee_id, timestamp)
+        if event.type == "clock_out":
+            return self.clock_out(event.employee_id, timestamp)
+        if event.type == "break_start":
+            return self.break_start(event.employee_id, event.break_type, timestamp)
+        return self.break_end(event.employee_id, timestamp)
+
+    def clock_in(self, employee_id, timestamp):
+        work_day = work_day_for(timestamp)
+        if work_day in self.work_days[employee_id]:
+            raise HTTPException(status_code=400, detail="Employee has already clocked in for today")
+
+        attendance = AttendanceLog(employee_id=employee_id, clock_in=timestamp)
+        if self.restaurant_hours:
+            lateness = calculate_lateness(timestamp, self.restaurant_hours.opening_time, self.wages[employee_id])
+            if lateness:
+                late_duration_minutes, deduction_amount = lateness
+                attendance.late_record = LateRecord(
+                    late_duration_minutes=late_duration_minutes,
+                    deduction_amount=deduction_amount
+                )
+        self.db.add(attendance)
+
+        self.work_days[employee_id].add(work_day)
+        self.open_attendance[employee_id] = attendance
+        return attendance
+
+    def clock_out(self, employee_id, timestamp):
+        attendance = self.open_attendance.get(employee_id)
+        if not attendance or attendance.clock_in > timestamp:
+            raise HTTPException(
+                status_code=400,
+                detail="No valid clock-in record found for today or employee has already clocked out"
+            )
+
+        # Close the ongoing break at the clock-out time
+        ongoing_break = self.open_breaks.pop(attendance, None)
+        if ongoing_break:
+            ongoing_break.break_end = max(timestamp, ongoing_break.break_start)
+            ongoing_break.recalculate_total_break_time()
+
+        attendance.clock_out = timestamp
+        attendance.total_hours = attendance.calculate_total_hours()
+
+        del self.open_attendance[employee_id]
+        return attendance
+
+    def break_start(self, employee_id, break_type, timestamp):
+        if not break_type:
+            raise HTTPException(status_code=400, detail="break_type is required for break_start events.")
+
+        attendance = self.open_attendance.get(employee_id)
+        if not attendance or attendance.clock_in > timestamp:
+            raise HTTPException(status_code=400, detail="No open attendance record found for this employee.")
+        if attendance in self.open_breaks:
+            raise HTTPException(status_code=400, detail="An ongoing break already exists for this attendance log.")
+
+        new_break = BreakLog(attendance_log=attendance, break_type=break_type, break_start=timestamp)
+        self.db.add(new_break)
+
+        self.open_breaks[attendance] = new_break
+        return new_break
+
+    def break_end(self, employee_id, timestamp):
+        attendance = self.open_attendance.get(employee_id)
+        break_log = self.open_breaks.get(attendance) if attendance else None
+        if not break_log:
+            raise HTTPException(status_code=404, detail="Ongoing break not found.")
+        if break_log.break_start > timestamp:
+            raise HTTPException(status_code=400, detail="Break end cannot be earlier than break start.")
+
+        break_log.break_end = timestamp
+        break_log.recalculate_total_break_time()
+
+        del self.open_breaks[attendance]
+        return break_log
+
+
+def _apply_events(db: Session, events, savepoints: bool):
+    """
+    Replay `events` and return (applied, results), with the applied rows flushed.
+
+    Without savepoints the events that pass the in-memory checks are written by one
+    flush, which raises if the database rejects any of them. With savepoints each
+    event is flushed on its own, and one the database rejects is reported and rolled
+    back alone, at a few statements per event.
+    """
+    replay = KioskReplay(db, events)
+
+    applied = []
+    results = []
+    for index, event in enumerate(events):
+        result = {"index": index, "type": event.type, "employee_id": event.employee_id}
+        saved = replay.save(event.employee_id)
+        try:
+            if savepoints:
+                with db.begin_nested():
+                    row = replay.apply(event, _local_time(event.timestamp))
+                    db.flush()
+            else:
+                row = replay.apply(event, _local_time(event.timestamp))
+        except HTTPException as e:
+            replay.restore(event.employee_id, saved)
+            result.update(status="rejected", status_code=e.status_code, detail=e.detail)
+        except IntegrityError as e:
+            # Rows written by another request after the batch was loaded
+            replay.restore(event.employee_id, saved)
+            if event.type == "clock_in":
+                result.update(status="rejected", status_code=400,
+                              detail="Employee already has an attendance record for that work day")
+            else:
+                result.update(status="rejected", status_code=409, detail=f"Conflicting change: {e.orig}")
+        else:
+            result["status"] = "applied"
+            applied.append((result, row))
+        results.append(result)
+
+    # One flush writes every new and changed row; ids are read before the commit expires them
+    db.flush()
+    for result, row in applied:
+        if isinstance(row, BreakLog):
+            result["attendance_id"] = row.attendance_log.id
+            result["break_id"] = row.id
+        else:
+            result["attendance_id"] = row.id
+    return [result for result, _ in applied], results
+
+
+@router.post("/events/batch")
+def ingest_events(batch: KioskEventBatch, db: Session = Depends(get_db)):
+    """
+    Apply a queue of kiosk clock and break events in order, in one transaction.
+    Each event is checked like its single-event route; rejected events are reported
+    and skipped without affecting the others. The accepted events are written with
+    one flush. Only if the database rejects that flush (a closed payroll period, a
+    work day clocked in elsewhere meanwhile) is the batch replayed with a savepoint
+    per event, to report the offending events alone. Break events apply to the
+    employee's open shift, so events recorded offline need no attendance id.
+    """
+    if len(batch.events) > MAX_BATCH_EVENTS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {MAX_BATCH_EVENTS} events")
+
+    try:
+        try:
+            applied, results = _apply_events(db, batch.events, savepoints=False)
+        except (IntegrityError, PeriodClosedError):
+            db.rollback()
+            applied, results = _apply_events(db, batch.events, savepoints=True)
+        db.commit()
+
+        # Push every changed attendance record to live dashboards once
+        for attendance_id in dict.fromkeys(result["attendance_id"] for result in applied):
+            publish_attendance_status(db, attendance_id)
+
+        return {"message": "Batch processed", "data": {
+            "applied": len(applied),
+            "rejected": len(results) - len(applied),
+            "results": results
+        }}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
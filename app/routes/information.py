@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas.information import RestaurantHoursCreate
 from app.models.basic_info import RestaurantHours
+from app.cache import restaurant_hours_cache
 
 router = APIRouter(prefix="/restaurant-hours", tags=["Restaurant Hours"])
 
@@ -20,5 +21,14 @@ def create_restaurant_hours(restaurant_hours: RestaurantHoursCreate, db: Session
     )
     db.add(db_restaurant_hours)
     db.commit()
+    restaurant_hours_cache.invalidate()
     db.refresh(db_restaurant_hours)
-    return db_restaurant_hours
\ No newline at end of file
+    return db_restaurant_hours
+
+
+@router.get("/cache-stats")
+def get_restaurant_hours_cache_stats():
+    """
+    Hit/miss counters of the in-process restaurant hours cache used by late detection.
+    """
+    return restaurant_hours_cache.stats()
\ No newline at end of file
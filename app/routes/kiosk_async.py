@@ -0,0 +1,311 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, date, time, timedelta
+from app.database import get_async_db
+from app.cache import get_restaurant_hours_async
+from app.live import publish_attendance_status
+from app.rollup import track_attendance
+from app.models.attendance import AttendanceLog, calculate_late_minutes, clock_in_statement, late_record_statement
+from app.models.employee import Employee
+from app.models.breaks import BreakLog
+from app.schemas.breaks import BreakLogResponse, BreakClockIn, BreakClockOut
+
+# Async versions of the kiosk hot paths. They use the asyncpg-backed session, so an
+# in-flight request waits on the event loop instead of holding a threadpool worker.
+# That is not a measured latency gain: see `python -m benchmarks.suite kiosk`.
+router = APIRouter(prefix="/async", tags=["Async kiosk"])
+
+
+def _attendance_data(attendance):
+    return {
+        "id": attendance.id,
+        "employee_id": attendance.employee_id,
+        "clock_in": attendance.clock_in,
+        "clock_out": attendance.clock_out,
+        "total_hours": attendance.total_hours,
+        "created_at": attendance.created_at,
+    }
+
+
+def _break_data(br):
+    return {
+        "id": br.id,
+        "attendance_id": br.attendance_id,
+        "break_type": br.break_type,
+        "break_start": br.break_start,
+        "break_end": br.break_end,
+        "total_break_time": br.total_break_time,
+        "created_at": br.created_at,
+    }
+
+
+@router.post("/clock-in/")
+async def clock_in(employee_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Async version of POST /clock-in/.
+    Same statements as the sync route: one INSERT ... ON CONFLICT ... RETURNING, an optional late record, one commit.
+    """
+    try:
+        now = datetime.now()
+
+        # Create the clock-in record unless the employee is unknown or already clocked in this work day
+        new_attendance = (await db.execute(clock_in_statement(db.get_bind().dialect.name, employee_id, now))).first()
+
+        if not new_attendance:
+            await db.rollback()
+            employee_exists = (await db.execute(select(Employee.id).where(Employee.id == employee_id))).first()
+            if not employee_exists:
+                raise HTTPException(status_code=404, detail="Employee not found")
+            raise HTTPException(status_code=400, detail="Employee has already clocked in for today")
+
+        # Core inserts bypass the flush hooks, so ask for the daily rollup refresh
+        track_attendance(db.sync_session, new_attendance.id, employee_id, new_attendance.clock_in)
+
+        # Record lateness in the same transaction
+        is_late = False
+        restaurant_hours = await get_restaurant_hours_async(db)
+        if restaurant_hours:
+            late_duration_minutes = calculate_late_minutes(new_attendance.clock_in, restaurant_hours.opening_time)
+            if late_duration_minutes is not None:
+                is_late = True
+                await db.execute(late_record_statement(new_attendance.id, employee_id, late_duration_minutes, now))
+
+        await db.commit()
+
+        # Push the change to live dashboards
+        await db.run_sync(publish_attendance_status, new_attendance.id)
+
+        return {"message": "Clock-in successful", "data": {
+            "id": new_attendance.id,
+            "employee_id": employee_id,
+            "clock_in": new_attendance.clock_in,
+            "clock_out": None,
+            "total_hours": None,
+            "created_at": new_attendance.created_at,
+            "is_late": is_late,
+        }}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.post("/clock-out/")
+async def clock_out(employee_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Async version of POST /clock-out/.
+    Closes the latest open attendance record and any ongoing break.
+    """
+    try:
+        # Check if the employee exists
+        employee_exists = (await db.execute(select(Employee.id).where(Employee.id == employee_id))).first()
+        if not employee_exists:
+            raise HTTPException(status_code=404, detail="Employee not found")
+
+        # Find the latest open attendance record that started before tomorrow
+        start_of_tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+        attendance_record = (await db.execute(
+            select(AttendanceLog)
+            .where(
+                AttendanceLog.employee_id == employee_id,
+                AttendanceLog.clock_in < start_of_tomorrow,
+                AttendanceLog.clock_out.is_(None)
+            )
+            .order_by(AttendanceLog.clock_in.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+        if not attendance_record:
+            raise HTTPException(
+                status_code=400,
+                detail="No valid clock-in record found for today or employee has already clocked out"
+            )
+
+        # Check for an ongoing break and close it if found
+        ongoing_break = (await db.execute(
+            select(BreakLog)
+            .where(BreakLog.attendance_id == attendance_record.id, BreakLog.break_end.is_(None))
+            .order_by(BreakLog.break_start.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+        if ongoing_break:
+            ongoing_break.break_end = datetime.now()
+            ongoing_break.total_break_time = round(
+                (ongoing_break.break_end - ongoing_break.break_start).total_seconds() / 60.0, 2
+            )
+
+        # Finalize the attendance record with clock-out
+        clock_out_time = datetime.now()
+        attendance_record.clock_out = clock_out_time
+        attendance_record.total_hours = round((clock_out_time - attendance_record.clock_in).total_seconds() / 3600, 2)
+
+        await db.commit()
+
+        # Push the change to live dashboards
+        await db.run_sync(publish_attendance_status, attendance_record.id)
+
+        return {"message": "Clock-out successful", "data": {
+            "attendance": _attendance_data(attendance_record),
+            "last_break": _break_data(ongoing_break) if ongoing_break else None
+        }}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.post("/breaks/start/", response_model=BreakLogResponse)
+async def break_start(break_data: BreakClockIn, db: AsyncSession = Depends(get_async_db)):
+    """
+    Async version of POST /breaks/start/.
+    """
+    try:
+        # Fetch the attendance record together with any ongoing break in one query
+        attendance = (await db.execute(
+            select(AttendanceLog.employee_id, AttendanceLog.clock_in, BreakLog.id.label("ongoing_break_id"))
+            .outerjoin(BreakLog, and_(BreakLog.attendance_id == AttendanceLog.id, BreakLog.break_end.is_(None)))
+            .where(AttendanceLog.id == break_data.attendance_id)
+            .limit(1)
+        )).first()
+        if not attendance:
+            raise HTTPException(status_code=404, detail="Attendance record not found")
+        if attendance.ongoing_break_id:
+            raise HTTPException(status_code=400, detail="An ongoing break already exists for this attendance log.")
+
+        # Create a new break log
+        new_break = BreakLog(
+            attendance_id=break_data.attendance_id,
+            break_type=break_data.break_type,
+            break_start=datetime.now()
+        )
+        db.add(new_break)
+        track_attendance(db.sync_session, break_data.attendance_id, attendance.employee_id, attendance.clock_in)
+        await db.commit()
+
+        # Push the change to live dashboards
+        await db.run_sync(publish_attendance_status, new_break.attendance_id)
+
+        return _break_data(new_break)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.post("/breaks/end/", response_model=BreakLogResponse)
+async def break_end(break_data: BreakClockOut, db: AsyncSession = Depends(get_async_db)):
+    """
+    Async version of POST /breaks/end/.
+    """
+    try:
+        # Retrieve the most recent ongoing break log for the given attendance_id
+        ongoing = (await db.execute(
+            select(BreakLog, AttendanceLog.employee_id, AttendanceLog.clock_in)
+            .join(AttendanceLog, AttendanceLog.id == BreakLog.attendance_id)
+            .where(BreakLog.attendance_id == break_data.attendance_id, BreakLog.break_end.is_(None))
+            .order_by(BreakLog.break_start.desc())
+            .limit(1)
+        )).first()
+        if not ongoing:
+            raise HTTPException(status_code=404, detail="Ongoing break not found.")
+        break_log = ongoing.BreakLog
+        track_attendance(db.sync_session, break_log.attendance_id, ongoing.employee_id, ongoing.clock_in)
+
+        # Set the break_end time and calculate total_break_time (in minutes)
+        break_log.break_end = datetime.now()
+        break_log.total_break_time = round((break_log.break_end - break_log.break_start).total_seconds() / 60.0, 2)
+
+        await db.commit()
+
+        # Push the change to live dashboards
+        await db.run_sync(publish_attendance_status, break_log.attendance_id)
+
+        return _break_data(break_log)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.get("/employee/status/{employee_id}")
+async def get_employee_status(employee_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Async version of GET /employee/status/{employee_id}, with the same 5 AM day-rollover rule.
+    """
+    try:
+        # Ensure the employee exists.
+        employee = (await db.execute(
+            select(Employee.id, Employee.name, Employee.role).where(Employee.id == employee_id)
+        )).first()
+        if not employee:
+            raise HTTPException(status_code=404, detail="Employee not found.")
+
+        now = datetime.now()
+
+        # Determine the effective date based on current time.
+        effective_date = date.today()
+        if now.time() < time(5, 0):
+            effective_date = date.today() - timedelta(days=1)
+        start_of_day = datetime.combine(effective_date, datetime.min.time())
+        end_of_day = datetime.combine(effective_date + timedelta(days=1), datetime.min.time())
+
+        # Query the latest attendance record for the employee.
+        latest_attendance = (await db.execute(
+            select(AttendanceLog)
+            .where(AttendanceLog.employee_id == employee_id)
+            .order_by(AttendanceLog.clock_in.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+
+        attendance = None
+        if latest_attendance:
+            if start_of_day <= latest_attendance.clock_in < end_of_day:
+                attendance = latest_attendance
+            # Before 5 AM an open record from the previous day still counts
+            elif now.time() < time(5, 0) and latest_attendance.clock_out is None:
+                attendance = latest_attendance
+
+        if not attendance:
+            return {
+                "employee": {"id": employee.id, "name": employee.name, "role": employee.role},
+                "attendance": None,
+                "breaks": []
+            }
+
+        break_logs = (await db.execute(
+            select(BreakLog).where(BreakLog.attendance_id == attendance.id)
+        )).scalars().all()
+
+        return {
+            "employee": {"id": employee.id, "name": employee.name, "position": employee.role},
+            "attendance": {
+                "id": attendance.id,
+                "clock_in": attendance.clock_in,
+                "clock_out": attendance.clock_out,
+                "total_hours": attendance.total_hours,
+                "created_at": attendance.created_at
+            },
+            "breaks": [
+                {
+                    "id": br.id,
+                    "break_type": br.break_type,
+                    "break_start": br.break_start,
+                    "break_end": br.break_end,
+                    "total_break_time": str(timedelta(minutes=float(br.total_break_time)))
+                                        if br.total_break_time else None
+                } for br in break_logs
+            ]
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+
+from app.database import SessionLocal
+from app.live import broadcaster, status_snapshot
+
+router = APIRouter(tags=["Live status"])
+
+# SSE comment line sent when idle so proxies keep the connection open
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _load_snapshot():
+    # Streaming endpoints outlive request-scoped sessions, so they open their own
+    with SessionLocal() as db:
+        return status_snapshot(db)
+
+
+@router.websocket("/ws/status")
+async def status_websocket(websocket: WebSocket):
+    """
+    Live status of all employees: a snapshot on connect, then one
+    {"type": "status", "date", "employee"} message per change. New employees arrive as
+    {"type": "employee.created", "date", "employee"} and deleted ones as
+    {"type": "employee.deleted", "employee_id"}. A {"type": "resync"} message is
+    answered with a fresh snapshot.
+    """
+    await websocket.accept()
+    subscriber = broadcaster.subscribe()
+    try:
+        await websocket.send_json(await run_in_threadpool(_load_snapshot))
+        while True:
+            message = await subscriber.queue.get()
+            if message["type"] == "resync":
+                message = await run_in_threadpool(_load_snapshot)
+            await websocket.send_json(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+
+@router.get("/status/stream")
+async def status_event_stream(request: Request):
+    """
+    Server-sent events version of /ws/status, for clients that cannot use WebSockets.
+    """
+    subscriber = broadcaster.subscribe()
+
+    async def events():
+        try:
+            snapshot = await run_in_threadpool(_load_snapshot)
+            yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message["type"] == "resync":
+                    message = await run_in_threadpool(_load_snapshot)
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import CONTENT_TYPE, render_metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics of this worker: route latency histograms, in-flight requests,
+    threadpool saturation and the database connection pools.
+    Async so it reads the event loop's threadpool limiter without taking a thread itself.
+    """
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
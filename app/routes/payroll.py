@@ -0,0 +1,333 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+from app.database import SessionLocal, get_db
+from app.etag import conditional_get
+from app.models.attendance import AttendanceLog
+from app.models.employee import Employee
+from app.models.salary import PayrollPeriod, PayrollPeriodTotal, SalaryLog
+from app.payroll_periods import close_period, find_closed_period
+from app.schemas.payroll import PayrollPeriodClose
+from app.serialization import NDJSON_MEDIA_TYPE, json_response, ndjson_lines, rows_as_dicts
+from app import payroll
+import csv
+import io
+
+router = APIRouter(prefix="/payroll", tags=["Payroll"])
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    "record_type",
+    "employee_id",
+    "employee_name",
+    "attendance_id",
+    "clock_in",
+    "clock_out",
+    "total_hours",
+    "break_hours",
+    "hours_excluding_breaks",
+    "total_wage",
+    "late_minutes",
+    "late_deduction",
+    "penalties",
+    "bonuses",
+    "net_pay",
+]
+
+# Pay fields summed into the per-employee totals
+TOTAL_FIELDS = EXPORT_COLUMNS[6:]
+
+
+def _shift_record(employee_name, pay, clock_in, clock_out):
+    return {
+        "record_type": "shift",
+        "employee_id": pay.employee_id,
+        "employee_name": employee_name,
+        "attendance_id": pay.attendance_id,
+        "clock_in": clock_in.isoformat() if clock_in else None,
+        "clock_out": clock_out.isoformat() if clock_out else None,
+        "total_hours": round(pay.total_hours, 2),
+        "break_hours": round(pay.break_hours, 2),
+        "hours_excluding_breaks": round(pay.hours_excluding_breaks, 2),
+        "total_wage": round(pay.total_wage, 2),
+        "late_minutes": round(pay.late_minutes, 2),
+        "late_deduction": round(pay.late_deduction, 2),
+        "penalties": round(pay.penalties, 2),
+        "bonuses": round(pay.bonuses, 2),
+        "net_pay": round(pay.net_pay, 2),
+    }
+
+
+def _total_record(employee_id, employee_name, totals):
+    record = {
+        "record_type": "employee_total",
+        "employee_id": employee_id,
+        "employee_name": employee_name,
+        "attendance_id": None,
+        "clock_in": None,
+        "clock_out": None,
+    }
+    record.update({field: round(totals[field], 2) for field in TOTAL_FIELDS})
+    return record
+
+
+def _snapshot_shift_record(columns):
+    (employee_id, employee_name, attendance_id, clock_in, clock_out, *amounts) = columns
+    record = {
+        "record_type": "shift",
+        "employee_id": employee_id,
+        "employee_name": employee_name,
+        "attendance_id": attendance_id,
+        "clock_in": clock_in.isoformat() if clock_in else None,
+        "clock_out": clock_out.isoformat() if clock_out else None,
+    }
+    record.update((field, float(amount)) for field, amount in zip(TOTAL_FIELDS, amounts))
+    return record
+
+
+def _snapshot_total_record(total):
+    return _total_record(total.employee_id, total.employee_name, {
+        field: float(getattr(total, field)) for field in TOTAL_FIELDS
+    })
+
+
+# Snapshot columns in TOTAL_FIELDS order
+SNAPSHOT_SHIFT_COLUMNS = [
+    SalaryLog.total_hours_worked.label("total_hours"),
+    SalaryLog.break_hours,
+    SalaryLog.hours_excluding_breaks,
+    SalaryLog.total_salary.label("total_wage"),
+    SalaryLog.late_minutes,
+    SalaryLog.late_deduction,
+    SalaryLog.penalties,
+    SalaryLog.bonuses,
+    SalaryLog.net_pay,
+]
+
+
+def iter_snapshot_records(db: Session, period_id: int):
+    """
+    Yield lists of export records of a closed period, read from its salary_log and
+    payroll_period_totals snapshot rows only.
+    """
+    totals = {
+        total.employee_id: total
+        for total in db.execute(select(PayrollPeriodTotal).where(PayrollPeriodTotal.period_id == period_id)).scalars()
+    }
+    statement = (
+        select(
+            SalaryLog.employee_id, PayrollPeriodTotal.employee_name, SalaryLog.attendance_id,
+            SalaryLog.clock_in, SalaryLog.clock_out, *SNAPSHOT_SHIFT_COLUMNS,
+        )
+        .join(PayrollPeriodTotal, (PayrollPeriodTotal.period_id == SalaryLog.period_id)
+              & (PayrollPeriodTotal.employee_id == SalaryLog.employee_id))
+        .where(SalaryLog.period_id == period_id)
+        .order_by(SalaryLog.employee_id, SalaryLog.clock_in, SalaryLog.attendance_id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    current_employee = None
+    for partition in db.execute(statement).partitions():
+        records = []
+        for columns in partition:
+            if columns[0] != current_employee:
+                if current_employee is not None:
+                    records.append(_snapshot_total_record(totals[current_employee]))
+                current_employee = columns[0]
+            records.append(_snapshot_shift_record(columns))
+        yield records
+    if current_employee is not None:
+        yield [_snapshot_total_record(totals[current_employee])]
+
+
+def iter_payroll_records(start: date, end: date):
+    """
+    Yield lists of export records for every shift whose clock_in falls between start and end (inclusive).
+
+    Shifts are read through a server-side cursor ordered by employee, so only one
+    chunk of rows is held in memory at a time. An "employee_total" record follows
+    each employee's last shift. A range matching a closed payroll period is served
+    from its snapshot instead of being recomputed.
+
+    Uses its own session because the response body is produced after the
+    request's dependencies have been cleaned up.
+    """
+    start_datetime = datetime.combine(start, datetime.min.time())
+    end_datetime = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+    statement = (
+        payroll.rows_statement(
+            AttendanceLog.clock_in >= start_datetime,
+            AttendanceLog.clock_in < end_datetime,
+        )
+        .add_columns(Employee.name)
+        .order_by(None)
+        .order_by(AttendanceLog.employee_id, AttendanceLog.clock_in, AttendanceLog.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+    db = SessionLocal()
+    try:
+        period = find_closed_period(db, start, end)
+        if period is not None:
+            yield from iter_snapshot_records(db, period.id)
+            return
+
+        now = datetime.now()
+        current_employee = None
+        current_name = None
+        totals = None
+
+        for partition in db.execute(statement).partitions():
+            pays = payroll.compute_batch((payroll.to_row(columns) for columns in partition), now)
+            records = []
+            for columns, pay in zip(partition, pays):
+                if pay.employee_id != current_employee:
+                    if current_employee is not None:
+                        records.append(_total_record(current_employee, current_name, totals))
+                    current_employee = pay.employee_id
+                    current_name = columns[-1]
+                    totals = dict.fromkeys(TOTAL_FIELDS, 0)
+
+                record = _shift_record(current_name, pay, columns[2], columns[3])
+                for field in TOTAL_FIELDS:
+                    totals[field] += getattr(pay, field)
+                records.append(record)
+            yield records
+
+        if current_employee is not None:
+            yield [_total_record(current_employee, current_name, totals)]
+    finally:
+        db.close()
+
+
+def _csv_chunks(start: date, end: date):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for records in iter_payroll_records(start, end):
+        writer.writerows(records)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(start: date, end: date):
+    for records in iter_payroll_records(start, end):
+        yield ndjson_lines(records)
+
+
+@router.get("/export")
+def export_payroll(
+    start_date: date = Query(..., description="First day of the range in YYYY-MM-DD format"),
+    end_date: date = Query(..., description="Last day of the range in YYYY-MM-DD format"),
+    format: str = Query("csv", description="Export format: csv or ndjson"),
+):
+    """
+    Stream payroll for all employees over a date range.
+    Every shift is exported with its computed pay, followed by a total line per employee.
+    Assumes all timestamps are stored in KST.
+    """
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    filename = f"payroll_{start_date.isoformat()}_{end_date.isoformat()}"
+    if format == "csv":
+        return StreamingResponse(
+            _csv_chunks(start_date, end_date),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
+        )
+    if format == "ndjson":
+        return StreamingResponse(
+            _ndjson_chunks(start_date, end_date),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'},
+        )
+    raise HTTPException(status_code=400, detail="Invalid format. Use csv or ndjson.")
+
+
+def _period_totals(db: Session, period_id: int):
+    return rows_as_dicts(db.execute(
+        select(
+            PayrollPeriodTotal.employee_id, PayrollPeriodTotal.employee_name, PayrollPeriodTotal.shifts,
+            PayrollPeriodTotal.total_hours, PayrollPeriodTotal.break_hours, PayrollPeriodTotal.hours_excluding_breaks,
+            PayrollPeriodTotal.total_wage, PayrollPeriodTotal.late_minutes, PayrollPeriodTotal.late_deduction,
+            PayrollPeriodTotal.penalties, PayrollPeriodTotal.bonuses, PayrollPeriodTotal.net_pay,
+        )
+        .where(PayrollPeriodTotal.period_id == period_id)
+        .order_by(PayrollPeriodTotal.employee_id)
+    ))
+
+
+@router.post("/periods/close", status_code=201)
+def close_payroll_period(body: PayrollPeriodClose, db: Session = Depends(get_db)):
+    """
+    Close a past payroll period: compute the pay of every shift in it once, store it in
+    salary_log with per-employee totals, and freeze the attendance it covers.
+    """
+    try:
+        period = close_period(db, body.start_date, body.end_date)
+        db.commit()
+        return json_response({"message": "Payroll period closed", "data": {
+            "id": period.id,
+            "start_date": period.start_date,
+            "end_date": period.end_date,
+            "closed_at": period.closed_at,
+            "totals": _period_totals(db, period.id),
+        }}, status_code=201)
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.get("/periods", dependencies=[conditional_get("payroll_periods")])
+def get_payroll_periods(response: Response, db: Session = Depends(get_db)):
+    """
+    All payroll periods, newest first.
+    """
+    periods = db.execute(
+        select(PayrollPeriod.id, PayrollPeriod.start_date, PayrollPeriod.end_date, PayrollPeriod.closed_at)
+        .order_by(PayrollPeriod.start_date.desc())
+    )
+    return json_response(rows_as_dicts(periods), response)
+
+
+@router.get("/periods/{period_id}", dependencies=[conditional_get("payroll_periods")])
+def get_payroll_period(
+    period_id: int,
+    response: Response,
+    include_shifts: bool = Query(False, description="Also return the pay of every shift"),
+    db: Session = Depends(get_db),
+):
+    """
+    Frozen pay of a closed period, read from its snapshot without recomputation.
+    """
+    period = db.get(PayrollPeriod, period_id)
+    if not period or period.closed_at is None:
+        raise HTTPException(status_code=404, detail="Closed payroll period not found")
+
+    data = {
+        "id": period.id,
+        "start_date": period.start_date,
+        "end_date": period.end_date,
+        "closed_at": period.closed_at,
+        "totals": _period_totals(db, period.id),
+    }
+    if include_shifts:
+        data["shifts"] = rows_as_dicts(db.execute(
+            select(
+                SalaryLog.employee_id, SalaryLog.attendance_id, SalaryLog.clock_in, SalaryLog.clock_out,
+                SalaryLog.hourly_wage, *SNAPSHOT_SHIFT_COLUMNS,
+            )
+            .where(SalaryLog.period_id == period.id)
+            .order_by(SalaryLog.employee_id, SalaryLog.clock_in, SalaryLog.attendance_id)
+        ))
+    return json_response(data, response)
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.etag import conditional_get
+from app.serialization import json_response, rows_as_dicts
 from app.schemas.penalty import PenaltyCreate, PenaltyResponse
 from app.models.attendance import Penalty
 
@@ -29,13 +32,15 @@ def get_penalty(attendance_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Penalty not found")
     return penalty
 
-@router.get("/", response_model=list[PenaltyResponse], status_code=status.HTTP_200_OK)
-def get_penalties(db: Session = Depends(get_db)):
+@router.get("/", response_model=list[PenaltyResponse], status_code=status.HTTP_200_OK, dependencies=[conditional_get("penalties")])
+def get_penalties(response: Response, db: Session = Depends(get_db)):
     """
     Get all penalty records.
     """
-    penalties = db.query(Penalty).all()
-    return penalties
+    penalties = db.execute(
+        select(Penalty.attendance_id, Penalty.description, Penalty.price, Penalty.id, Penalty.created_at)
+    )
+    return json_response(rows_as_dicts(penalties), response)
 
 @router.delete("/{penalty_id}", status_code=status.HTTP_200_OK)
 def delete_penalty(penalty_id: int, db: Session = Depends(get_db)):
@@ -1,14 +1,17 @@
 # app/routers/report.py
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.database import get_db
 from app.models.task import Task  # adjust import paths as needed
 from app.models.employee import Employee, RoleEnum
 from app.models.attendance import AttendanceLog, LateRecord, Penalty, Bonus
 from app.models.breaks import BreakLog
+from app import payroll
+from app.serialization import json_response
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, date, timedelta
+from collections import defaultdict
 
 router = APIRouter()
 
@@ -21,7 +24,7 @@ class TaskOut(BaseModel):
     completed_at: Optional[datetime]
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class BreakLogOut(BaseModel):
     id: int
@@ -31,7 +34,7 @@ class BreakLogOut(BaseModel):
     total_break_time: Optional[float]
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class LateRecordOut(BaseModel):
     id: int
@@ -39,7 +42,7 @@ class LateRecordOut(BaseModel):
     deduction_amount: float
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class PenaltyOut(BaseModel):
     id: int
@@ -47,7 +50,7 @@ class PenaltyOut(BaseModel):
     price: float
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class BonusOut(BaseModel):
     id: int
@@ -55,7 +58,7 @@ class BonusOut(BaseModel):
     price: float
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class AttendanceLogOut(BaseModel):
     id: int
@@ -68,7 +71,7 @@ class AttendanceLogOut(BaseModel):
     bonuses: List[BonusOut]
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class EmployeeReport(BaseModel):
     id: int
@@ -79,20 +82,14 @@ class EmployeeReport(BaseModel):
     attendance_logs: List[AttendanceLogOut]
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
-@router.get("/report/{employee_id}", response_model=EmployeeReport)
-def get_employee_report(
-    employee_id: int,
-    start_date: Optional[str] = Query(None, description="Week start date in YYYY-MM-DD format"),
-    db: Session = Depends(get_db)
-):
+def week_bounds(start_date: Optional[str]):
     """
-    Generate a simplified report for the given employee for a one-week time frame.
+    Return (start_of_week, end_of_week) dates for a report.
     If 'start_date' is provided, it is used as the Monday of that week.
     Otherwise, the current week's Monday is used.
     """
-    # Determine the start of the week
     if start_date:
         try:
             start_of_week = datetime.strptime(start_date, "%Y-%m-%d").date()
@@ -102,121 +99,169 @@ def get_employee_report(
         today = date.today()
         start_of_week = today - timedelta(days=today.weekday())
     end_of_week = start_of_week + timedelta(days=6)
+    return start_of_week, end_of_week
+
+
+def build_employee_reports(db: Session, employees, start_of_week: date, end_of_week: date):
+    """
+    Build an EmployeeReport dict for each employee for one week.
+
+    Uses a fixed number of queries however many employees and shifts there are:
+    one for the tasks, one for the attendance logs with their pay and late records
+    and one each for their breaks, penalties and bonuses.
+    """
+    employee_ids = [emp.id for emp in employees]
 
     # Convert dates to naive datetimes for filtering
     start_datetime = datetime.combine(start_of_week, datetime.min.time())
     end_datetime = datetime.combine(end_of_week, datetime.max.time())
 
-    # Get the employee
-    emp = db.query(Employee).filter(Employee.id == employee_id).first()
-    if not emp:
-        raise HTTPException(status_code=404, detail="Employee not found")
-
-    # Get tasks for the employee for the week
+    # Get tasks for the employees for the week
+    tasks_by_employee = defaultdict(list)
     tasks = (
         db.query(Task)
         .filter(
-            Task.employee_id == employee_id,
+            Task.employee_id.in_(employee_ids),
             Task.task_date >= start_of_week,
             Task.task_date <= end_of_week,
         )
+        .order_by(Task.id)
         .all()
     )
+    for t in tasks:
+        tasks_by_employee[t.employee_id].append(t)
 
-    # Get attendance logs for the employee for the week
+    # Get attendance logs for the employees for the week, with their pay (computed by
+    # the database) and everything else the report shows
+    in_week = (
+        AttendanceLog.employee_id.in_(employee_ids),
+        AttendanceLog.clock_in >= start_datetime,
+        AttendanceLog.clock_in <= end_datetime,
+    )
+    pay = payroll.pay_statement(*in_week).subquery()
+    logs_by_employee = defaultdict(list)
+    pays_by_employee = defaultdict(list)
     attendance_logs = (
-        db.query(AttendanceLog)
-        .filter(
-            AttendanceLog.employee_id == employee_id,
-            AttendanceLog.clock_in >= start_datetime,
-            AttendanceLog.clock_in <= end_datetime,
+        db.query(AttendanceLog, *pay.c)
+        .options(
+            selectinload(AttendanceLog.break_logs),
+            joinedload(AttendanceLog.late_record),
+            selectinload(AttendanceLog.penalties),
+            selectinload(AttendanceLog.bonuses),
         )
+        .join(pay, pay.c.attendance_id == AttendanceLog.id)
+        .filter(*in_week)
+        .order_by(AttendanceLog.id)
         .all()
     )
+    for log, *pay_columns in attendance_logs:
+        logs_by_employee[log.employee_id].append(log)
+        pays_by_employee[log.employee_id].append(payroll.to_pay(pay_columns))
 
-    attendance_logs_out = []
-    for log in attendance_logs:
-        # Calculate work hours and wages if clock_in exists
-        if log.clock_in:
-            clock_in = log.clock_in
-            clock_out = log.clock_out or datetime.now()  # use current time if clock_out is missing
-            total_work_hours = (clock_out - clock_in).total_seconds() / 3600
-            total_break_time = sum(
-                (br.break_end - br.break_start).total_seconds() / 3600
-                for br in log.break_logs
-                if br.break_start and br.break_end
-            )
-            effective_hours = max(0, total_work_hours - total_break_time)
-            hourly_wage = float(emp.hourly_wage) if emp.hourly_wage else 0
-            total_wage = effective_hours * hourly_wage
-        else:
-            total_work_hours = 0
-            total_break_time = 0
-            effective_hours = 0
-            total_wage = 0
-
-        late_deduction = float(log.late_record.deduction_amount) if log.late_record else 0
-        total_penalties = sum(float(p.price) for p in log.penalties) if log.penalties else 0
-        total_bonuses = sum(float(b.price) for b in log.bonuses) if log.bonuses else 0
-
-        net_pay = (total_wage - (late_deduction + total_penalties)) + total_bonuses
-
-        log_data = {
-            "id": log.id,
-            "clock_in": log.clock_in,
-            "clock_out": log.clock_out,
-            "net_pay": round(net_pay, 0),  # rounded to 0 decimals (KRW)
-            "break_logs": [
-                {
-                    "id": br.id,
-                    "break_type": br.break_type,
-                    "break_start": br.break_start,
-                    "break_end": br.break_end,
-                    "total_break_time": round(
-                        ((br.break_end - br.break_start).total_seconds() / 3600), 2
-                    ) if br.break_start and br.break_end else None,
-                }
-                for br in log.break_logs
-            ],
-            "late_record": {
-                "id": log.late_record.id,
-                "late_duration_minutes": int(round(float(log.late_record.late_duration_minutes))),
-                "deduction_amount": round(float(log.late_record.deduction_amount), 0),
-            } if log.late_record else None,
-            "penalties": [
+    reports = []
+    for emp in employees:
+        logs = logs_by_employee[emp.id]
+        pays = pays_by_employee[emp.id]
+        reports.append({
+            "id": emp.id,
+            "name": emp.name,
+            "role": emp.role.value if hasattr(emp.role, "value") else emp.role,
+            "hourly_wage": round(float(emp.hourly_wage), 0),
+            "tasks": [
                 {
-                    "id": p.id,
-                    "description": p.description,
-                    "price": round(float(p.price), 0),
+                    "id": t.id,
+                    "description": t.description,
+                    "task_date": t.task_date,
+                    "status": t.status,
+                    "completed_at": t.completed_at,
                 }
-                for p in log.penalties
+                for t in tasks_by_employee[emp.id]
             ],
-            "bonuses": [
-                {
-                    "id": b.id,
-                    "description": b.description,
-                    "price": round(float(b.price), 0),
-                }
-                for b in log.bonuses
-            ],
-        }
-        attendance_logs_out.append(log_data)
-
-    report = {
-        "id": emp.id,
-        "name": emp.name,
-        "role": emp.role.value if hasattr(emp.role, "value") else emp.role,
-        "hourly_wage": round(float(emp.hourly_wage), 0),
-        "tasks": [
+            "attendance_logs": [_attendance_log_out(log, pay) for log, pay in zip(logs, pays)],
+        })
+    return reports
+
+
+def _attendance_log_out(log, pay):
+    return {
+        "id": log.id,
+        "clock_in": log.clock_in,
+        "clock_out": log.clock_out,
+        "net_pay": round(pay.net_pay, 0),  # rounded to 0 decimals (KRW)
+        "break_logs": [
             {
-                "id": t.id,
-                "description": t.description,
-                "task_date": t.task_date,
-                "status": t.status,
-                "completed_at": t.completed_at,
+                "id": br.id,
+                "break_type": br.break_type,
+                "break_start": br.break_start,
+                "break_end": br.break_end,
+                "total_break_time": round(
+                    ((br.break_end - br.break_start).total_seconds() / 3600), 2
+                ) if br.break_start and br.break_end else None,
             }
-            for t in tasks
+            for br in log.break_logs
+        ],
+        "late_record": {
+            "id": log.late_record.id,
+            "late_duration_minutes": int(round(float(log.late_record.late_duration_minutes))),
+            "deduction_amount": round(float(log.late_record.deduction_amount), 0),
+        } if log.late_record else None,
+        "penalties": [
+            {
+                "id": p.id,
+                "description": p.description,
+                "price": round(float(p.price), 0),
+            }
+            for p in log.penalties
+        ],
+        "bonuses": [
+            {
+                "id": b.id,
+                "description": b.description,
+                "price": round(float(b.price), 0),
+            }
+            for b in log.bonuses
         ],
-        "attendance_logs": attendance_logs_out,
     }
-    return report
+
+
+# Declared before /report/{employee_id} so "team" is not parsed as an id
+@router.get("/report/team", response_model=List[EmployeeReport])
+def get_team_report(
+    start_date: Optional[str] = Query(None, description="Week start date in YYYY-MM-DD format"),
+    employee_ids: Optional[List[int]] = Query(None, description="Employees to include (default: everyone)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate the weekly report of every employee, or of the given employee_ids, in one request.
+    Same per-employee fields as /report/{employee_id}, with a constant number of queries.
+    """
+    start_of_week, end_of_week = week_bounds(start_date)
+
+    query = db.query(Employee)
+    if employee_ids:
+        query = query.filter(Employee.id.in_(employee_ids))
+    employees = query.order_by(Employee.id).all()
+
+    return json_response(build_employee_reports(db, employees, start_of_week, end_of_week))
+
+
+@router.get("/report/{employee_id}", response_model=EmployeeReport)
+def get_employee_report(
+    employee_id: int,
+    start_date: Optional[str] = Query(None, description="Week start date in YYYY-MM-DD format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate a simplified report for the given employee for a one-week time frame.
+    If 'start_date' is provided, it is used as the Monday of that week.
+    Otherwise, the current week's Monday is used.
+    """
+    start_of_week, end_of_week = week_bounds(start_date)
+
+    # Get the employee
+    emp = db.query(Employee).filter(Employee.id == employee_id).first()
+    if not emp:
+        raise HTTPException(status_code=404, detail="Employee not found")
+
+    report = build_employee_reports(db, [emp], start_of_week, end_of_week)[0]
+    return json_response(report)
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import List, Optional
+from app.database import get_db
+from app.etag import conditional_get
+from app.models.rollup import DailyRollup
+from app.schemas.rollup import DailyRollupResponse
+from app.serialization import json_response, rows_as_dicts
+
+router = APIRouter(prefix="/rollups", tags=["Daily rollups"])
+
+
+@router.get("/daily", response_model=List[DailyRollupResponse], dependencies=[conditional_get("daily_rollups")])
+def get_daily_rollups(
+    response: Response,
+    start_date: date = Query(..., description="First work day in YYYY-MM-DD format"),
+    end_date: date = Query(..., description="Last work day in YYYY-MM-DD format"),
+    employee_id: Optional[int] = Query(None, description="Only this employee"),
+    db: Session = Depends(get_db),
+):
+    """
+    Per-employee, per-work-day pay totals, read from the daily_rollups table
+    instead of being aggregated from attendance on every request.
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be on or before end_date")
+
+    query = (
+        select(
+            DailyRollup.employee_id, DailyRollup.work_day, DailyRollup.shifts, DailyRollup.worked_hours,
+            DailyRollup.break_hours, DailyRollup.late_minutes, DailyRollup.late_deduction,
+            DailyRollup.penalties, DailyRollup.bonuses, DailyRollup.net_pay, DailyRollup.updated_at,
+        )
+        .where(DailyRollup.work_day >= start_date, DailyRollup.work_day <= end_date)
+        .order_by(DailyRollup.work_day, DailyRollup.employee_id)
+    )
+    if employee_id is not None:
+        query = query.where(DailyRollup.employee_id == employee_id)
+
+    return json_response(rows_as_dicts(db.execute(query)), response)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import List, Optional
 from app.database import get_db
+from app.etag import conditional_get
+from app.serialization import json_response, rows_as_dicts
 from app.models.task import Task
 from app.schemas.task import TaskCreate, TaskOut
 
@@ -66,13 +69,15 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
     db.refresh(new_task)
     return new_task
 
-@router.get("/", response_model=List[TaskOut])
-def get_tasks(db: Session = Depends(get_db)):
+@router.get("/", response_model=List[TaskOut], dependencies=[conditional_get("tasks")])
+def get_tasks(response: Response, db: Session = Depends(get_db)):
     """
     Get all tasks.
     """
-    tasks = db.query(Task).all()
-    return tasks
+    tasks = db.execute(
+        select(Task.description, Task.employee_id, Task.task_date, Task.status, Task.id, Task.completed_at)
+    )
+    return json_response(rows_as_dicts(tasks), response)
 
 @router.get("/{task_id}", response_model=TaskOut)
 def get_task(task_id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, List, Literal
+
+
+class KioskEvent(BaseModel):
+    type: Literal["clock_in", "clock_out", "break_start", "break_end"]
+    employee_id: int
+    timestamp: datetime  # When the scan happened on the kiosk
+    break_type: Optional[str] = None  # Required for break_start
+
+
+class KioskEventBatch(BaseModel):
+    events: List[KioskEvent]  # Applied in the order given
@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+from datetime import date
+
+class PayrollPeriodClose(BaseModel):
+    start_date: date = Field(..., description="First clock-in date of the period")
+    end_date: date = Field(..., description="Last clock-in date of the period; must be before today")
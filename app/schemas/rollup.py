@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+
+class DailyRollupResponse(BaseModel):
+    employee_id: int = Field(..., description="ID of the employee")
+    work_day: date = Field(..., description="Work day (shifts starting before 5 AM count for the previous day)")
+    shifts: int = Field(..., description="Number of attendance records on the work day")
+    worked_hours: float = Field(..., description="Hours worked excluding breaks; open shifts count as zero")
+    break_hours: float = Field(..., description="Hours spent on completed breaks")
+    late_minutes: float = Field(..., description="Minutes late")
+    late_deduction: float = Field(..., description="Amount deducted for lateness")
+    penalties: float = Field(..., description="Sum of penalties")
+    bonuses: float = Field(..., description="Sum of bonuses")
+    net_pay: float = Field(..., description="Wage minus deductions and penalties plus bonuses")
+    updated_at: datetime = Field(..., description="When the rollup was last recomputed")
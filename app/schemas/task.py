@@ -17,4 +17,4 @@ class TaskOut(TaskBase):
     completed_at: Optional[datetime]
 
     class Config:
-        orm_mode = True
+        from_attributes = True
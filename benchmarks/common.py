@@ -0,0 +1,31 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+
+
+def sqlite_sessionmaker(url="sqlite://"):
+    """
+    Return a sessionmaker bound to a SQLite database with every table created.
+    The default in-memory database is shared by all sessions of the process.
+    """
+    if url == "sqlite://":
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of `samples` (pct from 0 to 100).
+    """
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
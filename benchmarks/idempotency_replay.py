@@ -0,0 +1,72 @@
+"""
+Benchmark a retried kiosk request answered from the idempotency store against a
+first-time request that runs the route.
+
+Every first-time request clocks in a different employee with a new key; every
+replay repeats one of those keys. Uses an in-memory SQLite database through the
+full ASGI stack, so first-time latency understates a remote Postgres round trip.
+
+    DATABASE_URL=sqlite:// python -m benchmarks.idempotency_replay --requests 2000
+"""
+import argparse
+import logging
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.main import app
+from app.models.employee import Employee, RoleEnum
+from benchmarks.common import sqlite_sessionmaker
+
+
+def timed(client, employee_id, key):
+    started = time.perf_counter()
+    response = client.post(f"/clock-in/?employee_id={employee_id}", headers={"Idempotency-Key": key})
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.text
+    return elapsed * 1000
+
+
+def summary(label, samples):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:>10}: p50 {statistics.median(samples):.3f} ms  p99 {p99:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2_000, help="Requests per mode")
+    args = parser.parse_args()
+
+    Session = sqlite_sessionmaker()
+    with Session() as db:
+        db.add_all([
+            Employee(name=f"Bench {i}", role=RoleEnum.employee, qr_id=f"bench-{i}", hourly_wage=10000)
+            for i in range(args.requests)
+        ])
+        db.commit()
+        employee_ids = [employee.id for employee in db.query(Employee.id)]
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # Without a context manager the startup hook (which targets the real database) does not run
+    client = TestClient(app)
+
+    first = [timed(client, employee_id, f"key-{employee_id}") for employee_id in employee_ids]
+    replay = [timed(client, employee_id, f"key-{employee_id}") for employee_id in employee_ids]
+
+    summary("first", first)
+    summary("replay", replay)
+
+
+if __name__ == "__main__":
+    main()
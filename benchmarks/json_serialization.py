@@ -0,0 +1,110 @@
+"""
+Benchmark the list response path of GET /breaks/ before and after the orjson fast path.
+
+Modes:
+  response_model - ORM objects validated and dumped through the Pydantic
+                   response_model, then json.dumps (the previous behaviour)
+  orjson         - plain column rows turned into dicts and serialised with orjson
+
+Each mode is timed once as-is and once under tracemalloc for peak memory, at every
+size. Uses an in-memory SQLite database, so query time is included but small.
+
+    DATABASE_URL=sqlite:// python -m benchmarks.json_serialization --sizes 10000 100000 1000000
+"""
+import argparse
+from datetime import datetime, timedelta
+import gc
+import json
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import delete, insert, select
+
+from app.models.attendance import AttendanceLog
+from app.models.breaks import BreakLog
+from app.models.employee import Employee, RoleEnum
+from app.schemas.breaks import BreakLogResponse
+from app.serialization import dumps, rows_as_dicts
+from benchmarks.common import sqlite_sessionmaker
+
+break_list = TypeAdapter(List[BreakLogResponse])
+
+
+def response_model_body(db):
+    breaks = db.query(BreakLog).all()
+    body = json.dumps(break_list.dump_python(break_list.validate_python(breaks), mode="json")).encode()
+    db.expunge_all()
+    return body
+
+
+def orjson_body(db):
+    rows = db.execute(select(
+        BreakLog.attendance_id, BreakLog.break_type, BreakLog.break_start, BreakLog.break_end,
+        BreakLog.total_break_time, BreakLog.id, BreakLog.created_at,
+    ))
+    return dumps(rows_as_dicts(rows))
+
+
+MODES = {"response_model": response_model_body, "orjson": orjson_body}
+
+
+def seed(db, size, attendance_id):
+    db.execute(delete(BreakLog))
+    start = datetime(2025, 1, 1, 12)
+    db.execute(insert(BreakLog), [
+        {
+            "attendance_id": attendance_id,
+            "break_type": "eating",
+            "break_start": start + timedelta(minutes=i),
+            "break_end": start + timedelta(minutes=i, seconds=30),
+            "total_break_time": 0.5,
+            "created_at": start,
+        }
+        for i in range(size)
+    ])
+    db.commit()
+
+
+def measure(build, db):
+    gc.collect()
+    started = time.perf_counter()
+    body = build(db)
+    elapsed = time.perf_counter() - started
+    del body
+
+    gc.collect()
+    tracemalloc.start()
+    build(db)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Rows per run")
+    args = parser.parse_args()
+
+    Session = sqlite_sessionmaker()
+    db = Session()
+    employee = Employee(name="Bench", role=RoleEnum.employee, qr_id="bench", hourly_wage=10000)
+    db.add(employee)
+    db.flush()
+    attendance = AttendanceLog(employee_id=employee.id, clock_in=datetime(2025, 1, 1, 9))
+    db.add(attendance)
+    db.commit()
+    attendance_id = attendance.id
+
+    print(f"{'rows':>9}  {'mode':>14}  {'time':>9}  {'peak memory':>11}")
+    for size in args.sizes:
+        seed(db, size, attendance_id)
+        for mode, build in MODES.items():
+            elapsed, peak = measure(build, db)
+            print(f"{size:>9,}  {mode:>14}  {elapsed * 1000:>7.0f} ms  {peak / 2**20:>8.1f} MiB")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Load test comparing the sync kiosk routes with their /async counterparts.
+
+Fires requests from a fixed number of concurrent kiosks against a running app
+and reports latency percentiles per mode. Each kiosk repeatedly checks the
+status of an employee and, with --breaks, starts and ends a break on that
+employee's open attendance record, exercising the write path as well.
+
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.kiosk_load --base-url http://127.0.0.1:8000 --concurrency 200 --requests 5000
+
+Employees must already exist, and be clocked in for --breaks.
+
+`python -m benchmarks.suite kiosk` runs the same kiosks against the app in-process.
+On a SQLite file (100 kiosks, one CPU) the /async routes were not faster: status
+checks had about the same p50 and two to three times the p99 of the sync ones,
+and with --breaks both modes had failed requests and multi-second tails, SQLite
+allowing one writer at a time. Against a remote Postgres, where requests mostly
+wait on the network, the comparison has not been run; until it is, treat any
+latency gain of the /async routes as unmeasured.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.common import percentile
+
+MODES = {"sync": "", "async": "/async"}
+
+
+async def kiosk(client, prefix, employee_ids, offset, count, with_breaks, latencies, errors):
+    for i in range(count):
+        employee_id = employee_ids[(offset + i) % len(employee_ids)]
+        started = time.perf_counter()
+        response = await client.get(f"{prefix}/employee/status/{employee_id}")
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+            continue
+
+        attendance = response.json().get("attendance")
+        if with_breaks and attendance:
+            for path in ("/breaks/start/", "/breaks/end/"):
+                body = {"attendance_id": attendance["id"], "break_type": "bathroom"}
+                started = time.perf_counter()
+                response = await client.post(f"{prefix}{path}", json=body)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+
+async def run_mode(base_url, mode, employee_ids, concurrency, requests, with_breaks, transport=None):
+    """
+    Run one mode's kiosks against `base_url`, or against `transport` (e.g. an
+    httpx.ASGITransport serving the app in-process) when given.
+    """
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60, transport=transport) as client:
+        per_kiosk = max(1, requests // concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            kiosk(client, MODES[mode], employee_ids, n * per_kiosk, per_kiosk, with_breaks, latencies, errors)
+            for n in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+async def main_async(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        employees = (await client.get("/employees")).json()
+    employee_ids = [employee["id"] for employee in employees]
+    if not employee_ids:
+        raise SystemExit("No employees found; seed the database first.")
+
+    for mode in args.modes:
+        result = await run_mode(args.base_url, mode, employee_ids, args.concurrency, args.requests, args.breaks)
+        print(
+            f"{result['mode']:>5}: {result['requests']} requests, {result['errors']} errors, "
+            f"{result['throughput_rps']:.0f} req/s, p50 {result['p50_ms']:.1f} ms, "
+            f"p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=200, help="Concurrent kiosks")
+    parser.add_argument("--requests", type=int, default=5000, help="Status checks per mode")
+    parser.add_argument("--breaks", action="store_true", help="Also start and end a break after each status check")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
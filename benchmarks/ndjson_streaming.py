@@ -0,0 +1,112 @@
+"""
+Peak memory of the NDJSON streams of GET /breaks/ and GET /attendance as the tables grow.
+
+Seeds N attendance records with one break each, consumes each stream chunk by chunk
+(as the server does while sending it) and reports the tracemalloc peak. The peak
+should stay flat from 10k to 1M rows. Uses a SQLite file database.
+tests/test_ndjson_memory.py asserts the flat peak on every test run; this script
+is for timings and sizes too large for the test suite.
+
+    DATABASE_URL=sqlite:// python -m benchmarks.ndjson_streaming --sizes 10000 100000 1000000
+"""
+import argparse
+from datetime import datetime, timedelta
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import delete, insert, select
+
+import app.routes.attendance as attendance_routes
+import app.serialization as serialization
+from app.models.attendance import AttendanceLog
+from app.models.breaks import BreakLog
+from app.models.employee import Employee, RoleEnum
+from benchmarks.common import sqlite_sessionmaker
+
+SEED_CHUNK = 50_000
+
+
+def seed(db, size, employee_id):
+    db.execute(delete(BreakLog))
+    db.execute(delete(AttendanceLog))
+    start = datetime(2020, 1, 1, 9)
+    for offset in range(0, size, SEED_CHUNK):
+        count = min(SEED_CHUNK, size - offset)
+        db.execute(insert(AttendanceLog), [
+            {
+                "id": offset + i + 1,
+                "employee_id": employee_id,
+                "clock_in": start + timedelta(hours=offset + i),
+                "clock_out": start + timedelta(hours=offset + i, minutes=30),
+                "total_hours": 0.5,
+                "created_at": start,
+            }
+            for i in range(count)
+        ])
+        db.execute(insert(BreakLog), [
+            {
+                "attendance_id": offset + i + 1,
+                "break_type": "eating",
+                "break_start": start + timedelta(hours=offset + i, minutes=10),
+                "break_end": start + timedelta(hours=offset + i, minutes=20),
+                "total_break_time": 10,
+                "created_at": start,
+            }
+            for i in range(count)
+        ])
+    db.commit()
+
+
+def consume(chunks):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    total_bytes = 0
+    for chunk in chunks:
+        total_bytes += len(chunk)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Rows per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        Session = sqlite_sessionmaker(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        # The streams open their own sessions; point them at the benchmark database
+        serialization.SessionLocal = Session
+        attendance_routes.SessionLocal = Session
+
+        db = Session()
+        employee = Employee(name="Bench", role=RoleEnum.employee, qr_id="bench", hourly_wage=10000)
+        db.add(employee)
+        db.commit()
+        employee_id = employee.id
+
+        streams = {
+            "/breaks/": lambda: serialization.iter_ndjson_rows(select(
+                BreakLog.attendance_id, BreakLog.break_type, BreakLog.break_start, BreakLog.break_end,
+                BreakLog.total_break_time, BreakLog.id, BreakLog.created_at,
+            )),
+            "/attendance": attendance_routes._iter_attendance_ndjson,
+        }
+
+        print(f"{'rows':>9}  {'stream':>11}  {'time':>9}  {'body':>9}  {'peak memory':>11}")
+        for size in args.sizes:
+            seed(db, size, employee_id)
+            for name, stream in streams.items():
+                elapsed, peak, total_bytes = consume(stream())
+                print(f"{size:>9,}  {name:>11}  {elapsed:>7.1f} s  {total_bytes / 2**20:>5.0f} MiB"
+                      f"  {peak / 2**20:>8.1f} MiB")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
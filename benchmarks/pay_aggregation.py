@@ -0,0 +1,177 @@
+"""
+Benchmark monthly net-pay aggregation for all employees: Python versus SQL.
+
+Modes:
+  orm_python - ORM attendance objects with their breaks, late records, penalties
+               and bonuses eager-loaded, summed in Python (row_from_attendance)
+  rows_python - one aggregated rows_statement() query, pay computed in Python
+               with compute_batch()
+  sql        - pay_statement() grouped by employee, so only one row per employee
+               leaves the database
+
+Every mode produces per-employee net pay, worked hours and break hours for one
+month; the totals are checked against each other. Uses a SQLite file database,
+whose julianday() arithmetic is only exact to tens of microseconds, so totals
+are compared to one part in a million.
+
+    DATABASE_URL=sqlite:// python -m benchmarks.pay_aggregation --employees 200 --repeat 5
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import selectinload
+
+from app import payroll
+from app.models.attendance import AttendanceLog, Bonus, LateRecord, Penalty
+from app.models.breaks import BreakLog
+from app.models.employee import Employee
+from benchmarks.common import sqlite_sessionmaker
+
+MONTH_START = datetime(2025, 3, 1)
+MONTH_END = datetime(2025, 4, 1)
+
+
+def seed(db, employees, seed=0):
+    """
+    Three months of shifts for `employees` employees, so the benchmarked month is a slice of the tables.
+    """
+    rng = random.Random(seed)
+    db.execute(insert(Employee), [
+        {"id": i, "name": f"Bench {i}", "role": "employee", "qr_id": f"bench-{i}", "hourly_wage": rng.choice((9860, 10030, 12000))}
+        for i in range(1, employees + 1)
+    ])
+    attendance, breaks, late, penalties, bonuses = [], [], [], [], []
+    day = MONTH_START - timedelta(days=31)
+    while day < MONTH_END + timedelta(days=30):
+        for employee_id in range(1, employees + 1):
+            attendance_id = len(attendance) + 1
+            clock_in = day + timedelta(hours=9, minutes=rng.randint(-20, 40), seconds=rng.randint(0, 59))
+            attendance.append({
+                "id": attendance_id,
+                "employee_id": employee_id,
+                "clock_in": clock_in,
+                "clock_out": clock_in + timedelta(hours=rng.uniform(4, 10)),
+                "created_at": clock_in,
+            })
+            for k in range(rng.randint(0, 3)):
+                break_start = clock_in + timedelta(hours=k + 1, minutes=rng.randint(0, 30))
+                breaks.append({
+                    "attendance_id": attendance_id,
+                    "break_type": "eating",
+                    "break_start": break_start,
+                    "break_end": break_start + timedelta(minutes=rng.randint(5, 40)),
+                })
+            if clock_in.minute > 10 and clock_in.hour == 9:
+                late.append({"attendance_id": attendance_id, "late_duration_minutes": clock_in.minute,
+                             "deduction_amount": 150 * clock_in.minute})
+            if rng.random() < 0.1:
+                penalties.append({"attendance_id": attendance_id, "description": "bench", "price": 5000})
+            if rng.random() < 0.05:
+                bonuses.append({"attendance_id": attendance_id, "description": "bench", "price": 10000})
+        day += timedelta(days=1)
+
+    for model, rows in ((AttendanceLog, attendance), (BreakLog, breaks), (LateRecord, late),
+                        (Penalty, penalties), (Bonus, bonuses)):
+        if rows:
+            db.execute(insert(model), rows)
+    db.commit()
+    return len(attendance)
+
+
+def _add(totals, employee_id, net_pay, worked_hours, break_hours):
+    employee_totals = totals[employee_id]
+    employee_totals[0] += net_pay
+    employee_totals[1] += worked_hours
+    employee_totals[2] += break_hours
+
+
+in_month = (AttendanceLog.clock_in >= MONTH_START, AttendanceLog.clock_in < MONTH_END)
+
+
+def orm_python(db, now):
+    totals = defaultdict(lambda: [0.0, 0.0, 0.0])
+    logs = (
+        db.query(AttendanceLog)
+        .options(
+            selectinload(AttendanceLog.employee),
+            selectinload(AttendanceLog.break_logs),
+            selectinload(AttendanceLog.late_record),
+            selectinload(AttendanceLog.penalties),
+            selectinload(AttendanceLog.bonuses),
+        )
+        .filter(*in_month)
+        .all()
+    )
+    for pay in payroll.compute_batch((payroll.row_from_attendance(log) for log in logs), now):
+        _add(totals, pay.employee_id, pay.net_pay, pay.hours_excluding_breaks, pay.break_hours)
+    db.expunge_all()
+    return totals
+
+
+def rows_python(db, now):
+    totals = defaultdict(lambda: [0.0, 0.0, 0.0])
+    for pay in payroll.compute_batch(payroll.load_rows(db, *in_month), now):
+        _add(totals, pay.employee_id, pay.net_pay, pay.hours_excluding_breaks, pay.break_hours)
+    return totals
+
+
+def sql(db, now):
+    pay = payroll.pay_statement(*in_month, now=now).subquery()
+    rows = db.execute(
+        select(
+            pay.c.employee_id,
+            func.sum(pay.c.net_pay),
+            func.sum(pay.c.hours_excluding_breaks),
+            func.sum(pay.c.break_hours),
+        ).group_by(pay.c.employee_id)
+    )
+    return {employee_id: [net_pay, worked_hours, break_hours] for employee_id, net_pay, worked_hours, break_hours in rows}
+
+
+MODES = {"orm_python": orm_python, "rows_python": rows_python, "sql": sql}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=200, help="Employees with a shift every day")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per mode; the median is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        Session = sqlite_sessionmaker(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        db = Session()
+        shifts = seed(db, args.employees)
+        month_shifts = db.query(func.count(AttendanceLog.id)).filter(*in_month).scalar()
+        print(f"{shifts:,} shifts seeded, {month_shifts:,} in the benchmarked month")
+
+        now = datetime.now()
+        reference = None
+        print(f"{'mode':>12}  {'median':>9}  {'min':>9}")
+        for mode, aggregate in MODES.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                totals = aggregate(db, now)
+                timings.append(time.perf_counter() - started)
+            print(f"{mode:>12}  {statistics.median(timings) * 1000:>6.0f} ms  {min(timings) * 1000:>6.0f} ms")
+
+            if reference is None:
+                reference = totals
+            elif any(
+                abs(reference[employee_id][i] - totals[employee_id][i]) > 1e-6 * max(1, abs(reference[employee_id][i]))
+                for employee_id in reference
+                for i in range(3)
+            ):
+                raise SystemExit(f"{mode} totals differ from orm_python")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for the payroll engine in app/payroll.py.
+
+Measures rows/second for single-record calls (one compute_pay per row, as the
+per-attendance endpoints do) and for bulk calls (one compute_batch over all rows,
+as report and export runs do). No database is used, but importing the app needs
+a DATABASE_URL.
+
+    DATABASE_URL=sqlite:// python -m benchmarks.payroll_engine --rows 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.payroll import PayrollRow, compute_batch, compute_pay
+
+
+def make_rows(count, seed=0):
+    """
+    Build `count` synthetic PayrollRow tuples spread over one year.
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 9, 0)
+    rows = []
+    for i in range(count):
+        clock_in = start + timedelta(days=i % 365, minutes=rng.randint(-20, 40))
+        # Leave roughly one shift in a hundred open
+        clock_out = None if i % 100 == 0 else clock_in + timedelta(hours=rng.uniform(4, 10))
+        rows.append(PayrollRow(
+            i + 1,
+            i % 300 + 1,
+            clock_in,
+            clock_out,
+            float(rng.choice((9860, 10030, 12000))),
+            rng.uniform(0, 1.5),
+            rng.choice((0, 0, 0, 12.5)),
+            rng.choice((0, 0, 0, 2500)),
+            rng.choice((0, 0, 10000)),
+            rng.choice((0, 0, 0, 5000)),
+        ))
+    return rows
+
+
+def run(rows, repeat):
+    now = datetime.now()
+    results = {}
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for row in rows:
+            compute_pay(row, now)
+        best = min(best, time.perf_counter() - started)
+    results["single"] = len(rows) / best
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compute_batch(rows, now)
+        best = min(best, time.perf_counter() - started)
+    results["bulk"] = len(rows) / best
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of attendance rows")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode; the best run is reported")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    for mode, rate in run(rows, args.repeat).items():
+        print(f"{mode:>6}: {rate:,.0f} rows/s ({args.rows:,} rows)")
+
+
+if __name__ == "__main__":
+    main()
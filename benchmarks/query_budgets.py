@@ -0,0 +1,118 @@
+"""
+Check the hot routes against their SQL statement budgets.
+
+Seeds an in-memory SQLite database with benchmarks.dataset and calls each route
+through the TestClient inside query_budget(). The budgets are fixed numbers,
+not per-row, so a route that starts loading relationships lazily or querying
+once per employee fails here however small the dataset is. Exits with status 1
+when any route goes over its budget and prints the statements it ran:
+
+    DATABASE_URL=sqlite:// python -m benchmarks.query_budgets --employees 30
+
+Lower a budget when a route gets cheaper; raise one only with a reason.
+"""
+import argparse
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.database import get_db
+from app.instrumentation import QueryBudgetExceeded, query_budget
+from app.main import app
+from app.models.attendance import AttendanceLog
+from app.models.employee import Employee
+from benchmarks.common import sqlite_sessionmaker
+from benchmarks.dataset import seed
+
+# Route -> most SQL statements one request may run
+BUDGETS = {
+    "GET /employees": 1,
+    "GET /employees/status/": 3,
+    "GET /employee/status/{employee_id}": 3,
+    "GET /attendance/{employee_id}": 4,
+    "GET /get/attendance/{attendance_id}": 1,
+    "GET /report/{employee_id}": 6,
+    "GET /report/team": 6,
+    # Includes reading the restaurant hours, which are not cached yet on the first clock-in
+    "POST /clock-in/": 5,
+    # Includes reading the closed payroll periods, which are not cached yet on the first break
+    "POST /breaks/start/": 6,
+    "POST /breaks/end/": 5,
+    "POST /clock-out/": 7,
+}
+
+
+def requests(db):
+    """
+    (route, method, path, keyword arguments) for every budgeted route, in an order that keeps
+    the kiosk calls valid: the sampled employee has no shift today until it clocks in.
+    """
+    week = (date.today() - timedelta(days=date.today().weekday() + 7)).isoformat()
+    shift = db.execute(select(AttendanceLog).where(AttendanceLog.clock_out.isnot(None)).limit(1)).scalar()
+    on_shift = db.execute(select(AttendanceLog.employee_id).where(AttendanceLog.clock_out.is_(None))).scalars().all()
+    free_employee_id = db.execute(
+        select(Employee.id).where(Employee.role == "employee", Employee.id.notin_(on_shift)).limit(1)
+    ).scalar()
+    return [
+        ("GET /employees", "GET", "/employees", {}),
+        ("GET /employees/status/", "GET", "/employees/status/", {}),
+        ("GET /employee/status/{employee_id}", "GET", f"/employee/status/{shift.employee_id}", {}),
+        ("GET /attendance/{employee_id}", "GET", f"/attendance/{shift.employee_id}", {}),
+        ("GET /get/attendance/{attendance_id}", "GET", f"/get/attendance/{shift.id}", {}),
+        ("GET /report/{employee_id}", "GET", f"/report/{shift.employee_id}", {"params": {"start_date": week}}),
+        ("GET /report/team", "GET", "/report/team", {"params": {"start_date": week}}),
+        ("POST /clock-in/", "POST", "/clock-in/", {"params": {"employee_id": free_employee_id}}),
+        ("POST /breaks/start/", "POST", "/breaks/start/", {"json": {"break_type": "rest"}}),
+        ("POST /breaks/end/", "POST", "/breaks/end/", {"json": {}}),
+        ("POST /clock-out/", "POST", "/clock-out/", {"params": {"employee_id": free_employee_id}}),
+    ], free_employee_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=30, help="Employees in the seeded dataset")
+    parser.add_argument("--days", type=int, default=21, help="Days of history in the seeded dataset")
+    args = parser.parse_args()
+
+    Session = sqlite_sessionmaker()
+    with Session() as db:
+        seed(db, args.employees, args.days)
+        calls, free_employee_id = requests(db)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    # No `with`: the startup hook would initialise the configured database
+    client = TestClient(app)
+
+    failures = 0
+    for route, method, path, kwargs in calls:
+        if route in ("POST /breaks/start/", "POST /breaks/end/"):
+            # The break routes take the attendance record opened by the clock-in above
+            kwargs["json"]["attendance_id"] = client.get(f"/employee/status/{free_employee_id}").json()["attendance"]["id"]
+        try:
+            with query_budget(BUDGETS[route], route) as stats:
+                response = client.request(method, path, **kwargs)
+        except QueryBudgetExceeded as e:
+            failures += 1
+            print(f"FAIL {e}")
+            continue
+        if response.status_code >= 400:
+            failures += 1
+            print(f"FAIL {route}: HTTP {response.status_code} {response.text[:200]}")
+            continue
+        print(f"ok   {route}: {stats.statements} of {BUDGETS[route]} statements")
+
+    app.dependency_overrides.pop(get_db)
+    if failures:
+        raise SystemExit(f"{failures} route(s) failed")
+
+
+if __name__ == "__main__":
+    main()
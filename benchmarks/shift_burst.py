@@ -0,0 +1,259 @@
+"""
+Replay the opening-shift badge burst against a running app.
+
+At opening most of the staff scan their badges within about ten minutes. Each
+simulated employee arrives at a time drawn from the arrival curve and then, a
+short think time apart, logs in at the kiosk, clocks in, loads their status and
+starts a break on the attendance record it returns:
+
+    POST /login  ->  POST /clock-in/  ->  GET /employee/status/{id}  ->  POST /breaks/start/
+
+Reports throughput, error rate and latency percentiles per step, the busiest
+minute of arrivals, and the SQLAlchemy pool checkout waits over the run (read
+from GET /debug/pool before and after, so run a single worker or the numbers
+only cover the worker that answered). The /debug routes only exist with DEBUG set:
+
+    DEBUG=1 uvicorn app.main:app --workers 1 --port 8000 &
+    python -m benchmarks.shift_burst --headcount 300 --window 600 --curve normal
+    python -m benchmarks.shift_burst --headcount 300 --window 60 --mode async --output burst.json
+
+Only employees without an attendance record today are used, so point the app at
+a benchmark database (see benchmarks.dataset) and reseed it between runs.
+"""
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+import json
+import random
+import statistics
+import time
+
+import httpx
+
+from benchmarks.common import percentile
+
+# Route prefixes of the kiosk steps; /login has no async version
+MODES = {"sync": "", "async": "/async"}
+
+STEPS = ["login", "clock_in", "status", "break_start"]
+
+
+def arrival_offsets(headcount, window, curve, peak, rng):
+    """
+    Seconds after the start at which each employee arrives, sorted.
+    `peak` is the busiest moment as a fraction of the window (ignored by the uniform curve).
+    """
+    if curve == "uniform":
+        offsets = [rng.uniform(0, window) for _ in range(headcount)]
+    elif curve == "triangular":
+        offsets = [rng.triangular(0, window, peak * window) for _ in range(headcount)]
+    else:
+        # Normal around the peak, with the window covering about three standard deviations each side
+        offsets = [min(window, max(0.0, rng.gauss(peak * window, window / 6))) for _ in range(headcount)]
+    return sorted(offsets)
+
+
+def busiest_minute(offsets):
+    """
+    Largest number of arrivals within any 60 second span.
+    """
+    busiest, first = 0, 0
+    for last, offset in enumerate(offsets):
+        while offset - offsets[first] > 60:
+            first += 1
+        busiest = max(busiest, last - first + 1)
+    return busiest
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.status_codes = defaultdict(Counter)
+
+    def record(self, step, started, response):
+        self.latencies[step].append(time.perf_counter() - started)
+        self.status_codes[step][response.status_code] += 1
+        return response.status_code < 400
+
+    def fail(self, step, reason):
+        self.status_codes[step][reason] += 1
+
+
+async def employee_scans(client, prefix, employee, offset, think_time, start, results):
+    await asyncio.sleep(max(0.0, start + offset - time.perf_counter()))
+    try:
+        started = time.perf_counter()
+        if not results.record("login", started, await client.post("/login", json={"qr_id": employee["qr_id"]})):
+            return
+        await asyncio.sleep(think_time)
+
+        started = time.perf_counter()
+        response = await client.post(f"{prefix}/clock-in/", params={"employee_id": employee["id"]})
+        if not results.record("clock_in", started, response):
+            return
+        await asyncio.sleep(think_time)
+
+        started = time.perf_counter()
+        response = await client.get(f"{prefix}/employee/status/{employee['id']}")
+        if not results.record("status", started, response):
+            return
+        attendance = response.json().get("attendance")
+        if not attendance:
+            results.fail("break_start", "no attendance")
+            return
+        await asyncio.sleep(think_time)
+
+        started = time.perf_counter()
+        body = {"attendance_id": attendance["id"], "break_type": "rest"}
+        results.record("break_start", started, await client.post(f"{prefix}/breaks/start/", json=body))
+    except httpx.HTTPError as e:
+        results.fail("transport", type(e).__name__)
+
+
+def pool_wait_delta(before, after):
+    """
+    Checkout waits between two GET /debug/pool readings, per engine.
+    Percentiles are the upper bounds of the histogram buckets they fall in.
+    """
+    delta = {}
+    for name, pool in after.items():
+        if "wait" not in pool:
+            continue
+        old = before.get(name, {}).get("wait", {"checkouts": 0, "timeouts": 0, "total_seconds": 0.0, "buckets": {}})
+        new = pool["wait"]
+        counts = [(bound, count - old["buckets"].get(bound, 0)) for bound, count in new["buckets"].items()]
+        checkouts = new["checkouts"] - old["checkouts"]
+        summary = {
+            "checkouts": checkouts,
+            "timeouts": new["timeouts"] - old["timeouts"],
+            "mean_ms": (new["total_seconds"] - old["total_seconds"]) / checkouts * 1000 if checkouts else 0.0,
+            "max_ms_since_start": new["max_seconds"] * 1000,
+            "size": pool.get("size"),
+            "max_overflow": pool.get("max_overflow"),
+        }
+        for pct in (50, 95, 99):
+            target, seen = pct / 100 * checkouts, 0
+            for bound, count in counts:
+                seen += count
+                if checkouts and seen >= target:
+                    summary[f"p{pct}_ms_at_most"] = float(bound) * 1000 if bound != "inf" else None
+                    break
+        delta[name] = summary
+    return delta
+
+
+async def read_pool(client):
+    response = await client.get("/debug/pool")
+    if response.status_code == 404:
+        raise SystemExit("GET /debug/pool is not available; start the app with DEBUG=1.")
+    response.raise_for_status()
+    return response.json()
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        employees = (await client.get("/employees")).json()
+        statuses = (await client.get("/employees/status/")).json()["employees"]
+        clocked_in = {status["employee"]["id"] for status in statuses if status["attendance"]}
+        available = [e for e in employees if e["role"] == "employee" and e["id"] not in clocked_in]
+        if len(available) < args.headcount:
+            raise SystemExit(f"Only {len(available)} employees have not clocked in today; "
+                             f"lower --headcount or reseed the database.")
+
+        rng = random.Random(args.seed)
+        staff = rng.sample(available, args.headcount)
+        offsets = arrival_offsets(args.headcount, args.window, args.curve, args.peak, rng)
+
+        pool_before = await read_pool(client)
+        results = Results()
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            employee_scans(client, MODES[args.mode], employee, offset, args.think_time, start, results)
+            for employee, offset in zip(staff, offsets)
+        ))
+        elapsed = time.perf_counter() - start
+        pool_after = await read_pool(client)
+
+    requests = sum(len(latencies) for latencies in results.latencies.values())
+    failed = sum(
+        count for counts in results.status_codes.values()
+        for code, count in counts.items() if not isinstance(code, int) or code >= 400
+    )
+    report = {
+        "scenario": {
+            "mode": args.mode,
+            "headcount": args.headcount,
+            "window_s": args.window,
+            "curve": args.curve,
+            "peak": args.peak,
+            "think_time_s": args.think_time,
+            "busiest_minute_arrivals": busiest_minute(offsets),
+        },
+        "elapsed_s": elapsed,
+        "requests": requests,
+        "throughput_rps": requests / elapsed,
+        "error_rate": failed / max(1, requests),
+        "steps": {
+            step: {
+                "requests": len(results.latencies[step]),
+                "status_codes": {str(code): count for code, count in sorted(results.status_codes[step].items(), key=str)},
+                "p50_ms": percentile(results.latencies[step], 50) * 1000,
+                "p95_ms": percentile(results.latencies[step], 95) * 1000,
+                "p99_ms": percentile(results.latencies[step], 99) * 1000,
+                "max_ms": max(results.latencies[step]) * 1000,
+                "mean_ms": statistics.fmean(results.latencies[step]) * 1000,
+            }
+            for step in STEPS if results.latencies[step]
+        },
+        "transport_errors": dict(results.status_codes["transport"]),
+        "pool_wait": pool_wait_delta(pool_before, pool_after),
+    }
+    return report
+
+
+def print_report(report):
+    scenario = report["scenario"]
+    print(f"{scenario['headcount']} employees over {scenario['window_s']:.0f} s ({scenario['curve']} curve, "
+          f"{scenario['busiest_minute_arrivals']} in the busiest minute), {scenario['mode']} routes")
+    print(f"{report['requests']} requests in {report['elapsed_s']:.1f} s: {report['throughput_rps']:.1f} req/s, "
+          f"{report['error_rate']:.2%} errors")
+    print(f"{'step':>12}  {'n':>6}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'max ms':>8}  status codes")
+    for step, stats in report["steps"].items():
+        print(f"{step:>12}  {stats['requests']:>6}  {stats['p50_ms']:>8.1f}  {stats['p95_ms']:>8.1f}  "
+              f"{stats['p99_ms']:>8.1f}  {stats['max_ms']:>8.1f}  {stats['status_codes']}")
+    if report["transport_errors"]:
+        print(f"transport errors: {report['transport_errors']}")
+    for name, wait in report["pool_wait"].items():
+        if not wait["checkouts"]:
+            continue
+        print(f"{name} pool (size {wait['size']} + {wait['max_overflow']} overflow): {wait['checkouts']} checkouts, "
+              f"{wait['timeouts']} timeouts, mean wait {wait['mean_ms']:.2f} ms, "
+              f"p95 <= {wait.get('p95_ms_at_most')} ms, p99 <= {wait.get('p99_ms_at_most')} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--headcount", type=int, default=200, help="Employees arriving during the burst")
+    parser.add_argument("--window", type=float, default=600, help="Seconds over which they arrive")
+    parser.add_argument("--curve", choices=["uniform", "triangular", "normal"], default="normal",
+                        help="Shape of the arrival times within the window")
+    parser.add_argument("--peak", type=float, default=0.5, help="Busiest moment as a fraction of the window")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Seconds between an employee's scans")
+    parser.add_argument("--mode", choices=sorted(MODES), default="sync", help="Sync or /async kiosk routes")
+    parser.add_argument("--max-connections", type=int, default=500, help="Concurrent HTTP connections")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark /validate-token before and after the stateless fast path.
+
+Modes:
+  database   - the employee row is fetched on every call (the previous behaviour)
+  cached     - verify_user=true, served from the short-TTL employee cache
+  stateless  - answered from the token claims alone
+
+Uses an in-memory SQLite database, so the database mode understates the cost of
+a round trip to a remote Postgres.
+
+    DATABASE_URL=sqlite:// python -m benchmarks.validate_token --calls 20000
+"""
+import argparse
+import time
+
+from app.models.employee import Employee, RoleEnum
+from app.routes.employee import create_token, employee_cache, validate_token
+from benchmarks.common import sqlite_sessionmaker
+
+
+def run(mode, calls, authorization, db):
+    verify_user = mode != "stateless"
+    started = time.perf_counter()
+    for _ in range(calls):
+        if mode == "database":
+            employee_cache.invalidate()
+        validate_token(Authorization=authorization, verify_user=verify_user, db=db)
+    return calls / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20_000, help="Validations per mode")
+    args = parser.parse_args()
+
+    Session = sqlite_sessionmaker()
+    db = Session()
+    employee = Employee(name="Bench Admin", role=RoleEnum.admin, qr_id="bench-admin", hourly_wage=10000)
+    db.add(employee)
+    db.commit()
+
+    authorization = "Bearer " + create_token(employee.id, employee.role.value, employee.name)
+    for mode in ("database", "cached", "stateless"):
+        print(f"{mode:>9}: {run(mode, args.calls, authorization, db):,.0f} validations/s")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Shared fixtures. The app runs against a SQLite file in a temporary directory,
+which every test starts from empty.
+
+DATABASE_URL is overwritten, not defaulted, before the app is imported: the
+tests delete every row, so they must never pick up a real database from the
+environment or a .env file.
+
+Install the app and test dependencies with `pip install -r requirements-dev.txt`,
+then run `pytest` from the repository root.
+"""
+import os
+import tempfile
+
+_directory = tempfile.mkdtemp(prefix="employee-backend-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directory, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from decimal import Decimal  # noqa: E402
+import itertools  # noqa: E402
+
+from fastapi.testclient import TestClient  # noqa: E402
+import pytest  # noqa: E402
+
+from app.cache import restaurant_hours_cache  # noqa: E402
+from app.database import Base, SessionLocal, engine, init_db  # noqa: E402
+from app.idempotency import idempotency_cache  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.employee import Employee, RoleEnum  # noqa: E402
+from app.payroll_periods import closed_periods_cache  # noqa: E402
+from app.routes.employee import employee_cache, qr_index  # noqa: E402
+
+_qr_ids = itertools.count(1)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    # Creates the tables and applies every migration once
+    init_db()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def empty_database(database):
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    for cache in (restaurant_hours_cache, idempotency_cache, employee_cache, closed_periods_cache):
+        cache.invalidate()
+    qr_index.load([])
+    yield
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def client():
+    # No `with`: the startup hook would run init_db again for every test
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_employee(db):
+    """
+    Factory adding an employee and returning its id.
+    """
+    def make_employee(name="Employee", role=RoleEnum.employee, hourly_wage=Decimal("10000")):
+        employee = Employee(name=name, role=role, qr_id=f"test-{next(_qr_ids):06d}", hourly_wage=hourly_wage)
+        db.add(employee)
+        db.commit()
+        return employee.id
+
+    return make_employee
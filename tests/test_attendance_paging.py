@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.instrumentation import query_budget
+from app.models.attendance import AttendanceLog
+from app.models.breaks import BreakLog
+
+RECORDS = 25
+PER_PAGE = 10
+
+
+@pytest.fixture
+def employee_id(db, make_employee):
+    employee_id = make_employee()
+    for day in range(RECORDS):
+        clock_in = datetime(2026, 1, 1, 9) + timedelta(days=day)
+        attendance = AttendanceLog(employee_id=employee_id, clock_in=clock_in, clock_out=clock_in + timedelta(hours=8))
+        attendance.break_logs = [BreakLog(break_type="rest", break_start=clock_in + timedelta(hours=2),
+                                          break_end=clock_in + timedelta(hours=3), total_break_time=60)]
+        db.add(attendance)
+    db.commit()
+    return employee_id
+
+
+def test_cursor_pages_cover_every_record_once(client, employee_id):
+    seen = []
+    params = {"per_page": PER_PAGE}
+    while True:
+        # Employee, count, the page with its pay, the page's breaks
+        with query_budget(4, "GET /attendance/{employee_id}"):
+            body = client.get(f"/attendance/{employee_id}", params=params).json()
+        seen += [(record["clock_in"], record["id"]) for record in body["attendance_records"]]
+        assert all(record["net_pay"] == 70000 for record in body["attendance_records"])
+        if not body["has_more"]:
+            break
+        params["cursor"] = body["next_cursor"]
+
+    assert len(seen) == RECORDS
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_numbered_pages_match_cursor_pages(client, employee_id):
+    first = client.get(f"/attendance/{employee_id}", params={"per_page": PER_PAGE}).json()
+    by_cursor = client.get(f"/attendance/{employee_id}", params={"per_page": PER_PAGE, "cursor": first["next_cursor"]})
+    by_number = client.get(f"/attendance/{employee_id}", params={"per_page": PER_PAGE, "page": 2})
+
+    assert by_cursor.json()["attendance_records"] == by_number.json()["attendance_records"]
+    assert client.get(f"/attendance/{employee_id}", params={"per_page": PER_PAGE, "page": 4}).status_code == 404
+
+
+def test_pay_is_only_aggregated_for_the_page(client, employee_id):
+    with query_budget(4, "GET /attendance/{employee_id}") as stats:
+        client.get(f"/attendance/{employee_id}", params={"per_page": PER_PAGE, "include_total": False})
+
+    pay_statements = [statement for statement in stats.recorded if "sum(" in statement]
+    assert len(pay_statements) == 1
+    # Every aggregate reads the ids of the picked page, not the employee's whole history
+    assert pay_statements[0].startswith("WITH attendance_page AS")
+    assert pay_statements[0].count("FROM attendance_page") == 5
@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.main import app
+from app.models.attendance import AttendanceLog
+
+SCANS = 8
+
+
+def test_parallel_clock_ins_create_one_record(db, make_employee):
+    employee_id = make_employee()
+    barrier = Barrier(SCANS)
+
+    def scan(_):
+        client = TestClient(app)
+        barrier.wait()
+        return client.post("/clock-in/", params={"employee_id": employee_id})
+
+    with ThreadPoolExecutor(SCANS) as pool:
+        responses = list(pool.map(scan, range(SCANS)))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] + [400] * (SCANS - 1), [response.text for response in responses]
+    assert all(
+        response.json()["detail"] == "Employee has already clocked in for today"
+        for response in responses if response.status_code == 400
+    )
+    assert db.scalar(select(func.count()).where(AttendanceLog.employee_id == employee_id)) == 1
@@ -0,0 +1,23 @@
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_import_fails_without_database_url(tmp_path):
+    if (ROOT / ".env").exists():
+        pytest.skip("a .env file provides DATABASE_URL")
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+    env["PYTHONPATH"] = str(ROOT)
+
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.database"],
+        cwd=tmp_path, env=env, capture_output=True, text=True,
+    )
+
+    assert result.returncode != 0
+    assert "DATABASE_URL is not set" in result.stderr
@@ -0,0 +1,25 @@
+import pytest
+
+from app.routes import debug
+
+DEBUG_REQUESTS = [("GET", "/debug/pool"), ("GET", "/debug/queries"), ("DELETE", "/debug/queries")]
+
+
+@pytest.mark.parametrize("method, path", DEBUG_REQUESTS)
+def test_debug_routes_are_hidden_without_debug(client, monkeypatch, method, path):
+    monkeypatch.setattr(debug, "DEBUG_ENDPOINTS", False)
+
+    assert client.request(method, path).status_code == 404
+
+
+@pytest.mark.parametrize("method, path", DEBUG_REQUESTS)
+def test_debug_routes_answer_with_debug(client, monkeypatch, method, path):
+    monkeypatch.setattr(debug, "DEBUG_ENDPOINTS", True)
+
+    assert client.request(method, path).status_code == 200
+
+
+def test_metrics_stay_public(client, monkeypatch):
+    monkeypatch.setattr(debug, "DEBUG_ENDPOINTS", False)
+
+    assert client.get("/metrics").status_code == 200
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.models.attendance import AttendanceLog, LateRecord
+from app.models.employee import Employee, RoleEnum
+from app.routes.employee import load_qr_index
+
+
+def test_delete_employee_removes_late_records(client, db, make_employee):
+    employee_id = make_employee()
+    clock_in = datetime.now() - timedelta(days=2)
+    attendance = AttendanceLog(employee_id=employee_id, clock_in=clock_in, clock_out=clock_in + timedelta(hours=8))
+    attendance.late_record = LateRecord(late_duration_minutes=Decimal("15"), deduction_amount=Decimal("2500"))
+    db.add(attendance)
+    db.commit()
+
+    response = client.delete(f"/employee/{employee_id}")
+
+    assert response.status_code == 200
+    assert db.scalar(select(func.count(LateRecord.id))) == 0
+
+
+def test_admin_login_checks_the_badge_is_still_current(client, db, make_employee):
+    admin = db.get(Employee, make_employee(role=RoleEnum.admin))
+    qr_id = admin.qr_id
+    assert client.post("/admin/login", json={"qr_id": qr_id}).status_code == 200
+
+    # Deleted by another worker: this process's index still holds the badge
+    load_qr_index(db)
+    db.delete(admin)
+    db.commit()
+
+    response = client.post("/admin/login", json={"qr_id": qr_id})
+    assert response.status_code == 404, response.text
+
+
+def test_login_answers_404_and_403(client, db, make_employee):
+    employee = db.get(Employee, make_employee())
+
+    assert client.post("/login", json={"qr_id": "unknown"}).status_code == 404
+    assert client.post("/admin/login", json={"qr_id": "unknown"}).status_code == 404
+    assert client.post("/admin/login", json={"qr_id": employee.qr_id}).status_code == 403
+    assert client.post("/login", json={"qr_id": employee.qr_id}).json()["id"] == employee.id
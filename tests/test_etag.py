@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.table_version import TableVersion
+from app.models.attendance import AttendanceLog
+from app.models.breaks import BreakLog
+from app.models.employee import Employee, RoleEnum
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+@pytest.fixture
+def with_break(db, make_employee):
+    clock_in = datetime.now() - timedelta(days=1)
+    attendance = AttendanceLog(employee_id=make_employee(), clock_in=clock_in, clock_out=clock_in + timedelta(hours=8))
+    attendance.break_logs = [BreakLog(break_type="rest", break_start=clock_in + timedelta(hours=1),
+                                      break_end=clock_in + timedelta(hours=1, minutes=10), total_break_time=10)]
+    db.add(attendance)
+    db.commit()
+    return attendance.id
+
+
+def test_unchanged_tables_answer_304(client, make_employee):
+    make_employee()
+    first = client.get("/employees")
+    assert first.status_code == 200
+    assert first.headers["Vary"] == "Accept"
+
+    again = client.get("/employees", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.headers["Vary"] == "Accept"
+    assert again.content == b""
+
+
+def test_write_invalidates_etag(client, make_employee):
+    make_employee()
+    first = client.get("/employees")
+
+    created = client.post("/employee", json={"name": "New", "role": "employee", "hourly_wage": 12000})
+    assert created.status_code == 200
+    again = client.get("/employees", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert again.status_code == 200
+    assert again.headers["ETag"] != first.headers["ETag"]
+    assert "New" in {employee["name"] for employee in again.json()}
+
+
+def test_write_keeps_etag_of_other_tables(client, make_employee):
+    make_employee()
+    first = client.get("/tasks/")
+    assert first.status_code == 200
+
+    created = client.post("/employee", json={"name": "New", "role": "employee", "hourly_wage": 12000})
+    assert created.status_code == 200
+
+    assert client.get("/tasks/", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+
+def test_etag_comes_from_the_stored_versions(client, db, make_employee):
+    make_employee()
+    first = client.get("/employees")
+
+    # What another worker sees: the committed counter, not anything held by this process
+    assert first.headers["ETag"] == f'W/"{db.get(TableVersion, "employees").version}"'
+
+
+def test_rolled_back_write_keeps_etag(client, db, make_employee):
+    make_employee()
+    first = client.get("/employees")
+
+    db.add(Employee(name="Rolled back", role=RoleEnum.employee, qr_id="rolled-back", hourly_wage=10000))
+    db.flush()
+    db.rollback()
+
+    assert client.get("/employees", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+
+@pytest.mark.parametrize("path", ["/attendance", "/breaks/"])
+def test_ndjson_and_json_have_their_own_etag(client, with_break, path):
+    as_json = client.get(path)
+    as_ndjson = client.get(path, headers=NDJSON)
+    assert as_json.status_code == as_ndjson.status_code == 200
+    assert as_json.headers["ETag"] != as_ndjson.headers["ETag"]
+    assert as_ndjson.headers["Vary"] == "Accept"
+
+    # A JSON validator never answers an NDJSON request with 304, nor the other way round
+    assert client.get(path, headers={**NDJSON, "If-None-Match": as_json.headers["ETag"]}).status_code == 200
+    assert client.get(path, headers={"If-None-Match": as_ndjson.headers["ETag"]}).status_code == 200
+    assert client.get(path, headers={**NDJSON, "If-None-Match": as_ndjson.headers["ETag"]}).status_code == 304
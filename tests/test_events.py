@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta
+
+from app.cache import get_restaurant_hours
+from app.instrumentation import query_budget
+from app.models.attendance import AttendanceLog
+from app.payroll_periods import close_period, closed_periods
+from app.rollup import check_rollups
+from app.routes import events
+
+
+def event(type, employee_id, timestamp, **fields):
+    return {"type": type, "employee_id": employee_id, "timestamp": timestamp, **fields}
+
+
+def shift_events(employee_id, clock_in, breaks):
+    events = [event("clock_in", employee_id, clock_in.isoformat())]
+    for number in range(breaks):
+        break_start = clock_in + timedelta(minutes=10 * number + 1)
+        events += [
+            event("break_start", employee_id, break_start.isoformat(), break_type="rest"),
+            event("break_end", employee_id, (break_start + timedelta(minutes=5)).isoformat()),
+        ]
+    return events + [event("clock_out", employee_id, (clock_in + timedelta(hours=10)).isoformat())]
+
+
+def test_valid_batch_costs_the_same_statements_at_any_size(client, db, make_employee):
+    get_restaurant_hours(db)
+    closed_periods(db)
+
+    statements = []
+    for employee_id, breaks in ((make_employee(), 2), (make_employee(), 40)):
+        with query_budget(100, "POST /events/batch") as stats:
+            response = client.post("/events/batch", json={"events": shift_events(employee_id, datetime(2026, 2, 10, 9), breaks)})
+        assert response.json()["data"]["rejected"] == 0, response.text
+        assert not [statement for statement in stats.recorded if "SAVEPOINT" in statement]
+        # SQLite can not hand back the ids of a multi-row INSERT in row order, so the
+        # ORM inserts new rows one by one there; Postgres sends one INSERT ... RETURNING
+        # per table (insertmanyvalues). Count the break inserts as that one statement.
+        break_inserts = [statement for statement in stats.recorded if statement.startswith("INSERT INTO break_log")]
+        assert len(break_inserts) == breaks
+        statements.append(len(stats.recorded) - len(break_inserts) + 1)
+
+    # 6 and 82 events: the loads, one flush and the day's rollup refresh
+    assert statements[0] == statements[1]
+
+
+def test_event_in_closed_period_is_rejected_alone(client, db, make_employee):
+    employee_id = make_employee()
+    closed_day = datetime(2026, 1, 5, 9)
+    db.add(AttendanceLog(employee_id=make_employee(), clock_in=closed_day, clock_out=closed_day + timedelta(hours=8)))
+    db.commit()
+    close_period(db, date(2026, 1, 1), date(2026, 1, 31))
+    db.commit()
+
+    response = client.post("/events/batch", json={"events": [
+        event("clock_in", employee_id, "2026-01-10T09:00:00"),
+        event("clock_out", employee_id, "2026-01-10T17:00:00"),
+        event("clock_in", employee_id, "2026-02-10T09:00:00"),
+        event("break_start", employee_id, "2026-02-10T11:00:00", break_type="rest"),
+        event("break_end", employee_id, "2026-02-10T12:00:00"),
+        event("clock_out", employee_id, "2026-02-10T17:00:00"),
+    ]})
+    assert response.status_code == 200, response.text
+
+    results = response.json()["data"]["results"]
+    assert [result["status"] for result in results] == ["rejected", "rejected"] + ["applied"] * 4
+    assert results[0]["status_code"] == 409
+    # The rolled-back clock-in left no open shift behind for the clock-out
+    assert results[1]["status_code"] == 400
+    assert len({result["attendance_id"] for result in results[2:]}) == 1
+
+    shifts = db.query(AttendanceLog).filter(AttendanceLog.employee_id == employee_id).all()
+    assert [(shift.clock_in, shift.clock_out) for shift in shifts] == [(datetime(2026, 2, 10, 9), datetime(2026, 2, 10, 17))]
+    assert check_rollups(db) == []
+
+
+def test_work_day_taken_meanwhile_is_rejected_alone(client, db, make_employee, monkeypatch):
+    employee_id = make_employee()
+    db.add(AttendanceLog(employee_id=employee_id, clock_in=datetime(2026, 2, 10, 9)))
+    db.commit()
+
+    # As if the clock-in was written by another request after the batch loaded its work days
+    load = events.KioskReplay.__init__
+
+    def load_without_work_days(self, db, batch_events):
+        load(self, db, batch_events)
+        self.work_days.clear()
+
+    monkeypatch.setattr(events.KioskReplay, "__init__", load_without_work_days)
+
+    response = client.post("/events/batch", json={"events": [
+        event("clock_in", employee_id, "2026-02-10T10:00:00"),
+        event("clock_out", employee_id, "2026-02-10T17:00:00"),
+    ]})
+    assert response.status_code == 200, response.text
+
+    results = response.json()["data"]["results"]
+    assert [(result["status"], result.get("status_code")) for result in results] == [("rejected", 400), ("applied", None)]
+    assert db.query(AttendanceLog).count() == 1
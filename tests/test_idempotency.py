@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+
+from app.cache import TTLCache
+from app.idempotency import IdempotencyMiddleware
+from app.models.attendance import AttendanceLog
+
+
+def test_retry_replays_the_first_response(client, db, make_employee):
+    employee_id = make_employee()
+    headers = {"Idempotency-Key": "scan-1"}
+
+    first = client.post("/clock-in/", params={"employee_id": employee_id}, headers=headers)
+    retry = client.post("/clock-in/", params={"employee_id": employee_id}, headers=headers)
+
+    assert first.status_code == 200, first.text
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert db.query(AttendanceLog).count() == 1
+
+
+def test_key_reused_for_another_request_answers_422(client, make_employee):
+    headers = {"Idempotency-Key": "scan-1"}
+
+    assert client.post("/clock-in/", params={"employee_id": make_employee()}, headers=headers).status_code == 200
+    response = client.post("/clock-in/", params={"employee_id": make_employee()}, headers=headers)
+
+    assert response.status_code == 422
+    assert "different request" in response.json()["detail"]
+
+
+def test_keys_are_scoped_to_the_caller(client, db, make_employee):
+    first_id, second_id = make_employee(), make_employee()
+
+    for employee_id, token in ((first_id, "Bearer kiosk-a"), (second_id, "Bearer kiosk-b")):
+        response = client.post("/clock-in/", params={"employee_id": employee_id},
+                               headers={"Idempotency-Key": "scan-1", "Authorization": token})
+        assert response.status_code == 200, response.text
+        assert "idempotent-replayed" not in response.headers
+
+    assert db.query(AttendanceLog).count() == 2
+
+
+def test_retry_during_the_first_request_answers_409():
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        started.set()
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+
+    middleware = IdempotencyMiddleware(slow_app, paths={"/clock-in/"}, cache=TTLCache(ttl=60, maxsize=10))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://kiosk") as kiosk:
+            headers = {"Idempotency-Key": "scan-1"}
+            first = asyncio.create_task(kiosk.post("/clock-in/", headers=headers))
+            await started.wait()
+            retry = await kiosk.post("/clock-in/", headers=headers)
+            release.set()
+            return await first, retry
+
+    first, retry = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert retry.status_code == 409
@@ -0,0 +1,84 @@
+"""
+SQL statement budgets of the kiosk routes, and their error responses.
+
+The opening hours and closed payroll periods are cached before each budget, as
+they are on a worker that has served one clock-in, so the budgets count the
+steady-state statements.
+"""
+import pytest
+
+from app.cache import get_restaurant_hours
+from app.instrumentation import query_budget
+from app.payroll_periods import closed_periods
+
+# Route -> most SQL statements one request may run, including the ETag counter bump
+BUDGETS = {
+    "POST /clock-in/": 4,
+    "POST /breaks/start/": 6,
+    "POST /breaks/end/": 6,
+    "POST /clock-out/": 8,
+}
+
+
+@pytest.fixture
+def employee_id(db, make_employee):
+    get_restaurant_hours(db)
+    closed_periods(db)
+    return make_employee()
+
+
+def clock_in(client, employee_id):
+    with query_budget(BUDGETS["POST /clock-in/"], "POST /clock-in/"):
+        response = client.post("/clock-in/", params={"employee_id": employee_id})
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["id"]
+
+
+def test_shift_within_budgets(client, employee_id):
+    attendance_id = clock_in(client, employee_id)
+
+    with query_budget(BUDGETS["POST /breaks/start/"], "POST /breaks/start/"):
+        response = client.post("/breaks/start/", json={"attendance_id": attendance_id, "break_type": "rest"})
+    assert response.status_code == 200, response.text
+
+    with query_budget(BUDGETS["POST /breaks/end/"], "POST /breaks/end/"):
+        response = client.post("/breaks/end/", json={"attendance_id": attendance_id})
+    assert response.status_code == 200, response.text
+    assert response.json()["break_end"] is not None
+
+    with query_budget(BUDGETS["POST /clock-out/"], "POST /clock-out/"):
+        response = client.post("/clock-out/", params={"employee_id": employee_id})
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["attendance"]["clock_out"] is not None
+
+
+def test_clock_in_twice_is_rejected(client, employee_id):
+    clock_in(client, employee_id)
+
+    response = client.post("/clock-in/", params={"employee_id": employee_id})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Employee has already clocked in for today"
+
+
+def test_clock_in_unknown_employee(client, employee_id):
+    response = client.post("/clock-in/", params={"employee_id": employee_id + 1})
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Employee not found"
+
+
+def test_break_errors_keep_their_status(client, employee_id):
+    attendance_id = clock_in(client, employee_id)
+
+    response = client.post("/breaks/end/", json={"attendance_id": attendance_id})
+    assert response.status_code == 404
+
+    client.post("/breaks/start/", json={"attendance_id": attendance_id, "break_type": "rest"})
+    response = client.post("/breaks/start/", json={"attendance_id": attendance_id, "break_type": "rest"})
+    assert response.status_code == 400
+
+
+def test_clock_out_errors_keep_their_status(client, employee_id):
+    assert client.post("/clock-out/", params={"employee_id": employee_id}).status_code == 400
+    assert client.post("/clock-out/", params={"employee_id": employee_id + 1}).status_code == 404
@@ -0,0 +1,15 @@
+def test_employee_routes_push_live_deltas(client):
+    with client.websocket_connect("/ws/status") as websocket:
+        assert websocket.receive_json()["employees"] == []
+
+        employee = client.post("/employee", json={"name": "New", "role": "employee", "hourly_wage": 10000}).json()
+        created = websocket.receive_json()
+        assert created["type"] == "employee.created"
+        assert created["employee"]["employee"]["id"] == employee["id"]
+
+        assert client.put(f"/employee/{employee['id']}", json={"name": "Renamed"}).status_code == 200
+        updated = websocket.receive_json()
+        assert (updated["type"], updated["employee"]["employee"]["name"]) == ("status", "Renamed")
+
+        assert client.delete(f"/employee/{employee['id']}").status_code == 200
+        assert websocket.receive_json() == {"type": "employee.deleted", "employee_id": employee["id"]}
@@ -0,0 +1,140 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.dialects import postgresql
+
+from app import database
+from app.database import Base
+from app.migrations import MIGRATIONS, concurrent_index_ddl, run_migrations
+from app.models.attendance import AttendanceLog
+from app.models.breaks import BreakLog
+
+NOW = datetime(2026, 1, 5, 12)
+
+# Tables as the first release created them, before any migration
+BASELINE_SCHEMA = [
+    """CREATE TABLE employees (
+        id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(100) NOT NULL, role VARCHAR(8) NOT NULL,
+        qr_id VARCHAR(20) NOT NULL UNIQUE, hourly_wage NUMERIC(10, 2) NOT NULL, created_at TIMESTAMP)""",
+    """CREATE TABLE attendance_log (
+        id INTEGER NOT NULL PRIMARY KEY, employee_id INTEGER NOT NULL REFERENCES employees (id) ON DELETE CASCADE,
+        clock_in TIMESTAMP NOT NULL, clock_out TIMESTAMP, total_hours NUMERIC(10, 2), created_at TIMESTAMP)""",
+    """CREATE TABLE tasks (
+        id INTEGER NOT NULL PRIMARY KEY, description VARCHAR NOT NULL,
+        employee_id INTEGER NOT NULL REFERENCES employees (id) ON DELETE CASCADE,
+        task_date DATE NOT NULL, status BOOLEAN NOT NULL, completed_at TIMESTAMP)""",
+    """CREATE TABLE late_records (
+        id INTEGER NOT NULL PRIMARY KEY, attendance_id INTEGER NOT NULL REFERENCES attendance_log (id) ON DELETE CASCADE,
+        late_duration_minutes NUMERIC(10, 2) NOT NULL, deduction_amount NUMERIC(10, 2) NOT NULL,
+        created_at TIMESTAMP NOT NULL)""",
+    """CREATE TABLE penalties (
+        id INTEGER NOT NULL PRIMARY KEY, attendance_id INTEGER NOT NULL REFERENCES attendance_log (id) ON DELETE CASCADE,
+        description VARCHAR(255) NOT NULL, price NUMERIC(10, 2) NOT NULL, created_at TIMESTAMP NOT NULL)""",
+    """CREATE TABLE bonuses (
+        id INTEGER NOT NULL PRIMARY KEY, attendance_id INTEGER NOT NULL REFERENCES attendance_log (id) ON DELETE CASCADE,
+        description VARCHAR(255) NOT NULL, price NUMERIC(10, 2) NOT NULL, created_at TIMESTAMP NOT NULL)""",
+    """CREATE TABLE break_log (
+        id INTEGER NOT NULL PRIMARY KEY, attendance_id INTEGER NOT NULL REFERENCES attendance_log (id) ON DELETE CASCADE,
+        break_type VARCHAR(50) NOT NULL, break_start TIMESTAMP NOT NULL, break_end TIMESTAMP,
+        total_break_time NUMERIC(10, 2), created_at TIMESTAMP)""",
+    """CREATE TABLE salary_log (
+        id INTEGER NOT NULL PRIMARY KEY, employee_id INTEGER NOT NULL REFERENCES employees (id),
+        attendance_id INTEGER NOT NULL REFERENCES attendance_log (id), total_hours_worked NUMERIC(10, 2),
+        total_salary NUMERIC(10, 2), created_at TIMESTAMP)""",
+    """CREATE TABLE restaurant_hours (
+        id INTEGER NOT NULL PRIMARY KEY, opening_time TIME NOT NULL, closing_time TIME NOT NULL,
+        created_at TIMESTAMP NOT NULL, updated_at TIMESTAMP NOT NULL)""",
+]
+
+
+def query_plan(db, statement):
+    compiled = statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    return " | ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+
+
+# Without statistics SQLite may pick either index covering (attendance_id, break_start)
+# or (employee_id, clock_in) for the open-row lookups; both are searches, not scans.
+@pytest.mark.parametrize("statement, indexes", [
+    # An employee's records in a date range (GET /attendance/{employee_id}, reports)
+    (
+        select(AttendanceLog).where(AttendanceLog.employee_id == 1, AttendanceLog.clock_in >= NOW,
+                                    AttendanceLog.clock_in < NOW).order_by(AttendanceLog.clock_in.desc()),
+        ("ix_attendance_log_employee_id_clock_in",),
+    ),
+    # The open shift to clock out of
+    (
+        select(AttendanceLog).where(AttendanceLog.employee_id == 1, AttendanceLog.clock_in < NOW,
+                                    AttendanceLog.clock_out.is_(None)).order_by(AttendanceLog.clock_in.desc()),
+        ("ix_attendance_log_open_shifts", "ix_attendance_log_employee_id_clock_in"),
+    ),
+    # The clock-in conflict check
+    (
+        select(AttendanceLog).where(AttendanceLog.employee_id == 1, AttendanceLog.work_day == NOW.date()),
+        ("uq_attendance_log_employee_id_work_day",),
+    ),
+    # A shift's breaks in order
+    (
+        select(BreakLog).where(BreakLog.attendance_id == 1).order_by(BreakLog.break_start),
+        ("ix_break_log_attendance_id_break_start",),
+    ),
+    # The ongoing break to end
+    (
+        select(BreakLog).where(BreakLog.attendance_id == 1, BreakLog.break_end.is_(None))
+        .order_by(BreakLog.break_start.desc()),
+        ("ix_break_log_open_breaks", "ix_break_log_attendance_id_break_start"),
+    ),
+])
+def test_lookups_use_their_index(db, statement, indexes):
+    plan = query_plan(db, statement)
+
+    assert plan.startswith("SEARCH") and any(f"USING INDEX {index} " in plan for index in indexes), plan
+
+
+def test_migrations_add_indexes_to_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for name in ("ix_attendance_log_employee_id_clock_in", "ix_break_log_open_breaks"):
+            conn.execute(text(f"DROP INDEX {name}"))
+
+    run_migrations(engine)
+
+    inspector = inspect(engine)
+    assert "ix_attendance_log_employee_id_clock_in" in {index["name"] for index in inspector.get_indexes("attendance_log")}
+    assert "ix_break_log_open_breaks" in {index["name"] for index in inspector.get_indexes("break_log")}
+    engine.dispose()
+
+
+def test_init_db_upgrades_the_baseline_schema(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO employees (id, name, role, qr_id, hourly_wage) "
+                          "VALUES (1, 'Employee', 'employee', 'badge', 10000)"))
+        conn.execute(text("INSERT INTO attendance_log (id, employee_id, clock_in, clock_out) "
+                          "VALUES (1, 1, '2026-01-05 09:00:00', '2026-01-05 17:00:00')"))
+    monkeypatch.setattr(database, "engine", engine)
+
+    database.init_db()
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT max(version) FROM schema_version")).scalar() == MIGRATIONS[-1][0]
+        assert conn.execute(text("SELECT work_day, net_pay FROM daily_rollups")).all() == [("2026-01-05", 80000)]
+        assert "hourly_wage" in {column["name"] for column in inspect(conn).get_columns("salary_log")}
+    engine.dispose()
+
+
+def test_postgres_indexes_are_built_concurrently():
+    dialect = postgresql.dialect()
+    indexes = {index.name: index for table in Base.metadata.sorted_tables for index in table.indexes}
+
+    assert concurrent_index_ddl(indexes["uq_attendance_log_employee_id_work_day"], dialect) == (
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_attendance_log_employee_id_work_day "
+        "ON attendance_log (employee_id, work_day)"
+    )
+    assert concurrent_index_ddl(indexes["ix_break_log_open_breaks"], dialect) == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_break_log_open_breaks "
+        "ON break_log (attendance_id, break_start) WHERE break_end IS NULL"
+    )
@@ -0,0 +1,101 @@
+"""
+The NDJSON streams of GET /attendance and GET /breaks/ keep memory flat as the tables grow.
+
+The requests go through the whole ASGI app, but the body chunks are dropped as
+they are sent instead of being collected (as TestClient would), so the
+tracemalloc peak is the server's own working set.
+"""
+from datetime import datetime, timedelta
+import gc
+import tracemalloc
+
+import anyio
+import pytest
+from sqlalchemy import insert
+
+from app.main import app
+from app.models.attendance import AttendanceLog
+from app.models.breaks import BreakLog
+
+# Both sizes span several STREAM_CHUNK_SIZE partitions, so only per-row growth shows
+SMALL, LARGE = 8_000, 32_000
+
+
+def seed(db, employee_id, size):
+    start = datetime(2020, 1, 1, 9)
+    # Core inserts leave work_day NULL, so one employee can have a record every hour
+    db.execute(insert(AttendanceLog), [
+        {"id": n, "employee_id": employee_id, "clock_in": start + timedelta(hours=n),
+         "clock_out": start + timedelta(hours=n, minutes=30), "total_hours": 0.5, "created_at": start}
+        for n in range(1, size + 1)
+    ])
+    db.execute(insert(BreakLog), [
+        {"attendance_id": n, "break_type": "rest", "break_start": start + timedelta(hours=n, minutes=10),
+         "break_end": start + timedelta(hours=n, minutes=20), "total_break_time": 10, "created_at": start}
+        for n in range(1, size + 1)
+    ])
+    db.commit()
+
+
+async def stream(path):
+    """
+    Request `path` as NDJSON; returns the status, the body size and the number of lines.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"accept", b"application/x-ndjson")],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    status, size, lines = None, 0, 0
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # The client stays connected until the whole body has been sent
+            await anyio.sleep_forever()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, size, lines
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            lines += message.get("body", b"").count(b"\n")
+
+    await app(scope, receive, send)
+    return status, size, lines
+
+
+def peak_memory(path):
+    # Leave first-request allocations (compiled statements, imports) out of the peak
+    anyio.run(stream, path)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        status, size, lines = anyio.run(stream, path)
+        return status, size, lines, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("path", ["/attendance", "/breaks/"])
+def test_ndjson_stream_memory_stays_flat(db, make_employee, path):
+    employee_id = make_employee()
+
+    seed(db, employee_id, SMALL)
+    status, _, lines, small_peak = peak_memory(path)
+    assert (status, lines) == (200, SMALL)
+
+    db.execute(BreakLog.__table__.delete())
+    db.execute(AttendanceLog.__table__.delete())
+    seed(db, employee_id, LARGE)
+    status, size, lines, large_peak = peak_memory(path)
+    assert (status, lines) == (200, LARGE)
+
+    # Four times the rows may not cost noticeably more memory, and the body is never held whole
+    assert large_peak < small_peak * 1.25, (small_peak, large_peak)
+    assert large_peak < size, (size, large_peak)
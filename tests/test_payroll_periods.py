@@ -0,0 +1,85 @@
+import csv
+from datetime import date, datetime, timedelta
+import io
+import json
+
+import pytest
+
+from app.instrumentation import query_budget
+from app.models.attendance import AttendanceLog
+from app.models.breaks import BreakLog
+from app.payroll_periods import close_period, closed_periods
+
+CLOSED_DAY = datetime(2026, 1, 5, 9)
+
+
+@pytest.fixture
+def closed_shift(db, make_employee):
+    """
+    An 8-hour shift with a break, closed in January's payroll period at a wage of 10,000.
+    """
+    attendance = AttendanceLog(employee_id=make_employee(), clock_in=CLOSED_DAY,
+                               clock_out=CLOSED_DAY + timedelta(hours=8))
+    attendance.break_logs = [BreakLog(break_type="rest", break_start=CLOSED_DAY + timedelta(hours=2),
+                                      break_end=CLOSED_DAY + timedelta(hours=3), total_break_time=60)]
+    db.add(attendance)
+    db.commit()
+    close_period(db, date(2026, 1, 1), date(2026, 1, 31))
+    db.commit()
+    return attendance
+
+
+def test_closed_shift_keeps_its_wage_everywhere(client, db, closed_shift):
+    employee_id, attendance_id = closed_shift.employee_id, closed_shift.id
+    assert client.put(f"/employee/{employee_id}", json={"hourly_wage": 20000}).status_code == 200
+
+    assert client.get(f"/get/attendance/{attendance_id}").json()["net_pay"] == 70000
+    records = client.get(f"/attendance/{employee_id}").json()["attendance_records"]
+    assert [record["net_pay"] for record in records] == [70000]
+    report = client.get(f"/report/{employee_id}", params={"start_date": "2026-01-05"}).json()
+    assert [log["net_pay"] for log in report["attendance_logs"]] == [70000]
+    rollups = client.get("/rollups/daily", params={"start_date": "2026-01-01", "end_date": "2026-01-31"}).json()
+    assert [rollup["net_pay"] for rollup in rollups] == [70000]
+
+
+def test_closed_shift_changes_answer_409(client, closed_shift):
+    break_id = closed_shift.break_logs[0].id
+
+    response = client.delete(f"/delete/break/{break_id}")
+    assert response.status_code == 409, response.text
+    response = client.delete(f"/attendance/delete/{closed_shift.id}/clock_out")
+    assert response.status_code == 409, response.text
+
+
+def test_employee_with_closed_pay_can_not_be_deleted(client, closed_shift):
+    response = client.delete(f"/employee/{closed_shift.employee_id}")
+
+    assert response.status_code == 409
+    assert client.get(f"/get/attendance/{closed_shift.id}").status_code == 200
+
+
+def test_open_period_writes_skip_the_snapshot_lookup(client, db, closed_shift, make_employee):
+    employee_id = make_employee()
+    attendance_id = client.post("/clock-in/", params={"employee_id": employee_id}).json()["data"]["id"]
+    closed_periods(db)
+
+    # The ongoing-break check, the INSERT, the day's payroll rows, the rollup upsert, the ETag
+    # counter bump and the refresh
+    with query_budget(6, "POST /breaks/start/"):
+        response = client.post("/breaks/start/", json={"attendance_id": attendance_id, "break_type": "rest"})
+    assert response.status_code == 200, response.text
+
+
+def test_ndjson_export_matches_the_csv(client, closed_shift):
+    params = {"start_date": "2026-01-01", "end_date": "2026-01-31"}
+    response = client.get("/payroll/export", params={**params, "format": "ndjson"})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [(record["record_type"], record["clock_in"], record["net_pay"]) for record in records] == [
+        ("shift", CLOSED_DAY.isoformat(), 70000),
+        ("employee_total", None, 70000),
+    ]
+    rows = list(csv.DictReader(io.StringIO(client.get("/payroll/export", params=params).text)))
+    assert [float(row["net_pay"]) for row in rows] == [record["net_pay"] for record in records]
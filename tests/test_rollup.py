@@ -0,0 +1,120 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.database import SessionLocal
+from app.instrumentation import query_budget
+from app.models.attendance import AttendanceLog, Bonus, Penalty
+from app.models.rollup import DailyRollup
+from app.payroll_periods import close_period
+from app.rollup import RollupKey, _rollup_lock_statement, check_rollups
+
+
+def shift(db, employee_id, clock_in, hours=8):
+    attendance = AttendanceLog(employee_id=employee_id, clock_in=clock_in, clock_out=clock_in + timedelta(hours=hours))
+    db.add(attendance)
+    db.commit()
+    return attendance
+
+
+def net_pay(db, employee_id, work_day):
+    return db.scalar(
+        select(DailyRollup.net_pay).where(DailyRollup.employee_id == employee_id, DailyRollup.work_day == work_day)
+    )
+
+
+def test_kiosk_shift_keeps_rollup_current(client, db, make_employee):
+    employee_id = make_employee()
+
+    attendance_id = client.post("/clock-in/", params={"employee_id": employee_id}).json()["data"]["id"]
+    client.post("/breaks/start/", json={"attendance_id": attendance_id, "break_type": "rest"})
+    client.post("/breaks/end/", json={"attendance_id": attendance_id})
+    client.post("/clock-out/", params={"employee_id": employee_id})
+
+    assert db.query(DailyRollup).count() == 1
+    assert check_rollups(db) == []
+
+
+def test_commit_refreshes_each_day_with_one_aggregate_and_one_upsert(db, make_employee):
+    employee_id = make_employee()
+    attendance = shift(db, employee_id, datetime(2026, 1, 5, 9))
+
+    attendance.clock_out += timedelta(hours=1)
+    with query_budget(4, "clock-out edit"):
+        # UPDATE, the day's payroll rows, the rollup upsert, the ETag counter bump
+        db.commit()
+
+    assert float(net_pay(db, employee_id, date(2026, 1, 5))) == 90000
+    assert check_rollups(db) == []
+
+
+def test_deleted_attendance_drops_its_rollup(db, make_employee):
+    employee_id = make_employee()
+    attendance = shift(db, employee_id, datetime(2026, 1, 5, 9))
+    assert net_pay(db, employee_id, date(2026, 1, 5)) is not None
+
+    db.delete(attendance)
+    db.commit()
+
+    assert db.query(DailyRollup).count() == 0
+
+
+def test_wage_change_skips_closed_periods(client, db, make_employee):
+    employee_id = make_employee()
+    shift(db, employee_id, datetime(2026, 1, 5, 9))
+    # Clocked in after midnight: work day January 31, but outside the period
+    shift(db, employee_id, datetime(2026, 2, 1, 2), hours=1)
+    shift(db, employee_id, datetime(2026, 2, 10, 9))
+    close_period(db, date(2026, 1, 1), date(2026, 1, 31))
+    db.commit()
+
+    response = client.put(f"/employee/{employee_id}", json={"hourly_wage": 20000})
+    assert response.status_code == 200, response.text
+
+    db.expire_all()
+    # Wholly closed work day keeps the pay it was closed with
+    assert float(net_pay(db, employee_id, date(2026, 1, 5))) == 80000
+    # Work days reaching outside the closed period are recomputed
+    assert float(net_pay(db, employee_id, date(2026, 1, 31))) == 20000
+    assert float(net_pay(db, employee_id, date(2026, 2, 10))) == 160000
+
+
+def test_two_sessions_committing_to_one_day_keep_both_changes(db, make_employee):
+    employee_id = make_employee()
+    attendance = shift(db, employee_id, datetime(2026, 1, 5, 9))
+
+    with SessionLocal() as first, SessionLocal() as second:
+        first.add(Penalty(attendance_id=attendance.id, description="Late", price=5000))
+        second.add(Bonus(attendance_id=attendance.id, description="Cover", price=2000))
+        first.flush()
+        first.commit()
+        second.commit()
+
+    db.expire_all()
+    assert float(net_pay(db, employee_id, date(2026, 1, 5))) == 77000
+    assert check_rollups(db) == []
+
+
+def test_postgres_locks_refreshed_days_in_one_order():
+    keys = {RollupKey(2, date(2026, 1, 5)), RollupKey(1, date(2026, 1, 6)), RollupKey(1, date(2026, 1, 5))}
+
+    compiled = _rollup_lock_statement(keys).compile(dialect=postgresql.dialect())
+
+    assert "pg_advisory_xact_lock" in str(compiled)
+    assert compiled.params["employee_ids"] == [1, 1, 2]
+    assert compiled.params["work_days"] == [date(2026, 1, 5).toordinal(), date(2026, 1, 6).toordinal(),
+                                            date(2026, 1, 5).toordinal()]
+
+
+def test_savepoint_release_leaves_the_refresh_to_the_commit(db, make_employee):
+    employee_id = make_employee()
+    attendance = shift(db, employee_id, datetime(2026, 1, 5, 9))
+
+    with query_budget(10, "savepoint") as stats:
+        with db.begin_nested():
+            db.add(Penalty(attendance_id=attendance.id, description="Late", price=5000))
+    assert not [statement for statement in stats.recorded if "daily_rollups" in statement]
+
+    db.commit()
+    assert float(net_pay(db, employee_id, date(2026, 1, 5))) == 75000
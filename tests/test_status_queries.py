@@ -0,0 +1,65 @@
+"""
+The status and attendance list endpoints run a fixed number of SQL statements
+however many employees there are.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.instrumentation import query_budget
+from app.models.attendance import AttendanceLog
+from app.models.breaks import BreakLog
+
+DAY = date(2026, 1, 5)
+
+
+@pytest.fixture
+def staff(db, make_employee):
+    """
+    Factory adding `count` employees, each with a shift on DAY that has two breaks.
+    """
+    def staff(count):
+        for n in range(count):
+            employee_id = make_employee(name=f"Employee {n}")
+            clock_in = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=9, minutes=n)
+            attendance = AttendanceLog(employee_id=employee_id, clock_in=clock_in, clock_out=clock_in + timedelta(hours=8))
+            attendance.break_logs = [
+                BreakLog(break_type="rest", break_start=clock_in + timedelta(hours=hour),
+                         break_end=clock_in + timedelta(hours=hour, minutes=15), total_break_time=15)
+                for hour in (2, 5)
+            ]
+            db.add(attendance)
+        db.commit()
+
+    return staff
+
+
+@pytest.mark.parametrize("headcount", [3, 30])
+def test_employees_status_runs_three_statements(client, staff, headcount):
+    staff(headcount)
+
+    with query_budget(3, "GET /employees/status/"):
+        response = client.get("/employees/status/", params={"date": DAY.isoformat()})
+
+    assert response.status_code == 200
+    employees = response.json()["employees"]
+    assert len(employees) == headcount
+    assert all(len(entry["breaks"]) == 2 for entry in employees)
+
+
+def test_employees_status_without_employees(client):
+    assert client.get("/employees/status/").status_code == 404
+
+
+@pytest.mark.parametrize("headcount", [3, 30])
+def test_attendance_list_runs_three_statements(client, staff, headcount):
+    staff(headcount)
+
+    # The ETag counters, then the records and their breaks
+    with query_budget(3, "GET /attendance"):
+        response = client.get("/attendance")
+
+    assert response.status_code == 200
+    records = response.json()
+    assert len(records) == headcount
+    assert all(len(record["break_logs"]) == 2 for record in records)